@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+"""
+Benchmark the accumulation of harvested LPGS records; growing a
+DataFrame one record at a time versus the columnar `RecordBuilder`.
+
+The legacy approach copies the whole DataFrame for every record, so
+its time grows with the square of the number of records; 5000 records
+take around 20 seconds, and 100000 would take hours. It is therefore
+only timed up to --legacy-max records (default 5000).
+"""
+
+import argparse
+import random
+import time
+
+import pandas
+
+from cophub.records import RecordBuilder
+
+
+LEGACY_COLUMNS = ['L1_L1Gt',
+                  'L1_success',
+                  'L0_fail',
+                  'L1_L1T',
+                  'L0_success',
+                  'level1_name',
+                  'pass_name',
+                  'L1_fail',
+                  'L1_L1G']
+
+
+def synthetic_records(n, seed=0):
+    """
+    Generate `n` records resembling those returned by
+    `process_lpgs_log`, roughly 20 scenes per pass.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        pass_number = i // 20
+        sensor = 'LS{}'.format(rng.choice([5, 7, 8]))
+        date = '{}{:02d}{:02d}'.format(1990 + pass_number % 27,
+                                       pass_number % 12 + 1,
+                                       pass_number % 28 + 1)
+        path = rng.randint(88, 117)
+        row = rng.randint(66, 92)
+        level1_name = ('{}_ETM_OTH_P51_GALPGS01-002_{:03d}_{:03d}_{}'
+                       .format(sensor, path, row, date))
+        yield {'level1_name': level1_name,
+               'path': path,
+               'row': row,
+               'pass_id': '{}-{}'.format(sensor, date),
+               'pass_name': '{}_{}_{:06d}'.format(sensor, date, pass_number),
+               'L0_success': rng.randint(0, 1),
+               'L0_fail': rng.randint(0, 1),
+               'L1_success': rng.randint(0, 30),
+               'L1_fail': rng.randint(0, 3),
+               'L1_L1G': rng.randint(0, 5),
+               'L1_L1Gt': rng.randint(0, 5),
+               'L1_L1T': rng.randint(0, 20)}
+
+
+def legacy(records):
+    """
+    The original approach; append each record to a DataFrame.
+    """
+    df = pandas.DataFrame(columns=LEGACY_COLUMNS)
+    for record in records:
+        if hasattr(df, 'append'):
+            df = df.append(record, ignore_index=True)
+        else:
+            df = pandas.concat([df, pandas.DataFrame([record])],
+                               ignore_index=True)
+    return df
+
+
+def batched(records, chunksize=None):
+    """
+    Accumulate the records into column buffers, and create the
+    DataFrame once per chunk.
+    """
+    chunks = []
+    builder = RecordBuilder(chunksize=chunksize, on_chunk=chunks.append)
+    builder.extend(records)
+    builder.flush()
+    return chunks
+
+
+def timeit(func, records, *args):
+    st = time.time()
+    func(records, *args)
+    return time.time() - st
+
+
+def main(sizes, legacy_max, chunksize):
+    fmt = "{:>10} {:>12} {:>12}"
+    print(fmt.format('records', 'legacy (s)', 'batched (s)'))
+    for n in sizes:
+        records = list(synthetic_records(n))
+
+        if legacy_max is None or n <= legacy_max:
+            legacy_time = '{:.3f}'.format(timeit(legacy, records))
+        else:
+            legacy_time = 'skipped'
+
+        batched_time = '{:.3f}'.format(timeit(batched, records, chunksize))
+
+        print(fmt.format(n, legacy_time, batched_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 5000, 100000, 1000000],
+                        help=("The number of synthetic records to "
+                              "benchmark. "
+                              "Default is 1000 5000 100000 1000000"))
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help=("Skip the legacy approach for sizes greater "
+                              "than this, as it is quadratic. "
+                              "Default is 5000"))
+    parser.add_argument('--chunksize', type=int, default=10000,
+                        help=("The number of records per chunk. "
+                              "Default is 10000"))
+
+    parsed_args = parser.parse_args()
+    main(parsed_args.sizes, parsed_args.legacy_max, parsed_args.chunksize)
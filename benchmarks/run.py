@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+"""
+Run the benchmark suites (see `suites`) and record the results, so
+that a regression shows up when compared against an earlier run:
+
+    python benchmarks/run.py --out baseline.json
+    ... change something ...
+    python benchmarks/run.py --compare baseline.json
+
+The results are written as JSON, by default to
+benchmarks/results/{commit}-{hostname}.json.
+"""
+
+import argparse
+import inspect
+import json
+import os
+from os.path import abspath, dirname, exists, join as pjoin
+import platform
+import re
+import socket
+import subprocess
+import sys
+import time
+
+
+RESULTS_DIR = pjoin(dirname(abspath(__file__)), 'results')
+
+# a benchmark is flagged if it is this much slower than the baseline
+THRESHOLD = 0.2
+
+
+def git_commit():
+    """
+    The commit of the working tree, or 'unknown'.
+    """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=dirname(abspath(__file__)),
+                                         stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    return commit.decode('ascii').strip()
+
+
+def discover(module, pattern=None):
+    """
+    Find the suites and their time_* methods.
+
+    :return:
+        A list of (suite class, [method name, ...]).
+    """
+    found = []
+    for name, cls in sorted(inspect.getmembers(module, inspect.isclass)):
+        if cls.__module__ != module.__name__:
+            continue
+
+        methods = sorted(attr for attr in dir(cls)
+                         if attr.startswith('time_'))
+        if pattern is not None:
+            methods = [method for method in methods
+                       if re.search(pattern, '{}.{}'.format(name, method))]
+        if methods:
+            found.append((cls, methods))
+
+    return found
+
+
+def time_method(func, param, repeat):
+    """
+    Time `repeat` calls of a benchmark.
+
+    :return:
+        A list of the seconds taken by each call.
+    """
+    timings = []
+    for _ in range(repeat):
+        st = time.perf_counter()
+        func(param)
+        timings.append(time.perf_counter() - st)
+
+    return timings
+
+
+def run_suites(suites, repeat, log=print):
+    """
+    Run each benchmark of each suite, for each of its params.
+
+    :return:
+        A dict of {'Suite.time_method(param)': {stats}}.
+    """
+    results = {}
+    for cls, methods in suites:
+        for param in getattr(cls, 'params', [None]):
+            suite = cls()
+            if hasattr(suite, 'setup'):
+                suite.setup(param)
+            try:
+                for method in methods:
+                    key = '{}.{}({})'.format(cls.__name__, method, param)
+                    try:
+                        timings = time_method(getattr(suite, method), param,
+                                              repeat)
+                    except NotImplementedError as exc:
+                        log("{:60} skipped; {}".format(key, exc))
+                        continue
+
+                    timings.sort()
+                    results[key] = {'min': timings[0],
+                                    'median': timings[len(timings) // 2],
+                                    'max': timings[-1],
+                                    'repeat': repeat}
+                    log("{:60} {:10.4f}".format(key, timings[0]))
+            finally:
+                if hasattr(suite, 'teardown'):
+                    suite.teardown(param)
+
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compare the minimum timings of each benchmark with the baseline.
+
+    :return:
+        A list of (benchmark, baseline seconds, seconds, ratio,
+        regressed).
+    """
+    rows = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        before = baseline[key]['min']
+        after = results[key]['min']
+        ratio = after / before if before > 0 else float('inf')
+        rows.append((key, before, after, ratio, ratio > 1 + threshold))
+
+    return rows
+
+
+def main(pattern, repeat, scale, out_fname, baseline_fname, threshold):
+    # the sizes are read by the suites on import
+    os.environ['COPHUB_BENCH_SCALE'] = str(scale)
+    sys.path.insert(0, dirname(abspath(__file__)))
+    import suites
+
+    commit = git_commit()
+    results = run_suites(discover(suites, pattern), repeat)
+
+    record = {'commit': commit,
+              'hostname': socket.gethostname(),
+              'python': platform.python_version(),
+              'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'scale': scale,
+              'repeat': repeat,
+              'results': results}
+
+    if out_fname is None:
+        if not exists(RESULTS_DIR):
+            os.makedirs(RESULTS_DIR)
+        out_fname = pjoin(RESULTS_DIR, '{}-{}.json'.format(
+            commit[:10], socket.gethostname()))
+
+    with open(out_fname, 'w') as outf:
+        json.dump(record, outf, indent=2, sort_keys=True)
+    print("Results written to {}".format(out_fname))
+
+    if baseline_fname is None:
+        return
+
+    with open(baseline_fname) as src:
+        baseline = json.load(src)
+
+    if baseline.get('scale') != scale:
+        print("Warning: the baseline was run at scale {}".format(
+            baseline.get('scale')))
+
+    fmt = "{:60} {:>10} {:>10} {:>8} {}"
+    print(fmt.format('benchmark', 'before (s)', 'after (s)', 'ratio', ''))
+    regressions = 0
+    for key, before, after, ratio, regressed in compare(
+            results, baseline['results'], threshold):
+        regressions += regressed
+        print(fmt.format(key, '{:.4f}'.format(before),
+                         '{:.4f}'.format(after), '{:.2f}'.format(ratio),
+                         'REGRESSION' if regressed else ''))
+
+    if regressions:
+        print("{} benchmarks regressed against {} ({})".format(
+            regressions, baseline_fname, baseline['commit'][:10]))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bench',
+                        help=("Only run the benchmarks matching this "
+                              "regular expression, eg 'ParseSuite'."))
+    parser.add_argument('--repeat', type=int, default=3,
+                        help=("The number of times each benchmark is run, "
+                              "the fastest being recorded. Default is 3"))
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=("Multiply the sizes of the synthetic inputs. "
+                              "Default is 1"))
+    parser.add_argument('--out',
+                        help=("The JSON file to write the results to. "
+                              "Default is results/{commit}-{hostname}.json"))
+    parser.add_argument('--compare',
+                        help=("A previous results file; exit with a non-zero "
+                              "status if any benchmark regressed."))
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=("The fractional slowdown flagged as a "
+                              "regression. Default is 0.2"))
+
+    parsed_args = parser.parse_args()
+    main(parsed_args.bench, parsed_args.repeat, parsed_args.scale,
+         parsed_args.out, parsed_args.compare, parsed_args.threshold)
@@ -0,0 +1,200 @@
+"""
+Benchmark suites of each stage of the harvest and of the reporting,
+over the synthetic inputs of `synthetic`.
+
+The suites follow the conventions of asv (airspeed velocity); each
+class has `params`, a `setup` and `teardown` called with each
+parameter, and `time_*` methods that are timed. They are run by
+`run.py`, or by asv itself. The sizes are multiplied by the
+COPHUB_BENCH_SCALE environment variable (default 1).
+"""
+
+import os
+from os.path import abspath, dirname, join as pjoin
+import shutil
+import sys
+import tempfile
+
+import pandas
+
+from cophub.crawl import crawl
+from cophub.exists import batch_exists
+from cophub.lpgs import LpgsExtractor, lxml_etree
+from cophub.names import parse_level1_names, product_names
+from cophub.records import RecordBuilder, frame_from_columns
+from cophub import reporting
+from cophub.sinks import LocalSink
+
+import synthetic
+
+# the harvest functions reside in the scripts
+sys.path.insert(0, pjoin(dirname(dirname(abspath(__file__))), 'scripts'))
+import ls_collections  # noqa: E402
+
+
+SCALE = float(os.environ.get('COPHUB_BENCH_SCALE', 1))
+
+
+def scaled(*sizes):
+    return [max(1, int(size * SCALE)) for size in sizes]
+
+
+class Level1Tree(object):
+    """
+    Write a synthetic level1 tree (and children) to a temporary
+    directory for each parameter.
+    """
+
+    params = scaled(1000, 5000)
+    param_names = ['scenes']
+    children = False
+
+    def setup(self, n):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cophub-bench-')
+        self.config = synthetic.local_config(self.tmp_dir)
+        self.entries = synthetic.make_level1_tree(self.config, n,
+                                                  self.children)
+
+    def teardown(self, n):
+        shutil.rmtree(self.tmp_dir)
+
+
+class CrawlSuite(Level1Tree):
+    """
+    Discovery of the LPGS logs.
+    """
+
+    def time_crawl(self, n):
+        crawl(self.config.level1_dirs)
+
+
+class ParseSuite(Level1Tree):
+    """
+    Extraction of the fields of the LPGS logs.
+    """
+
+    params = scaled(1000)
+
+    def setup(self, n):
+        super(ParseSuite, self).setup(n)
+        self.fnames = [fname for fname, _, _ in self.entries
+                       if 'failure' not in fname and
+                       'packagetmp' not in fname]
+        self.etree = LpgsExtractor(backend='etree')
+        if lxml_etree is not None:
+            self.lxml = LpgsExtractor(backend='lxml')
+
+    def time_extract_etree(self, n):
+        for fname in self.fnames:
+            self.etree.extract(fname)
+
+    def time_extract_lxml(self, n):
+        if lxml_etree is None:
+            raise NotImplementedError("lxml is not installed")
+        for fname in self.fnames:
+            self.lxml.extract(fname)
+
+    def time_process_lpgs_log(self, n):
+        for fname in self.fnames:
+            ls_collections.process_lpgs_log(fname)
+
+    def time_harvest(self, n):
+        ls_collections.harvest(self.entries)
+
+
+class ExistsSuite(Level1Tree):
+    """
+    Existence checks of the predicted children.
+    """
+
+    children = True
+
+    def setup(self, n):
+        super(ExistsSuite, self).setup(n)
+        df = frame_from_columns([ls_collections.harvest(self.entries)[0]])
+        _, oth_df = ls_collections.predict_children(df,
+                                                    self.config.products)
+        self.fnames = pandas.concat([oth_df[product + '_name']
+                                     for product in self.config.products])
+
+    def time_batch_exists(self, n):
+        batch_exists(self.fnames)
+
+
+class NamesSuite(object):
+    """
+    Prediction of the children names from the level1 names, and the
+    combination of the harvested records.
+    """
+
+    params = scaled(10000, 100000)
+    param_names = ['scenes']
+
+    def setup(self, n):
+        fields = ['level1_name', 'pass_id', 'pass_name', 'L0_success',
+                  'L0_fail', 'L1_success', 'L1_fail', 'L1_L1G', 'L1_L1Gt',
+                  'L1_L1T']
+        records = []
+        for scene in synthetic.synthetic_scenes(n):
+            if scene['variant'] in ('failure', 'packagetmp'):
+                continue
+            record = {field: scene[field] for field in fields}
+            path, row = scene['level1_name'].split('_')[5:7]
+            record['path'] = int(path)
+            record['row'] = int(row)
+            records.append(record)
+
+        # as if gathered from 8 workers
+        self.blocks = []
+        for i in range(8):
+            builder = RecordBuilder()
+            builder.extend(records[i::8])
+            self.blocks.append(builder.columns())
+
+        self.df = frame_from_columns(self.blocks)
+        self.level1_names = self.df['level1_name']
+        self.components = parse_level1_names(self.level1_names)
+
+    def time_parse_level1_names(self, n):
+        parse_level1_names(self.level1_names)
+
+    def time_product_names(self, n):
+        product_names(self.components)
+
+    def time_frame_from_columns(self, n):
+        frame_from_columns(self.blocks)
+
+    def time_predict_children(self, n):
+        ls_collections.predict_children(self.df)
+
+
+class ReportingSuite(object):
+    """
+    Reading, summarising and reporting on the Apache and SARA logs.
+    """
+
+    params = scaled(100000, 500000)
+    param_names = ['records']
+
+    def setup(self, n):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cophub-bench-')
+        self.apache_fname = pjoin(self.tmp_dir, 'apache.csv')
+        self.sara_fname = pjoin(self.tmp_dir, 'sara.csv')
+        synthetic.make_apache_log(self.apache_fname, n)
+        synthetic.make_sara_log(self.sara_fname, n)
+        self.sink = LocalSink(self.tmp_dir, ['md'])
+
+    def teardown(self, n):
+        shutil.rmtree(self.tmp_dir)
+
+    def time_apache_daily(self, n):
+        reporting.apache_daily(self.apache_fname)
+
+    def time_apache_log(self, n):
+        reporting.apache_log(self.apache_fname, self.sink)
+
+    def time_sara_daily(self, n):
+        reporting.sara_daily(self.sara_fname)
+
+    def time_sara_log(self, n):
+        reporting.sara_log(self.sara_fname, self.sink)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+
+"""
+Generate synthetic inputs for the benchmarks, so that they can be run
+on a laptop without access to /g/data:
+
+    * level1 trees, i.e. {level1_dir}/{year}/{month}/{level1_name}/
+      lpgs/lpgs_out.xml, with SYS and OTH products, and the failure
+      and packagetmp variants
+    * the ga-metadata.yaml of the children products (eg nbar, nbart
+      and pq) of the OTH products, at their predicted locations
+    * the Apache and SARA logs provided by NCI
+
+The trees are laid out according to a `cophub.config.Config` whose
+storage roots reside under a local directory (see `local_config`),
+which is also written as {out_dir}/cophub.yaml so that the scripts
+can be pointed at the tree, eg:
+
+    python benchmarks/synthetic.py tree /tmp/bench --scenes 10000
+    python scripts/ls_collections.py --crawl --config /tmp/bench/cophub.yaml
+    python benchmarks/synthetic.py logs /tmp/logs --records 1000000
+"""
+
+import argparse
+import os
+from os.path import dirname, exists, join as pjoin
+import random
+
+import numpy
+import pandas
+
+from cophub.config import DEFAULTS, Config
+from cophub.names import parse_level1_names, product_names
+
+
+# the sensor id and station id of each sensor
+SENSORS = {'ls5': ('TM', '002'),
+           'ls7': ('ETM', '002'),
+           'ls8': ('OLITIRS', '032')}
+
+LPGS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<LPGS>
+  <L0RpProcessing success="{L0_success}" fail="{L0_fail}"/>
+  <L1Processing success="{L1_success}" fail="{L1_fail}" L1G="{L1_L1G}" L1Gt="{L1_L1Gt}" L1T="{L1_L1T}"/>
+  <Messages>
+{messages}
+  </Messages>
+  <LandsatProcessingRequest id="{pass_id}">
+    <Input>/g/data/v10/repackage/{pass_name}.tar</Input>
+    <WorkingFolder>/g/data/v10/work/{pass_name}/L0/{level1_name}</WorkingFolder>
+  </LandsatProcessingRequest>
+</LPGS>
+"""
+
+MESSAGE_TEMPLATE = ('    <Message level="INFO" step="{0}">Completed step {0} '
+                    'of the level1 processing</Message>')
+
+METADATA_TEMPLATE = """id: {scene}
+product_type: {product}
+acquisition:
+  platform_code: {sensor}
+"""
+
+APACHE_DATASETS = ['Sentinel-1', 'Sentinel-2', 'Sentinel-3', 'S1A_SLC',
+                   'S1A_GRD', 'S2A_MSI_L1C', 'S2B_MSI_L1C', 'S3A_OLCI']
+APACHE_SERVICES = ['http', 'thredds', 'ftp', 'wms']
+APACHE_COUNTRIES = ['AU', 'NZ', 'US', 'CN', 'GB', 'DE', 'ID', None]
+
+IPS = ['203.0.113.{}'.format(i) for i in range(256)]
+
+SARA_COLLECTIONS = ['S1', 'S2', 'S3']
+SARA_METHODS = ['GET', 'POST']
+SARA_SERVICES = ['search', 'download']
+
+
+def lpgs_log(record, padding=50):
+    """
+    The content of an lpgs_out.xml, with `padding` messages preceding
+    the processing request so that the logs resemble the size of the
+    real ones.
+
+    :param record:
+        A dict containing the counters, level1_name, pass_id and
+        pass_name.
+    """
+    messages = '\n'.join(MESSAGE_TEMPLATE.format(i) for i in range(padding))
+
+    return LPGS_TEMPLATE.format(messages=messages, **record)
+
+
+def synthetic_scenes(n, sensors=None, scenes_per_pass=20, sys_fraction=0.1,
+                     failure_fraction=0.01, packagetmp_fraction=0.01,
+                     seed=0):
+    """
+    Generate `n` scenes, grouped into passes of consecutive rows along
+    a path.
+
+    :return:
+        A list of dicts containing the sensor, level1_name, variant
+        ('oth', 'sys', 'failure' or 'packagetmp') and the fields of
+        the LPGS log.
+    """
+    if sensors is None:
+        sensors = sorted(SENSORS)
+
+    rng = random.Random(seed)
+    scenes = []
+    for i in range(n):
+        pass_number = i // scenes_per_pass
+        sensor = sensors[pass_number % len(sensors)]
+        sensor_id, station_id = SENSORS[sensor]
+
+        # each pass is a day, stepping through 2016
+        date = (pandas.Timestamp('2016-01-01') +
+                pandas.Timedelta(days=pass_number % 366))
+        date = date.strftime('%Y%m%d')
+        path = 88 + pass_number % 30
+        row = 66 + i % scenes_per_pass
+
+        draw = rng.random()
+        if draw < failure_fraction:
+            variant = 'failure'
+        elif draw < failure_fraction + packagetmp_fraction:
+            variant = 'packagetmp'
+        elif draw < failure_fraction + packagetmp_fraction + sys_fraction:
+            variant = 'sys'
+        else:
+            variant = 'oth'
+
+        if variant == 'sys':
+            product = 'SYS_P31_GALPGS01'
+        else:
+            product = 'OTH_P51_GALPGS01'
+
+        level1_name = '{}_{}_{}-{}_{:03d}_{:03d}_{}'.format(
+            sensor.upper(), sensor_id, product, station_id, path, row, date)
+
+        l1_success = rng.randint(0, 30)
+        scenes.append({'sensor': sensor,
+                       'year': date[0:4],
+                       'month': date[4:6],
+                       'level1_name': level1_name,
+                       'variant': variant,
+                       'pass_id': '{}-{}'.format(sensor.upper(), date),
+                       'pass_name': '{}_{}_{}_{:06d}'.format(
+                           sensor.upper(), sensor_id, date, pass_number),
+                       'L0_success': rng.randint(0, 1),
+                       'L0_fail': rng.randint(0, 1),
+                       'L1_success': l1_success,
+                       'L1_fail': rng.randint(0, 3),
+                       'L1_L1G': rng.randint(0, 5),
+                       'L1_L1Gt': rng.randint(0, 5),
+                       'L1_L1T': l1_success})
+
+    return scenes
+
+
+def local_config(root):
+    """
+    The default `cophub.config.Config`, with each storage root
+    residing under `root`, eg {root}/rs0.
+    """
+    return Config({'roots': {name: pjoin(root, name)
+                             for name in DEFAULTS['roots']}})
+
+
+def level1_dir(config, scene):
+    """
+    The directory of a scene's level1 product.
+    The failure and packagetmp variants reside in a subdirectory
+    of the month.
+    """
+    parts = [config.level1_dir(scene['sensor']), scene['year'],
+             scene['month']]
+    if scene['variant'] in ('failure', 'packagetmp'):
+        parts.append(scene['variant'])
+    parts.append(scene['level1_name'])
+
+    return pjoin(*parts)
+
+
+def write_file(fname, content):
+    parent = dirname(fname)
+    if not exists(parent):
+        os.makedirs(parent)
+
+    with open(fname, 'w') as outf:
+        outf.write(content)
+
+
+def make_level1_tree(config, n, children=True, children_fraction=0.8,
+                     padding=50, seed=0, **kwargs):
+    """
+    Write a synthetic level1 tree of `n` scenes.
+
+    :param config:
+        The `cophub.config.Config` declaring the level1 directories
+        and the children products, eg `local_config`.
+
+    :param children:
+        If set, then the ga-metadata.yaml of the children products of
+        the OTH products are written to their predicted locations.
+        Default is True.
+
+    :param children_fraction:
+        The fraction of the predicted children that exist.
+        Default is 0.8.
+
+    :param padding:
+        The number of messages written to each LPGS log.
+
+    :param kwargs:
+        Passed through to `synthetic_scenes`.
+
+    :return:
+        A list of (fname, size, mtime) of the LPGS logs, as per
+        `cophub.crawl.crawl`.
+    """
+    scenes = synthetic_scenes(n, seed=seed, **kwargs)
+
+    entries = []
+    for scene in scenes:
+        fname = pjoin(level1_dir(config, scene), 'lpgs', 'lpgs_out.xml')
+        write_file(fname, lpgs_log(scene, padding))
+        stat = os.stat(fname)
+        entries.append((fname, stat.st_size, stat.st_mtime))
+
+    if children:
+        oth = [scene for scene in scenes if scene['variant'] == 'oth']
+        make_children(config.products, [s['level1_name'] for s in oth],
+                      children_fraction, seed)
+
+    return entries
+
+
+def make_children(registry, level1_names, fraction=0.8, seed=0):
+    """
+    Write the ga-metadata.yaml of each product in the `registry` for
+    a `fraction` of the level1 products.
+    """
+    components = parse_level1_names(pandas.Series(level1_names,
+                                                  dtype=object))
+    names = product_names(components, registry=registry)
+
+    rng = random.Random(seed)
+    for col in names.columns:
+        product = col[:-len('_name')]
+        for fname, sensor in zip(names[col], components['sensor']):
+            if pandas.isnull(fname) or rng.random() >= fraction:
+                continue
+            scene = fname.rsplit('/', 2)[1]
+            write_file(fname, METADATA_TEMPLATE.format(scene=scene,
+                                                       product=product,
+                                                       sensor=sensor))
+
+
+def _days(month, n, rng):
+    start = pandas.Timestamp(month)
+    ndays = start.days_in_month
+    seconds = rng.integers(0, ndays * 86400, n)
+
+    return start + pandas.to_timedelta(seconds, unit='s')
+
+
+def make_apache_log(fname, n, month='2018-06', seed=0):
+    """
+    Write a synthetic Apache log of `n` records for a month.
+    """
+    rng = numpy.random.default_rng(seed)
+    traffic_browse = rng.integers(0, 10**6, n)
+    traffic_data = rng.integers(0, 10**10, n)
+
+    df = pandas.DataFrame({
+        'date': _days(month, n, rng).floor('D').strftime('%Y-%m-%dT%H:%M:%S'),
+        'ip': rng.choice(IPS, n),
+        'country': rng.choice(numpy.array(APACHE_COUNTRIES, dtype=object), n),
+        'project': 'fj7',
+        'project_name': 'Sentinel Australasia Regional Access',
+        'dataset': rng.choice(APACHE_DATASETS, n),
+        'service': rng.choice(APACHE_SERVICES, n),
+        'file_type': rng.choice(['zip', 'nc', 'xml'], n),
+        'access_type': 'data',
+        'platform': rng.choice(['linux', 'windows', 'mac'], n),
+        'hits': rng.integers(1, 50, n),
+        'traffic_browse': traffic_browse,
+        'traffic_browse_mb': traffic_browse / 2**20,
+        'traffic_browse_gb': traffic_browse / 2**30,
+        'traffic_data': traffic_data,
+        'traffic_data_mb': traffic_data / 2**20,
+        'traffic_data_gb': traffic_data / 2**30})
+    df.to_csv(fname, index=False)
+
+
+def make_sara_log(fname, n, month='2018-06', seed=0):
+    """
+    Write a synthetic SARA log of `n` records for a month.
+    """
+    rng = numpy.random.default_rng(seed)
+    collection = rng.choice(SARA_COLLECTIONS, n)
+
+    df = pandas.DataFrame({
+        'gid': numpy.arange(n),
+        'email': 'user{}@example.com'.format(seed),
+        'method': rng.choice(SARA_METHODS, n, p=[0.8, 0.2]),
+        'service': rng.choice(SARA_SERVICES, n),
+        'collection': collection,
+        'resourceid': rng.integers(0, 10**6, n),
+        'query': 'q',
+        'querytime': _days(month, n, rng).strftime('%Y-%m-%dT%H:%M:%S.%f'),
+        'url': 'https://copernicus.nci.org.au/sara.server/1.0/api/',
+        'ip': '10.0.0.1',
+        'productidentifier': pandas.Series(collection).str.cat(
+            rng.integers(0, 10**6, n).astype(str), sep='_')})
+    df.to_csv(fname, index=False)
+
+
+def main(command, out_dir, scenes, children, records, month, seed):
+    if command == 'tree':
+        import yaml
+
+        config = local_config(out_dir)
+        entries = make_level1_tree(config, scenes, children, seed=seed)
+        write_file(pjoin(out_dir, 'cophub.yaml'),
+                   yaml.safe_dump({'roots': config.roots},
+                                  default_flow_style=False))
+        print("Wrote {} LPGS logs to {}".format(len(entries), out_dir))
+    else:
+        if not exists(out_dir):
+            os.makedirs(out_dir)
+        make_apache_log(pjoin(out_dir, 'apache-{}.csv'.format(month)),
+                        records, month, seed)
+        make_sara_log(pjoin(out_dir, 'sara-{}.csv'.format(month)), records,
+                      month, seed)
+        print("Wrote the {} logs of {} records to {}".format(month, records,
+                                                              out_dir))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['tree', 'logs'],
+                        help="Generate a level1 tree, or the NCI logs.")
+    parser.add_argument('out_dir', help="The directory to write to.")
+    parser.add_argument('--scenes', type=int, default=10000,
+                        help="The number of level1 scenes. Default is 10000")
+    parser.add_argument('--no-children', dest='children',
+                        action='store_false',
+                        help="Don't write the children products.")
+    parser.add_argument('--records', type=int, default=1000000,
+                        help=("The number of records per log. "
+                              "Default is 1000000"))
+    parser.add_argument('--month', default='2018-06',
+                        help="The month of the logs. Default is 2018-06")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="The random seed. Default is 0")
+
+    parsed_args = parser.parse_args()
+    main(parsed_args.command, parsed_args.out_dir, parsed_args.scenes,
+         parsed_args.children, parsed_args.records, parsed_args.month,
+         parsed_args.seed)
@@ -0,0 +1,3 @@
+"""
+Utilities for compiling the collection completeness summary reports.
+"""
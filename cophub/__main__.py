@@ -0,0 +1,5 @@
+from cophub.cli import cli
+
+
+if __name__ == '__main__':
+    cli()
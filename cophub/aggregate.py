@@ -0,0 +1,81 @@
+"""
+Aggregation of the scene records into per-pass records.
+"""
+
+import pandas
+
+
+# the suffix of the children product existence columns
+EXISTS_SUFFIX = '_exists'
+
+PASS_COLUMNS = ['sensor',
+                'date',
+                'L0_fail',
+                'L0_success',
+                'L1_fail',
+                'L1_success',
+                'L1_L1G',
+                'L1_L1Gt',
+                'L1_L1T']
+
+
+def children_columns(df):
+    """
+    The children product existence columns of `df`, as a dict of
+    {existence column: product}, eg {'nbar_exists': 'nbar'}.
+    """
+    return {col: col[:-len(EXISTS_SUFFIX)] for col in df.columns
+            if col.endswith(EXISTS_SUFFIX)}
+
+
+def pass_summary(df, columns=None):
+    """
+    Summarise the scene records by pass.
+
+    Every scene of a pass reports the same pass counters, i.e.
+    L0_fail, L0_success, L1_fail/success, L1_L(G/Gt/T), so the first
+    record of each pass is kept, whilst the existence of each children
+    product (eg nbar, nbart and pq) is summed across the scenes of the
+    pass.
+
+    :param df:
+        A `pandas.DataFrame` of scene records containing the
+        `pass_name` column, the `columns` and the children
+        product existence columns.
+
+    :param columns:
+        The per-pass columns to retain. Default is `PASS_COLUMNS`.
+
+    :return:
+        A `pandas.DataFrame` with a row per pass, containing the
+        `pass_name`, the `columns`, and a count of each children
+        product.
+    """
+    if columns is None:
+        columns = PASS_COLUMNS
+
+    aggregations = {col: (col, 'first') for col in columns}
+    for exists_col, count_col in children_columns(df).items():
+        aggregations[count_col] = (exists_col, 'sum')
+
+    summary = df.groupby('pass_name', sort=False,
+                         observed=True).agg(**aggregations)
+
+    return summary.reset_index()
+
+
+def stack_products(oth_df, sys_df):
+    """
+    Stack the OTH and SYS scene records into a single table, keyed by
+    'oth' and 'sys'. The SYS products have no children, so their
+    existence columns are False and their names are empty.
+    """
+    sys_df = sys_df.copy()
+    children = children_columns(oth_df)
+    for col in children:
+        sys_df[col] = False
+    for col in children.values():
+        if '{}_name'.format(col) in oth_df.columns:
+            sys_df['{}_name'.format(col)] = ''
+
+    return pandas.concat([oth_df, sys_df], keys=['oth', 'sys'])
@@ -0,0 +1,316 @@
+"""
+Render the per-pass footprint maps as a multi-page PDF atlas.
+
+The base layer (eg Australia from TM_WORLD_BORDERS) is drawn once and
+rasterised into a `BaseMap`. Each page then only shows that image and
+draws the footprints of a single pass over it. Pages are rendered in
+chunks by a pool of processes. Each worker receives the base map once
+when it starts, and writes its chunk to a temporary PDF. The chunks
+are then merged, in order, into the atlas.
+
+    basemap = BaseMap.from_file(tm_fname, where={'NAME': 'Australia'})
+    render_atlas(pages(oth_gdf, sys_gdf), 'ls8-2016-Apr-pass.pdf',
+                 basemap)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from os.path import join as pjoin
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from cophub.passes import SELECTION_PATTERN, selection_bounds
+
+
+# the base map of each worker process, see `_init_worker`
+_BASEMAP = None
+
+
+class BaseMap(object):
+    """
+    A rasterised base layer, drawn as an image on each page.
+
+    :param image:
+        An RGBA array of the rendered base layer.
+
+    :param extent:
+        The (xmin, xmax, ymin, ymax) covered by `image`.
+    """
+
+    def __init__(self, image, extent):
+        self.image = image
+        self.extent = extent
+
+    @classmethod
+    def from_frame(cls, gdf, dpi=150, pad=2.0, **kwargs):
+        """
+        Rasterise a `geopandas.GeoDataFrame`.
+
+        :param dpi:
+            The resolution of the raster. Default is 150.
+
+        :param pad:
+            The margin added around the bounds of the layer, in the
+            units of its coordinate reference system. Default is 2.0.
+
+        :param kwargs:
+            Passed through to `GeoDataFrame.plot`.
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        xmin, ymin, xmax, ymax = gdf.total_bounds
+        extent = (xmin - pad, xmax + pad, ymin - pad, ymax + pad)
+
+        # size the figure to the aspect ratio of the extent
+        width = 8.0
+        height = width * (extent[3] - extent[2]) / (extent[1] - extent[0])
+
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+        gdf.plot(ax=ax, **kwargs)
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        canvas.draw()
+
+        image = numpy.asarray(canvas.buffer_rgba()).copy()
+
+        return cls(image, extent)
+
+    @classmethod
+    def from_file(cls, fname, where=None, **kwargs):
+        """
+        Rasterise a polygon layer, optionally subset by its attributes.
+
+        :param where:
+            A dict of {attribute: value} selecting the features,
+            eg {'NAME': 'Australia'}. Default is None, i.e. every
+            feature.
+        """
+        import geopandas
+
+        gdf = geopandas.read_file(fname)
+        for attribute, value in (where or {}).items():
+            gdf = gdf[gdf[attribute] == value]
+
+        return cls.from_frame(gdf, **kwargs)
+
+    def draw(self, ax):
+        """
+        Draw the base map onto `ax`.
+        """
+        ax.imshow(self.image, extent=self.extent, origin='upper',
+                  interpolation='nearest', zorder=0)
+
+
+def pages(oth_gdf, sys_gdf=None, column='pass_id'):
+    """
+    Group the footprints into a page per pass.
+
+    :param oth_gdf:
+        A `geopandas.GeoDataFrame` of the OTH scene footprints.
+
+    :param sys_gdf:
+        An optional `geopandas.GeoDataFrame` of the SYS scene
+        footprints, outlined on the page of the same pass.
+
+    :return:
+        A list of (title, oth footprints, sys footprints) tuples,
+        sorted by title, where the sys footprints may be None.
+    """
+    sys_grps = {} if sys_gdf is None else \
+        dict(list(sys_gdf.groupby(column, observed=True)))
+
+    result = []
+    for name, grp in oth_gdf.groupby(column, observed=True):
+        result.append((str(name), grp, sys_grps.get(name)))
+
+    return result
+
+
+def draw_page(fig, basemap, title, oth, sys=None):
+    """
+    Draw a single page; the OTH footprints coloured by path, and the
+    SYS footprints outlined in red.
+    """
+    ax = fig.add_subplot(1, 1, 1)
+    basemap.draw(ax)
+
+    oth.plot('path', ax=ax, alpha=0.6, zorder=1)
+    if sys is not None and len(sys):
+        sys.plot(ax=ax, facecolor='none', edgecolor='red', zorder=2)
+
+    # expand the view to any footprints outside of the base map
+    xmin, xmax, ymin, ymax = basemap.extent
+    bounds = [oth.total_bounds]
+    if sys is not None and len(sys):
+        bounds.append(sys.total_bounds)
+    bounds = numpy.array(bounds)
+    ax.set_xlim(min(xmin, bounds[:, 0].min()), max(xmax, bounds[:, 2].max()))
+    ax.set_ylim(min(ymin, bounds[:, 1].min()), max(ymax, bounds[:, 3].max()))
+    ax.set_aspect('equal')
+    ax.set_title(title)
+
+
+def _init_worker(basemap):
+    global _BASEMAP
+    _BASEMAP = basemap
+
+
+def render_chunk(args):
+    """
+    Render a chunk of pages into a single PDF.
+
+    :param args:
+        A tuple of (out_fname, pages), see `pages`.
+
+    :return:
+        The name of the PDF written.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    out_fname, chunk = args
+    with PdfPages(out_fname) as pdf:
+        for title, oth, sys in chunk:
+            fig = Figure(figsize=(8, 8))
+            draw_page(fig, _BASEMAP, title, oth, sys)
+            pdf.savefig(fig)
+
+    return out_fname
+
+
+def merge_pdfs(fnames, out_fname):
+    """
+    Concatenate the pages of `fnames` into `out_fname`.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for fname in fnames:
+        writer.append(fname)
+
+    with open(out_fname, 'wb') as outf:
+        writer.write(outf)
+
+    writer.close()
+
+
+def render_atlas(page_list, out_fname, basemap, max_workers=None,
+                 chunksize=8):
+    """
+    Render the pages into a single PDF.
+
+    :param page_list:
+        A list of (title, oth footprints, sys footprints) tuples,
+        see `pages`.
+
+    :param out_fname:
+        The name of the PDF to write.
+
+    :param basemap:
+        A `BaseMap`, drawn on each page.
+
+    :param max_workers:
+        The number of processes. Default is None, i.e. the executor's
+        default. If 1, then the pages are rendered in this process.
+
+    :param chunksize:
+        The number of pages rendered by each task. Default is 8.
+
+    :return:
+        The number of pages rendered.
+    """
+    if not page_list:
+        return 0
+
+    tmpdir = tempfile.mkdtemp(prefix='atlas-',
+                              dir=os.path.dirname(os.path.abspath(out_fname)))
+    try:
+        tasks = [(pjoin(tmpdir, '{:06d}.pdf'.format(i)),
+                  page_list[i:i + chunksize])
+                 for i in range(0, len(page_list), chunksize)]
+
+        if max_workers == 1:
+            _init_worker(basemap)
+            fnames = [render_chunk(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_worker,
+                                     initargs=(basemap,)) as executor:
+                fnames = list(executor.map(render_chunk, tasks))
+
+        merge_pdfs(fnames, out_fname)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    return len(page_list)
+
+
+def month_selections(sensor, start, end):
+    """
+    The sensor-month selections, eg 'LS8-201604', spanning the
+    `start` and `end` dates inclusive.
+    """
+    months = pandas.period_range(pandas.Timestamp(start),
+                                 pandas.Timestamp(end), freq='M')
+
+    return ['{}-{}'.format(sensor, month.strftime('%Y%m'))
+            for month in months]
+
+
+def atlas_fname(selection, out_dir='.'):
+    """
+    The atlas name of a selection (see `cophub.passes.selection_bounds`),
+    eg 'LS8-201604' -> 'ls8-2016-Apr-pass.pdf', 'LS8' -> 'ls8-pass.pdf'
+    or 'LS8-2016' -> 'ls8-2016-pass.pdf'.
+    """
+    # raises a ValueError for an invalid selection
+    selection_bounds(selection)
+
+    match = SELECTION_PATTERN.match(selection)
+    date = match.group('date') or ''
+
+    parts = [match.group('sensor').lower()]
+    if date:
+        parts.append(date[:4])
+    if len(date) >= 6:
+        month = pandas.Period('{}-{}'.format(date[:4], date[4:6]), freq='M')
+        parts.append(month.strftime('%b'))
+    if len(date) == 8:
+        parts.append(date[6:])
+    parts.append('pass.pdf')
+
+    return pjoin(out_dir, '-'.join(parts))
+
+
+def render_months(load_pages, sensor, start, end, basemap, out_dir='.',
+                  max_workers=None, chunksize=8):
+    """
+    Render an atlas per sensor-month between the `start` and `end`
+    dates, eg for the entire mission.
+
+    :param load_pages:
+        A function taking a sensor-month selection, eg 'LS8-201604',
+        and returning its list of pages, see `pages`.
+
+    :return:
+        A dict of {atlas filename: number of pages}, excluding the
+        months without any passes.
+    """
+    result = {}
+    for selection in month_selections(sensor, start, end):
+        page_list = load_pages(selection)
+        if not page_list:
+            continue
+
+        out_fname = atlas_fname(selection, out_dir)
+        result[out_fname] = render_atlas(page_list, out_fname, basemap,
+                                         max_workers, chunksize)
+
+    return result
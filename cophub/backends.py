@@ -0,0 +1,412 @@
+"""
+Execution backends sharing a single interface; apply a function to
+blocks of work items and gather the partial results in one place.
+
+    results = backend.map_gather(func, items)
+    if backend.is_root:
+        ...  # reduce the results
+
+`MPIBackend` is used for jobs spanning many nodes, and
+`FuturesBackend` for workstation runs using `concurrent.futures`.
+
+Both backends can schedule the work dynamically; the work items are
+split into chunks which are handed out on demand, so that workers
+finishing early take on more of the work. A chunk raising an exception
+is retried on another worker, and the throughput of each worker is
+recorded.
+"""
+
+from collections import deque
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait, FIRST_COMPLETED)
+import os
+import threading
+import time
+import traceback
+
+
+# message tags used by the dynamic MPI scheduler
+TASK_TAG = 1
+RESULT_TAG = 2
+
+
+def partition(items, n):
+    """
+    Split `items` into `n` contiguous blocks of near equal size.
+    """
+    q, r = divmod(len(items), n)
+    blocks = []
+    start = 0
+    for i in range(n):
+        end = start + q + (1 if i < r else 0)
+        blocks.append(items[start:end])
+        start = end
+
+    return blocks
+
+
+def chunks(items, chunksize):
+    """
+    Split `items` into blocks of `chunksize`.
+    """
+    return [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+
+def run_timed(func, block):
+    """
+    Apply `func` to `block`.
+
+    :return:
+        A tuple of (result, error, worker, elapsed), where error is
+        the formatted traceback (or None), and worker identifies the
+        process and thread that did the work.
+    """
+    worker = '{}:{}'.format(os.getpid(), threading.current_thread().name)
+    st = time.time()
+    try:
+        result = func(block)
+        error = None
+    except Exception:
+        result = None
+        error = traceback.format_exc()
+
+    return result, error, worker, time.time() - st
+
+
+class Throughput(object):
+    """
+    Accumulate the number of chunks, items and seconds per worker.
+    """
+
+    def __init__(self):
+        self._workers = {}
+
+    def record(self, worker, nitems, elapsed, failed=False):
+        stats = self._workers.setdefault(worker, {'worker': worker,
+                                                  'chunks': 0,
+                                                  'failed_chunks': 0,
+                                                  'items': 0,
+                                                  'seconds': 0.0})
+        if failed:
+            stats['failed_chunks'] += 1
+        else:
+            stats['chunks'] += 1
+            stats['items'] += nitems
+        stats['seconds'] += elapsed
+
+    def summary(self):
+        """
+        A list of dicts, one per worker, including `items_per_second`.
+        """
+        rows = []
+        for worker in sorted(self._workers, key=str):
+            stats = dict(self._workers[worker])
+            seconds = stats['seconds']
+            stats['items_per_second'] = (stats['items'] / seconds
+                                         if seconds > 0 else 0.0)
+            rows.append(stats)
+
+        return rows
+
+    def report(self):
+        """
+        Format the summary as a table.
+        """
+        fmt = "{:>16} {:>8} {:>8} {:>10} {:>10} {:>12}"
+        lines = [fmt.format('worker', 'chunks', 'failed', 'items',
+                            'seconds', 'items/sec')]
+        for stats in self.summary():
+            lines.append(fmt.format(str(stats['worker']), stats['chunks'],
+                                    stats['failed_chunks'], stats['items'],
+                                    '{:.1f}'.format(stats['seconds']),
+                                    '{:.1f}'.format(
+                                        stats['items_per_second'])))
+
+        return '\n'.join(lines)
+
+
+class _Scheduler(object):
+    """
+    Book keeping for handing out chunks on demand, and retrying failed
+    chunks on a different worker.
+    """
+
+    def __init__(self, blocks, max_attempts):
+        self.blocks = blocks
+        self.max_attempts = max_attempts
+        self.pending = deque(range(len(blocks)))
+        self.failed_on = {i: set() for i in range(len(blocks))}
+        self.errors = {}
+        self.results = {}
+        self.outstanding = 0
+
+    @property
+    def finished(self):
+        return not self.pending and self.outstanding == 0
+
+    def next_for(self, worker):
+        """
+        The next chunk id suitable for `worker`, or None.
+        """
+        for _ in range(len(self.pending)):
+            chunk_id = self.pending.popleft()
+            if worker not in self.failed_on[chunk_id]:
+                self.outstanding += 1
+                return chunk_id
+            self.pending.append(chunk_id)
+
+        return None
+
+    def done(self, chunk_id, result):
+        self.outstanding -= 1
+        self.results[chunk_id] = result
+
+    def failed(self, chunk_id, worker, error, nworkers):
+        self.outstanding -= 1
+        self.failed_on[chunk_id].add(worker)
+        self.errors[chunk_id] = error
+
+        attempts = len(self.failed_on[chunk_id])
+        if attempts < min(self.max_attempts, nworkers):
+            self.pending.append(chunk_id)
+
+    def ordered_results(self):
+        return [self.results[i] for i in sorted(self.results)]
+
+    def unfinished(self):
+        """
+        A dict of {chunk_id: error} for the chunks that never succeeded.
+        """
+        return {i: self.errors[i] for i in range(len(self.blocks))
+                if i not in self.results}
+
+
+class MPIBackend(object):
+    """
+    Process the work items across the ranks of an MPI job, and gather
+    the partial results onto the root rank.
+
+    :param comm:
+        An MPI communicator. Default is None, i.e. `MPI.COMM_WORLD`.
+
+    :param root:
+        The rank receiving the results. Default is 0.
+
+    :param dynamic:
+        If set, then the root hands out chunks of the work items on
+        demand to the other ranks, retrying failed chunks on another
+        rank. Otherwise each rank is statically assigned a contiguous
+        block of the work items. Default is False.
+
+    :param chunksize:
+        The number of work items per chunk when `dynamic` is set.
+        Default is 1000.
+
+    :param max_attempts:
+        The number of ranks a chunk is attempted on before it is
+        given up on. Default is 3.
+    """
+
+    def __init__(self, comm=None, root=0, dynamic=False, chunksize=1000,
+                 max_attempts=3):
+        # importing mpi4py initialises MPI, so only do so when needed
+        from mpi4py import MPI
+
+        self.MPI = MPI
+        self.comm = MPI.COMM_WORLD if comm is None else comm
+        self.root = root
+        self.dynamic = dynamic
+        self.chunksize = chunksize
+        self.max_attempts = max_attempts
+        self.throughput = Throughput()
+        self.failures = {}
+
+    @property
+    def rank(self):
+        return self.comm.rank
+
+    @property
+    def size(self):
+        return self.comm.size
+
+    @property
+    def is_root(self):
+        return self.comm.rank == self.root
+
+    def map_gather(self, func, items):
+        """
+        Apply `func` to blocks of `items`.
+
+        :return:
+            On the root rank, a list containing the result for each
+            block. None on every other rank. The blocks that failed
+            are recorded in `failures` rather than raised.
+        """
+        if self.dynamic and self.size > 1:
+            if self.is_root:
+                return self._master(items)
+            self._worker(func)
+            return None
+
+        block = partition(items, self.size)[self.rank]
+        result, error, _, elapsed = run_timed(func, block)
+
+        gathered = self.comm.gather((self.rank, len(block), elapsed, result,
+                                     error), root=self.root)
+
+        if not self.is_root:
+            return None
+
+        results = []
+        for rank, nitems, elapsed, result, error in gathered:
+            if error is None:
+                results.append(result)
+                self.throughput.record(rank, nitems, elapsed)
+            else:
+                self.failures[rank] = error
+                self.throughput.record(rank, nitems, elapsed, failed=True)
+
+        return results
+
+    def _master(self, items):
+        blocks = chunks(items, self.chunksize)
+        scheduler = _Scheduler(blocks, self.max_attempts)
+        nworkers = self.size - 1
+        idle = []
+
+        def assign(worker):
+            chunk_id = scheduler.next_for(worker)
+            if chunk_id is None:
+                idle.append(worker)
+            else:
+                task = (chunk_id, blocks[chunk_id])
+                self.comm.send(task, dest=worker, tag=TASK_TAG)
+
+        for worker in range(self.size):
+            if worker != self.root:
+                assign(worker)
+
+        status = self.MPI.Status()
+        while not scheduler.finished:
+            msg = self.comm.recv(source=self.MPI.ANY_SOURCE, tag=RESULT_TAG,
+                                 status=status)
+            worker = status.Get_source()
+            chunk_id, result, error, elapsed = msg
+            nitems = len(blocks[chunk_id])
+
+            if error is None:
+                scheduler.done(chunk_id, result)
+                self.throughput.record(worker, nitems, elapsed)
+            else:
+                scheduler.failed(chunk_id, worker, error, nworkers)
+                self.throughput.record(worker, nitems, elapsed, failed=True)
+
+            assign(worker)
+
+            # a retried chunk may now suit one of the idle ranks
+            for _ in range(len(idle)):
+                assign(idle.pop(0))
+
+        # stop every rank
+        for worker in range(self.size):
+            if worker != self.root:
+                self.comm.send(None, dest=worker, tag=TASK_TAG)
+
+        self.failures = scheduler.unfinished()
+
+        return scheduler.ordered_results()
+
+    def _worker(self, func):
+        while True:
+            task = self.comm.recv(source=self.root, tag=TASK_TAG)
+            if task is None:
+                break
+
+            chunk_id, block = task
+            result, error, _, elapsed = run_timed(func, block)
+            self.comm.send((chunk_id, result, error, elapsed), dest=self.root,
+                           tag=RESULT_TAG)
+
+
+class FuturesBackend(object):
+    """
+    Process chunks of the work items using a pool of processes
+    (or threads), gathering the partial results in the calling process.
+    The chunks are submitted up front and taken by whichever worker
+    is free; failed chunks are resubmitted.
+
+    :param max_workers:
+        The number of workers. Default is None, i.e. the executor's
+        default.
+
+    :param chunksize:
+        The number of work items passed to each call of the function.
+        Default is 1000.
+
+    :param threads:
+        If set, then use a pool of threads rather than processes.
+        Default is False.
+
+    :param max_attempts:
+        The number of times a chunk is attempted before it is given
+        up on. Default is 3.
+    """
+
+    rank = 0
+    size = 1
+    is_root = True
+
+    def __init__(self, max_workers=None, chunksize=1000, threads=False,
+                 max_attempts=3):
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.threads = threads
+        self.max_attempts = max_attempts
+        self.throughput = Throughput()
+        self.failures = {}
+
+    def map_gather(self, func, items):
+        """
+        Apply `func` to successive chunks of `items`.
+
+        :return:
+            A list containing the result for each chunk.
+        """
+        executor_class = ThreadPoolExecutor if self.threads else \
+            ProcessPoolExecutor
+
+        blocks = chunks(items, self.chunksize)
+        scheduler = _Scheduler(blocks, self.max_attempts)
+
+        with executor_class(max_workers=self.max_workers) as executor:
+            running = {}
+            while not scheduler.finished:
+                # a pool doesn't let us choose the worker, so any
+                # pending chunk may be submitted
+                chunk_id = scheduler.next_for(None)
+                while chunk_id is not None:
+                    future = executor.submit(run_timed, func,
+                                             blocks[chunk_id])
+                    running[future] = chunk_id
+                    chunk_id = scheduler.next_for(None)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_id = running.pop(future)
+                    result, error, worker, elapsed = future.result()
+                    nitems = len(blocks[chunk_id])
+                    if error is None:
+                        scheduler.done(chunk_id, result)
+                        self.throughput.record(worker, nitems, elapsed)
+                    else:
+                        # record the attempt; the pool's workers are
+                        # interchangeable, so count attempts instead
+                        attempt = len(scheduler.failed_on[chunk_id])
+                        scheduler.failed(chunk_id, attempt, error,
+                                         self.max_attempts)
+                        self.throughput.record(worker, nitems, elapsed,
+                                               failed=True)
+
+        self.failures = scheduler.unfinished()
+
+        return scheduler.ordered_results()
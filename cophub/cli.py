@@ -0,0 +1,211 @@
+"""
+The cophub command line interface.
+
+    python -m cophub run                 # bring every stage up to date
+    python -m cophub run collection      # only what collection needs
+    python -m cophub status
+    python -m cophub report --sara-fname ...
+
+The crawl, harvest, collection, collection-roi, gaps and plots scripts
+are declared as pipeline stages (see `cophub.dag`) by the files they
+read and write, so only the stages whose inputs have changed are rerun.
+
+The level1 tree isn't declared as an input of the crawl, as detecting
+a change to it requires the crawl itself. Once the manifest exists,
+the crawl is only rerun when asked to, eg:
+
+    python -m cophub run crawl --force
+"""
+
+import os
+from os.path import abspath, dirname, join as pjoin
+import shlex
+import sys
+
+import click
+
+from cophub.config import load_config
+from cophub.dag import Pipeline, Stage
+
+
+REPO_DIR = dirname(dirname(abspath(__file__)))
+SCRIPTS_DIR = pjoin(REPO_DIR, 'scripts')
+
+COLLECTION_FNAME = 'collection-completeness.h5'
+
+
+def atlas_name(selection):
+    """
+    The atlas of a sensor-month; see `cophub.atlas.atlas_fname`.
+    """
+    from cophub.atlas import atlas_fname
+
+    return atlas_fname(selection)
+
+
+def build_pipeline(workdir='.', manifest='ls578-lpgs_out.xml.txt',
+                   wrs2=None, tm=None, roi=None, selection='LS8-201604',
+                   launcher=None, check='mtime', config=None):
+    """
+    The collection completeness pipeline.
+
+    :param wrs2, tm, roi:
+        The WRS-2, world borders and ROI shapefiles. Default is None,
+        i.e. the reference shapefiles of the configuration.
+
+    :param launcher:
+        The command prefix used to run the harvest, eg 'mpiexec -n 16'.
+        Default is None, i.e. a pool of processes on this machine.
+
+    :param config:
+        The configuration file of the harvest and reference shapefiles,
+        see `cophub.config`.
+        Default is None, i.e. $COPHUB_CONFIG or the layout at NCI.
+
+    :return:
+        A `cophub.dag.Pipeline`.
+    """
+    reference = load_config(config).reference
+    wrs2 = reference('wrs2', wrs2)
+    tm = reference('tm', tm)
+    roi = reference('roi', roi)
+
+    python = sys.executable
+
+    def script(name):
+        return [python, pjoin(SCRIPTS_DIR, name)]
+
+    if launcher:
+        harvest = shlex.split(launcher) + script('ls_collections.py')
+    else:
+        harvest = script('ls_collections.py') + ['--backend', 'futures']
+    harvest += ['--manifest', manifest]
+
+    crawl = script('ls_collections.py') + ['--crawl', '--manifest', manifest]
+
+    harvest_inputs = [manifest]
+    crawl_inputs = []
+    if config is not None:
+        harvest += ['--config', config]
+        harvest_inputs.append(config)
+        crawl += ['--config', config]
+        crawl_inputs.append(config)
+
+    stages = [Stage('crawl', crawl, crawl_inputs, [manifest]),
+              Stage('harvest', harvest,
+                    harvest_inputs,
+                    [COLLECTION_FNAME]),
+              Stage('collection', script('collection.py') + ['--wrs2', wrs2],
+                    [COLLECTION_FNAME, wrs2],
+                    ['collection-merge2.h5', 'collection-monthly-counts.h5']),
+              Stage('collection-roi',
+                    script('collection_roi.py') + ['--wrs2', wrs2,
+                                                   '--roi', roi],
+                    [COLLECTION_FNAME, wrs2, roi],
+                    ['collection-monthly-counts-roi.h5']),
+              Stage('gaps',
+                    script('gaps.py') + ['--wrs2', wrs2, '--roi', roi],
+                    [COLLECTION_FNAME, wrs2, roi],
+                    ['collection-gaps.h5']),
+              Stage('plots',
+                    script('plots.py') + ['--selection', selection,
+                                          '--wrs2', wrs2, '--tm', tm],
+                    [COLLECTION_FNAME, wrs2, tm],
+                    [atlas_name(selection)])]
+
+    return Pipeline(stages, workdir, check)
+
+
+def pipeline_options(func):
+    """
+    The options declaring the pipeline's inputs.
+    """
+    options = [
+        click.option("--workdir", type=click.Path(file_okay=False),
+                     default='.', show_default=True,
+                     help="The directory the stages are run in."),
+        click.option("--manifest", default='ls578-lpgs_out.xml.txt',
+                     show_default=True,
+                     help="The manifest listing the LPGS logs."),
+        click.option("--wrs2",
+                     help=("The WRS-2 shapefile. Default is reference.wrs2 "
+                           "of the configuration.")),
+        click.option("--tm",
+                     help=("The TM world borders shapefile. Default is "
+                           "reference.tm of the configuration.")),
+        click.option("--roi",
+                     help=("The ROI polygon layer. Default is reference.roi "
+                           "of the configuration.")),
+        click.option("--selection", default='LS8-201604', show_default=True,
+                     help="The sensor-month plotted."),
+        click.option("--launcher",
+                     help="Run the harvest with eg 'mpiexec -n 16'."),
+        click.option("--check", type=click.Choice(['mtime', 'hash']),
+                     default='mtime', show_default=True,
+                     help="How changed inputs are detected."),
+        click.option("--config", envvar='COPHUB_CONFIG',
+                     help=("The YAML or TOML configuration of the harvest "
+                           "and reference shapefiles.")),
+    ]
+    for option in reversed(options):
+        func = option(func)
+
+    return func
+
+
+@click.group()
+def cli():
+    """
+    Collection completeness reporting.
+    """
+    # the scripts import cophub from the root of the repository
+    path = os.environ.get('PYTHONPATH')
+    os.environ['PYTHONPATH'] = REPO_DIR if not path else \
+        os.pathsep.join([REPO_DIR, path])
+
+
+@cli.command()
+@pipeline_options
+@click.argument("targets", nargs=-1)
+@click.option("--force", is_flag=True,
+              help="Run the stages even if they are up to date.")
+@click.option("--jobs", type=int, default=4, show_default=True,
+              help="The number of stages run at once.")
+def run(targets, force, jobs, **kwargs):
+    """
+    Bring the TARGETS stages (default is all of them), and whatever
+    they depend on, up to date.
+    """
+    pipeline = build_pipeline(**kwargs)
+    outcome = pipeline.run(targets or None, force, jobs)
+
+    if any(result in ('failed', 'blocked') for result in outcome.values()):
+        sys.exit(1)
+
+
+@cli.command()
+@pipeline_options
+@click.argument("targets", nargs=-1)
+def status(targets, **kwargs):
+    """
+    Show which stages are up to date.
+    """
+    pipeline = build_pipeline(**kwargs)
+    for name, fresh in pipeline.status(targets or None):
+        stage = pipeline.stages[name]
+        click.echo("{:16} {:10} {}".format(name,
+                                           'fresh' if fresh else 'stale',
+                                           ', '.join(stage.outputs)))
+
+
+@cli.command(add_help_option=False,
+             context_settings={'ignore_unknown_options': True,
+                               'allow_extra_args': True})
+@click.pass_context
+def report(ctx):
+    """
+    Report on the Apache and SARA logs; see `cophub.reporting`.
+    """
+    from cophub import reporting
+
+    reporting.main.main(ctx.args, prog_name='cophub report')
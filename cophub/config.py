@@ -0,0 +1,224 @@
+"""
+The configuration of the storage layout, the children product registry,
+the reference shapefiles and the reporting destinations.
+
+The defaults describe the layout at NCI. A YAML or TOML file need
+only declare what differs from them, eg to point the harvest at a
+mirrored or local staging copy of the products:
+
+    roots:
+      rs0: /scratch/staging/rs0
+
+or to register another product:
+
+    products:
+      fc:
+        path: "{rs0}/scenes/fc-scenes-tmp/{sensor}/{year}/{month}/output/fc/{scene}/ga-metadata.yaml"
+        scene: "{spacecraft_id}_{sensor_id}_FC_P54_GAFC01-{station_id}_{wrs_path}_{wrs_row}_{acquisition_date}"
+        sensors: [ls5, ls7, ls8]
+
+or to unregister one, eg `pq: false`, or to read the WRS-2, world
+borders and ROI shapefiles from elsewhere:
+
+    reference:
+      wrs2: /g/data/v10/reference/wrs2_descending.shp
+
+The storage roots are substituted into any template referencing them
+by name, eg {rs0}. The remaining fields of a product's path and scene
+templates are the components of the level1 names (see
+`cophub.names.parse_level1_names`). A product's path must end with
+`{scene}/{file}`, as the existence checks list each scene's parent
+directory (see `cophub.exists`).
+
+The configuration file is given by the --config option of the
+scripts, or the COPHUB_CONFIG environment variable.
+"""
+
+from collections import namedtuple
+import copy
+import os
+from os.path import splitext
+from string import Formatter
+
+
+CONFIG_VARIABLE = 'COPHUB_CONFIG'
+
+SCENE_FORMAT = ('{spacecraft_id}_{sensor_id}_{product}-{station_id}_'
+                '{wrs_path}_{wrs_row}_{acquisition_date}')
+
+DEFAULTS = {
+    'roots': {'v10': '/g/data/v10',
+              'rs0': '/g/data/rs0'},
+    'level1': {'path': '{v10}/reprocess/{sensor}/level1',
+               'sensors': ['ls5', 'ls7', 'ls8']},
+    'products': {
+        'nbar': {
+            'path': '{rs0}/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/'
+                    'output/nbar/{scene}/ga-metadata.yaml',
+            'scene': SCENE_FORMAT.replace('{product}', 'NBAR_P54_GANBAR01'),
+            'sensors': ['ls5', 'ls7', 'ls8']},
+        'nbart': {
+            'path': '{rs0}/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/'
+                    'output/nbart/{scene}/ga-metadata.yaml',
+            'scene': SCENE_FORMAT.replace('{product}', 'NBART_P54_GANBART01'),
+            'sensors': ['ls5', 'ls7', 'ls8']},
+        'pq': {
+            'path': '{rs0}/scenes/pq-scenes-tmp/{sensor}/{year}/{month}/'
+                    'output/pqa/{scene}/ga-metadata.yaml',
+            'scene': SCENE_FORMAT.replace('{product}', 'PQ_P55_GAPQ01'),
+            'sensors': ['ls5', 'ls7', 'ls8']},
+    },
+    'reference': {
+        'wrs2': 'wrs2-descending/wrs2_descending.shp',
+        'tm': 'tm-world-borders/TM_WORLD_BORDERS-0.3.shp',
+        # any polygon layer, eg TM_WORLD_BORDERS with NAME == Australia
+        'roi': 'ga-nominal-scenes/ADGC_v2_Area_of_Interest.shp'},
+    'reporting': {'keyfile': None,
+                  'apache_folder': '1PaI4V6YKFlAkNAuUNnDRwVDQMkD4LS8L',
+                  'sara_folder': '1-YUyrfhKgmgIQct2-7V5DPJrW7vVmocK'},
+}
+
+Product = namedtuple('Product', ['name', 'path', 'scene', 'sensors'])
+
+
+def substitute(template, values):
+    """
+    Substitute the `values` into the fields of `template` that they
+    name, leaving every other field in place.
+    """
+    parts = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is None:
+            continue
+        if field in values:
+            value = str(values[field])
+            parts.append(value.replace('{', '{{').replace('}', '}}'))
+        else:
+            parts.append('{' + field +
+                         ('!' + conversion if conversion else '') +
+                         (':' + spec if spec else '') + '}')
+
+    return ''.join(parts)
+
+
+def merge(base, override):
+    """
+    Recursively merge the dict `override` into a copy of `base`.
+    """
+    result = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+
+    return result
+
+
+def read_file(fname):
+    """
+    Read a YAML (.yaml, .yml) or TOML (.toml) configuration file.
+    """
+    ext = splitext(fname)[1].lower()
+    if ext in ('.yaml', '.yml'):
+        import yaml
+
+        with open(fname) as src:
+            return yaml.safe_load(src) or {}
+    elif ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+
+        with open(fname, 'rb') as src:
+            return tomllib.load(src)
+
+    raise ValueError("Unknown configuration format: {}".format(fname))
+
+
+class Config(object):
+    """
+    The storage layout, product registry, reference shapefiles and
+    reporting destinations.
+
+    :param data:
+        A dict overriding any of the `DEFAULTS`.
+    """
+
+    def __init__(self, data=None):
+        self.data = merge(DEFAULTS, data or {})
+        self.roots = self.data['roots']
+        self.products = self._registry()
+
+    def _registry(self):
+        registry = {}
+        for name, spec in sorted(self.data['products'].items()):
+            # a product is unregistered by setting it to false
+            if not spec:
+                continue
+
+            path = substitute(spec['path'], self.roots)
+            parts = path.rsplit('/', 2)
+            if len(parts) != 3 or parts[1] != '{scene}':
+                msg = "The path of product {} must end with {{scene}}/{{file}}"
+                raise ValueError(msg.format(name))
+
+            sensors = spec.get('sensors', self.data['level1']['sensors'])
+            registry[name] = Product(name, path,
+                                     substitute(spec['scene'], self.roots),
+                                     list(sensors))
+
+        return registry
+
+    def level1_dir(self, sensor):
+        """
+        The level1 directory of a sensor, eg 'ls5'.
+        """
+        path = substitute(self.data['level1']['path'], self.roots)
+
+        return path.format(sensor=sensor)
+
+    @property
+    def level1_dirs(self):
+        """
+        The level1 directory of each sensor.
+        """
+        return [self.level1_dir(sensor)
+                for sensor in self.data['level1']['sensors']]
+
+    def reference(self, name, fname=None):
+        """
+        The reference shapefile `name`, one of 'wrs2', 'tm' or 'roi',
+        unless `fname` is given.
+        """
+        if fname is not None:
+            return fname
+
+        return self.data['reference'][name]
+
+    @property
+    def reporting(self):
+        return self.data['reporting']
+
+
+def load_config(fname=None):
+    """
+    Load the configuration.
+
+    :param fname:
+        A YAML or TOML file. Default is None, i.e. the file named by
+        the COPHUB_CONFIG environment variable, or if that isn't set,
+        the `DEFAULTS`.
+
+    :return:
+        A `Config`.
+    """
+    if fname is None:
+        fname = os.environ.get(CONFIG_VARIABLE)
+
+    if fname is None:
+        return Config()
+
+    return Config(read_file(fname))
@@ -0,0 +1,152 @@
+"""
+Concurrent discovery of the LPGS logs (lpgs_out.xml) within the
+level1 trees, and the manifest recording what was found.
+
+Walking a tree on a parallel filesystem is limited by the latency of
+the metadata requests rather than by throughput, so many directories
+are listed concurrently using a pool of threads.
+
+An LPGS log resides at `{level1_name}/{subdirectory}/lpgs_out.xml`,
+so nothing deeper than one level below a level1 product directory
+is listed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import functools
+import os
+import re
+
+
+LPGS_LOG = 'lpgs_out.xml'
+
+# eg LS7_ETM_OTH_P51_GALPGS01-002_090_070_20160401
+LEVEL1_PATTERN = re.compile(r'LS\d_')
+
+
+def scan_directory(path, level1_depth=None):
+    """
+    List a single directory.
+
+    :param path:
+        The directory to list.
+
+    :param level1_depth:
+        The depth of `path` below a level1 product directory, or None
+        if `path` is not within one.
+
+    :return:
+        A tuple of ([(fname, size, mtime), ...], [(path, level1_depth),
+        ...]), i.e. the LPGS logs found, and the subdirectories that
+        still need to be listed.
+    """
+    logs = []
+    subdirs = []
+
+    try:
+        entries = list(os.scandir(path))
+    except (PermissionError, FileNotFoundError):
+        return logs, subdirs
+
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+
+        if entry.is_dir(follow_symlinks=False):
+            if level1_depth is None:
+                if LEVEL1_PATTERN.match(entry.name):
+                    subdirs.append((entry.path, 0))
+                else:
+                    subdirs.append((entry.path, None))
+            elif level1_depth == 0:
+                subdirs.append((entry.path, 1))
+            # anything deeper can't hold an LPGS log
+        elif entry.name == LPGS_LOG and level1_depth == 1:
+            stat = entry.stat()
+            logs.append((entry.path, stat.st_size, int(stat.st_mtime)))
+
+    return logs, subdirs
+
+
+def _timed_scan(instrument, path, level1_depth=None):
+    """
+    `scan_directory`, timed as a 'listdir' of `instrument`.
+    """
+    with instrument.timed('listdir', path):
+        return scan_directory(path, level1_depth)
+
+
+def crawl(roots, nthreads=16, instrument=None):
+    """
+    Find every LPGS log contained within the given root directories.
+
+    :param roots:
+        A list of directories, eg the level1 directory of each sensor.
+
+    :param nthreads:
+        The number of directories to list concurrently.
+        Default is 16.
+
+    :param instrument:
+        An optional `cophub.instrument.Instrument` recording the time
+        taken to list each directory.
+
+    :return:
+        A list of (fname, size, mtime) tuples sorted by fname.
+    """
+    results = []
+
+    if instrument is None:
+        scan = scan_directory
+    else:
+        scan = functools.partial(_timed_scan, instrument)
+
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        pending = set()
+        for root in roots:
+            pending.add(executor.submit(scan, root))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                logs, subdirs = future.result()
+                results.extend(logs)
+                for path, level1_depth in subdirs:
+                    pending.add(executor.submit(scan, path, level1_depth))
+
+    results.sort()
+
+    return results
+
+
+def write_manifest(fname, entries):
+    """
+    Write the (fname, size, mtime) entries as tab separated lines.
+    """
+    with open(fname, 'w') as outf:
+        for entry in entries:
+            outf.write('{}\t{}\t{}\n'.format(*entry))
+
+
+def read_manifest(fname):
+    """
+    Read a manifest written by `write_manifest`. A plain list of
+    filenames, eg as produced by `find`, is also accepted, in which
+    case the size and mtime are None.
+
+    :return:
+        A list of (fname, size, mtime) tuples.
+    """
+    entries = []
+    with open(fname) as src:
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+
+            fields = line.split('\t')
+            if len(fields) == 3:
+                entries.append((fields[0], int(fields[1]), int(fields[2])))
+            else:
+                entries.append((fields[0], None, None))
+
+    return entries
@@ -0,0 +1,327 @@
+"""
+A minimal pipeline runner; stages declared by the files they read and
+write, run in dependency order.
+
+A stage depends on every stage producing one of its inputs. Before a
+stage is run, a signature of its inputs (either the size and mtime,
+or the content hash of each file) and of its command is compared with
+the one recorded when it last succeeded. The stage is skipped if they
+match and its outputs exist. Otherwise it is run, and everything
+downstream of it sees the changed outputs and runs as well. Stages
+that don't depend on each other are run concurrently.
+
+    pipeline = Pipeline([Stage('harvest', [...], ['manifest.txt'],
+                               ['collection-completeness.h5']),
+                         ...])
+    pipeline.run(['collection'])
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
+import json
+import os
+from os.path import exists, isdir, join as pjoin, relpath
+import subprocess
+import threading
+import time
+
+
+STATE_FNAME = '.cophub-pipeline.json'
+
+# the outcome of each stage of a run
+RAN = 'ran'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+class Stage(object):
+    """
+    A step of the pipeline.
+
+    :param name:
+        The name of the stage.
+
+    :param command:
+        The command to run, as a list of arguments, or a function
+        taking no arguments.
+
+    :param inputs:
+        The files (or directories) the stage reads.
+
+    :param outputs:
+        The files (or directories) the stage writes.
+    """
+
+    def __init__(self, name, command, inputs=(), outputs=()):
+        self.name = name
+        self.command = command
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    def __repr__(self):
+        return 'Stage({!r})'.format(self.name)
+
+    def execute(self, cwd='.'):
+        """
+        Run the stage's command, raising on failure.
+        """
+        if callable(self.command):
+            self.command()
+        else:
+            subprocess.check_call(self.command, cwd=cwd)
+
+
+def _files(path):
+    """
+    The files of a path; itself if it is a file, otherwise the files
+    within the directory tree.
+    """
+    if not isdir(path):
+        return [path]
+
+    result = []
+    for root, dirs, fnames in os.walk(path):
+        dirs.sort()
+        result.extend(pjoin(root, fname) for fname in sorted(fnames))
+
+    return result
+
+
+def _file_hash(fname):
+    digest = hashlib.sha1()
+    with open(fname, 'rb') as src:
+        for block in iter(lambda: src.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def signature(stage, cwd='.', check='mtime'):
+    """
+    The signature of a stage's command and inputs.
+
+    :param check:
+        'mtime' to compare the size and mtime of each input, or 'hash'
+        to compare their contents. Default is 'mtime'.
+    """
+    command = getattr(stage.command, '__name__', None) or stage.command
+    items = [repr(command)]
+
+    for path in stage.inputs:
+        full_path = pjoin(cwd, path)
+        if not exists(full_path):
+            items.append('{}:missing'.format(path))
+            continue
+
+        for fname in _files(full_path):
+            name = relpath(fname, cwd)
+            if check == 'hash':
+                items.append('{}:{}'.format(name, _file_hash(fname)))
+            else:
+                stat = os.stat(fname)
+                items.append('{}:{}:{}'.format(name, stat.st_size,
+                                               stat.st_mtime_ns))
+
+    return hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest()
+
+
+class Pipeline(object):
+    """
+    A set of stages, run in dependency order.
+
+    :param stages:
+        A list of `Stage`'s.
+
+    :param cwd:
+        The directory the stages are run in, and that the inputs,
+        outputs and state file are relative to. Default is '.'.
+
+    :param check:
+        How changed inputs are detected; 'mtime' or 'hash'.
+        Default is 'mtime'.
+
+    :param state_fname:
+        The file recording the signature of each stage's last
+        successful run. Default is `STATE_FNAME`.
+    """
+
+    def __init__(self, stages, cwd='.', check='mtime',
+                 state_fname=STATE_FNAME):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cwd = cwd
+        self.check = check
+        self.state_fname = pjoin(cwd, state_fname)
+        self._lock = threading.Lock()
+
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    msg = "{} is an output of both {} and {}"
+                    raise ValueError(msg.format(output, producers[output],
+                                                stage.name))
+                producers[output] = stage.name
+
+        self.upstream = {stage.name: sorted({producers[path]
+                                             for path in stage.inputs
+                                             if path in producers})
+                         for stage in stages}
+
+        # fails on a cycle
+        self.order()
+
+    def order(self, targets=None):
+        """
+        The stages required by the `targets` (default is every stage),
+        in dependency order.
+        """
+        if targets is None:
+            targets = list(self.stages)
+
+        result = []
+        visiting = set()
+
+        def visit(name):
+            if name in result:
+                return
+            if name not in self.stages:
+                raise KeyError("Unknown stage: {}".format(name))
+            if name in visiting:
+                raise ValueError("Cycle in the pipeline at {}".format(name))
+
+            visiting.add(name)
+            for upstream in self.upstream[name]:
+                visit(upstream)
+            visiting.discard(name)
+            result.append(name)
+
+        for name in targets:
+            visit(name)
+
+        return result
+
+    def load_state(self):
+        """
+        The recorded state of each stage.
+        """
+        if not exists(self.state_fname):
+            return {}
+
+        with open(self.state_fname) as src:
+            return json.load(src)
+
+    def _record(self, name, sig, elapsed):
+        with self._lock:
+            state = self.load_state()
+            state[name] = {'signature': sig,
+                           'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           'elapsed': round(elapsed, 3)}
+            tmp_fname = self.state_fname + '.tmp'
+            with open(tmp_fname, 'w') as outf:
+                json.dump(state, outf, indent=2, sort_keys=True)
+            os.replace(tmp_fname, self.state_fname)
+
+    def is_fresh(self, name, state=None):
+        """
+        Is the stage up to date; are its outputs present, and are its
+        command and inputs unchanged since it last succeeded?
+        """
+        if state is None:
+            state = self.load_state()
+
+        stage = self.stages[name]
+        if not all(exists(pjoin(self.cwd, path)) for path in stage.outputs):
+            return False
+
+        recorded = state.get(name, {}).get('signature')
+
+        return recorded == signature(stage, self.cwd, self.check)
+
+    def status(self, targets=None):
+        """
+        A list of (stage, fresh) in dependency order. A stage is stale
+        if it, or anything upstream of it, is stale.
+        """
+        state = self.load_state()
+        stale = set()
+        result = []
+        for name in self.order(targets):
+            fresh = (self.is_fresh(name, state) and
+                     not stale.intersection(self.upstream[name]))
+            if not fresh:
+                stale.add(name)
+            result.append((name, fresh))
+
+        return result
+
+    def _run_stage(self, name, force):
+        stage = self.stages[name]
+        if not force and self.is_fresh(name):
+            return SKIPPED
+
+        # the signature is of the inputs as they were when the stage
+        # started
+        sig = signature(stage, self.cwd, self.check)
+        st = time.time()
+        stage.execute(self.cwd)
+        self._record(name, sig, time.time() - st)
+
+        return RAN
+
+    def run(self, targets=None, force=False, max_workers=4, log=print):
+        """
+        Run the stages required by the `targets`, skipping those that
+        are up to date.
+
+        :param targets:
+            The stages to bring up to date. Default is None, i.e. all
+            of them.
+
+        :param force:
+            If set, then run every stage regardless.
+
+        :param max_workers:
+            The number of stages run at once. Default is 4.
+
+        :param log:
+            A function called with a progress message.
+            Default is `print`.
+
+        :return:
+            A dict of {stage: outcome}, the outcome being one of
+            'ran', 'skipped', 'failed' or 'blocked' (upstream failed).
+        """
+        pending = self.order(targets)
+        outcome = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while pending or running:
+                # submit every stage whose upstream stages are done
+                for name in list(pending):
+                    upstream = [outcome.get(up) for up in self.upstream[name]]
+                    if any(up in (FAILED, BLOCKED) for up in upstream):
+                        outcome[name] = BLOCKED
+                        pending.remove(name)
+                        log("{}: blocked".format(name))
+                    elif all(up in (RAN, SKIPPED) for up in upstream):
+                        pending.remove(name)
+                        running[executor.submit(self._run_stage, name,
+                                                force)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outcome[name] = future.result()
+                    except Exception as exc:
+                        outcome[name] = FAILED
+                        log("{}: failed; {}".format(name, exc))
+                    else:
+                        log("{}: {}".format(name, outcome[name]))
+
+        return outcome
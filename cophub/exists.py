@@ -0,0 +1,101 @@
+"""
+Batched existence checks of the predicted child products.
+
+Each predicted product is of the form
+`.../output/{product}/{scene}/ga-metadata.yaml`. Rather than a `stat`
+per scene, each `.../output/{product}` directory is listed once, and
+every scene directory within it is answered from that listing. The
+directories are listed concurrently using a pool of threads.
+
+Note that a product counts as existing once its scene directory does,
+including one that is partial or still being written. Setting
+`verify` also checks the `ga-metadata.yaml` of each scene directory
+found, at the cost of a `stat` per existing product.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+
+import numpy
+import pandas
+
+
+def list_directory(path):
+    """
+    Return the set of subdirectory names contained within `path`.
+    A missing directory yields an empty set.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return {e.name for e in entries if e.is_dir()}
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return set()
+
+
+def _timed_listing(instrument, path):
+    """
+    `list_directory`, timed as a 'listdir' of `instrument`.
+    """
+    with instrument.timed('listdir', path):
+        return list_directory(path)
+
+
+def batch_exists(fnames, nthreads=16, verify=False, instrument=None):
+    """
+    Determine whether or not each of the predicted products exists.
+
+    :param fnames:
+        An iterable of predicted `ga-metadata.yaml` filenames.
+        Missing names (None or NaN) are reported as not existing.
+
+    :param nthreads:
+        The number of directories to list concurrently.
+        Default is 16.
+
+    :param verify:
+        If set, then the `ga-metadata.yaml` of each scene directory
+        found is also checked. Default is False, i.e. the existence
+        of the scene directory is sufficient.
+
+    :param instrument:
+        An optional `cophub.instrument.Instrument` recording the time
+        taken to list each directory.
+
+    :return:
+        A boolean `numpy.ndarray`.
+    """
+    fnames = pandas.Series(list(fnames), dtype=object)
+    result = numpy.zeros(len(fnames), dtype=bool)
+
+    valid = fnames.notnull().values
+    if not valid.any():
+        return result
+
+    # {parent}/{scene}/{leaf}
+    parts = fnames[valid].str.rsplit('/', n=2, expand=True)
+    parents = parts[0].values
+    scenes = parts[1].values
+
+    if instrument is None:
+        listing = list_directory
+    else:
+        listing = functools.partial(_timed_listing, instrument)
+
+    unique_parents = pandas.unique(parents)
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        listings = dict(zip(unique_parents,
+                            executor.map(listing, unique_parents)))
+
+    found = numpy.array([scene in listings[parent]
+                         for parent, scene in zip(parents, scenes)],
+                        dtype=bool)
+
+    if verify and found.any():
+        candidates = fnames[valid][found].values
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            found[found] = list(executor.map(os.path.exists, candidates))
+
+    result[valid] = found
+
+    return result
@@ -0,0 +1,316 @@
+"""
+Detection of the missing scenes; the acquisitions expected from the
+WRS-2 repeat cycle that aren't in the harvested collection.
+
+A Landsat satellite revisits each path every 16 days, and the
+adjacent path to the west (path + 1) is acquired 7 days after a path.
+So every acquisition of a sensor satisfies
+
+    (day - 7 * path) mod 16 == phase
+
+for a single phase per sensor, `day` being the number of days since
+1970-01-01. The phase is estimated as the modal value of the
+harvested scenes, from which the expected calendar of every path/row
+is generated between a start and end date.
+
+The expected and acquired scenes are each encoded as a single integer
+key (day, path, row), and the acquired keys (widened by a tolerance of
++/- days, as a scene straddling midnight UTC may be dated a day either
+side) are sorted once. Each expected key is then matched by a binary
+search, i.e. an anti-join over arrays rather than a loop over decades
+of dates and thousands of path/rows.
+
+    scenes = acquired_scenes(stack_products(oth_df, sys_df))
+    calendar, summary = expected_vs_acquired(scenes, pathrows=roi_keys)
+    missing = missing_scenes(calendar)
+    rasters = tile_completeness(calendar)
+"""
+
+import numpy
+import pandas
+
+from cophub.names import parse_level1_names
+from cophub.roi import pathrow_keys
+from cophub.schema import put_table
+from cophub.wrs2 import MAX_PATH, MAX_ROW
+
+
+REPEAT_CYCLE = 16
+
+# the number of days between the acquisition of a path and the
+# adjacent path to the west
+PATH_STEP = 7
+
+# the number of days either side of the expected date that an
+# acquisition is matched
+TOLERANCE = 1
+
+# key = day * DAY_SCALE + path * 1000 + row
+DAY_SCALE = 1000000
+
+RASTER_SHAPE = (MAX_PATH + 1, MAX_ROW + 1)
+
+GAPS_FNAME = 'collection-gaps.h5'
+
+
+def day_numbers(dates):
+    """
+    The number of days since 1970-01-01 of each date.
+    """
+    dates = numpy.asarray(dates, dtype='datetime64[ns]')
+
+    return dates.astype('datetime64[D]').astype('int64')
+
+
+def acquired_scenes(df):
+    """
+    The distinct (sensor, path, row, date) of the harvested scenes.
+
+    The acquisition date is taken from the `acquisition_date` column
+    of the compact schema (see `cophub.schema`), otherwise parsed from
+    the `level1_name`, otherwise the pass `date` is used.
+    """
+    if 'acquisition_date' in df.columns:
+        dates = df['acquisition_date']
+    elif 'level1_name' in df.columns:
+        dates = parse_level1_names(df['level1_name'])['date']
+    else:
+        dates = df['date']
+
+    scenes = pandas.DataFrame({'sensor': df['sensor'].astype(str).values,
+                               'path': df['path'].values.astype('int16'),
+                               'row': df['row'].values.astype('int16'),
+                               'date': numpy.asarray(dates,
+                                                     'datetime64[ns]')})
+    scenes = scenes[scenes['date'].notnull()]
+
+    return scenes.drop_duplicates().reset_index(drop=True)
+
+
+def cycle_phase(days, paths):
+    """
+    The phase of the repeat cycle of each acquisition.
+    """
+    days = numpy.asarray(days, dtype='int64')
+    paths = numpy.asarray(paths, dtype='int64')
+
+    return (days - PATH_STEP * paths) % REPEAT_CYCLE
+
+
+def estimate_phase(days, paths):
+    """
+    Estimate the phase of a sensor's repeat cycle.
+
+    :return:
+        A tuple of (phase, agreement), agreement being the fraction of
+        the acquisitions having the modal phase.
+    """
+    counts = numpy.bincount(cycle_phase(days, paths),
+                            minlength=REPEAT_CYCLE)
+    phase = int(counts.argmax())
+
+    return phase, counts[phase] / max(counts.sum(), 1)
+
+
+def expected_calendar(pathrows, phase, start_day, end_day):
+    """
+    The expected acquisitions of each path/row between two days
+    (inclusive).
+
+    :param pathrows:
+        An array of path/row keys (see `cophub.roi.pathrow_keys`).
+
+    :return:
+        A tuple of (pathrows, days) arrays; one element per expected
+        acquisition.
+    """
+    pathrows = numpy.asarray(pathrows, dtype='int64')
+    paths = pathrows // 1000
+
+    # the first day on or after start_day in phase with each path
+    first = start_day + (phase + PATH_STEP * paths - start_day) % \
+        REPEAT_CYCLE
+    counts = numpy.maximum((end_day - first) // REPEAT_CYCLE + 1, 0)
+
+    tiles = numpy.repeat(numpy.arange(len(pathrows)), counts)
+    offsets = numpy.arange(counts.sum()) - numpy.repeat(
+        numpy.cumsum(counts) - counts, counts)
+
+    return pathrows[tiles], first[tiles] + REPEAT_CYCLE * offsets
+
+
+def scene_keys(pathrows, days):
+    """
+    Combine the path/row keys and days into a single integer key.
+    """
+    return (numpy.asarray(days, dtype='int64') * DAY_SCALE +
+            numpy.asarray(pathrows, dtype='int64'))
+
+
+def sorted_unique(keys):
+    """
+    The sorted unique values of an integer array; a sort and a
+    comparison of neighbours, which is quicker than `numpy.unique`
+    for millions of keys.
+    """
+    keys = numpy.sort(numpy.asarray(keys, dtype='int64'))
+    if len(keys) == 0:
+        return keys
+
+    return keys[numpy.concatenate(([True], keys[1:] != keys[:-1]))]
+
+
+def matched(keys, sorted_keys):
+    """
+    A boolean array of which `keys` are contained in the sorted
+    array of unique `sorted_keys`.
+    """
+    if len(sorted_keys) == 0:
+        return numpy.zeros(len(keys), dtype=bool)
+
+    idx = numpy.searchsorted(sorted_keys, keys)
+    idx[idx == len(sorted_keys)] = 0
+
+    return sorted_keys[idx] == keys
+
+
+def expected_vs_acquired(scenes, pathrows=None, start=None, end=None,
+                         tolerance=TOLERANCE, phases=None):
+    """
+    Match the expected acquisitions of each sensor against those
+    acquired.
+
+    :param scenes:
+        A `pandas.DataFrame` as returned by `acquired_scenes`.
+
+    :param pathrows:
+        An array of the path/row keys expected to be acquired, eg the
+        ROI from `cophub.roi.roi_pathrows`. Default is None, i.e. every
+        path/row that a sensor has acquired.
+
+    :param start, end:
+        The dates bounding the calendar. Default is None, i.e. the
+        first and last acquisition of each sensor.
+
+    :param tolerance:
+        The number of days either side of the expected date that an
+        acquisition is matched. Default is `TOLERANCE`.
+
+    :param phases:
+        A dict of {sensor: phase} overriding the estimated phases.
+
+    :return:
+        A tuple of (calendar, summary). The calendar is a
+        `pandas.DataFrame` of the expected acquisitions; sensor, path,
+        row, date and whether it was `acquired`. The summary has a row
+        per sensor; the phase, the fraction of acquisitions agreeing
+        with it, and the number expected and acquired.
+    """
+    if phases is None:
+        phases = {}
+
+    calendars = []
+    summary = []
+    for sensor, grp in scenes.groupby('sensor', sort=True, observed=True):
+        days = day_numbers(grp['date'])
+        keys = pathrow_keys(grp['path'], grp['row'])
+
+        phase, agreement = estimate_phase(days, grp['path'])
+        phase = phases.get(sensor, phase)
+
+        tiles = sorted_unique(keys if pathrows is None else pathrows)
+
+        start_day = days.min() if start is None else day_numbers([start])[0]
+        end_day = days.max() if end is None else day_numbers([end])[0]
+
+        expected_pr, expected_days = expected_calendar(tiles, phase,
+                                                       start_day, end_day)
+
+        acquired = sorted_unique(numpy.concatenate(
+            [scene_keys(keys, days + shift)
+             for shift in range(-tolerance, tolerance + 1)]))
+        found = matched(scene_keys(expected_pr, expected_days), acquired)
+
+        calendar = pandas.DataFrame({
+            'path': (expected_pr // 1000).astype('int16'),
+            'row': (expected_pr % 1000).astype('int16'),
+            'date': expected_days.astype('datetime64[D]').astype(
+                'datetime64[ns]'),
+            'acquired': found})
+        calendar.insert(0, 'sensor', sensor)
+        calendars.append(calendar)
+
+        summary.append({'sensor': sensor,
+                        'phase': phase,
+                        'agreement': agreement,
+                        'path_rows': len(tiles),
+                        'expected': len(found),
+                        'acquired': int(found.sum())})
+
+    if calendars:
+        calendar = pandas.concat(calendars, ignore_index=True)
+    else:
+        calendar = pandas.DataFrame(columns=['sensor', 'path', 'row',
+                                             'date', 'acquired'])
+    calendar['sensor'] = calendar['sensor'].astype('category')
+
+    summary = pandas.DataFrame(summary, columns=['sensor', 'phase',
+                                                 'agreement', 'path_rows',
+                                                 'expected', 'acquired'])
+    summary['missing'] = summary['expected'] - summary['acquired']
+
+    return calendar, summary
+
+
+def missing_scenes(calendar):
+    """
+    The expected acquisitions that weren't acquired, sorted by sensor,
+    date, path and row.
+    """
+    missing = calendar[~calendar['acquired'].astype(bool)]
+    missing = missing.drop('acquired', axis=1)
+
+    return missing.sort_values(['sensor', 'date', 'path', 'row'])\
+        .reset_index(drop=True)
+
+
+def tile_completeness(calendar):
+    """
+    The completeness (percent of the expected acquisitions acquired)
+    of each path/row, as a raster per sensor.
+
+    :return:
+        A dict of {sensor: `numpy.ndarray`} of shape `RASTER_SHAPE`,
+        indexed by [path, row], and NaN where nothing is expected.
+    """
+    rasters = {}
+    size = RASTER_SHAPE[0] * RASTER_SHAPE[1]
+    for sensor, grp in calendar.groupby('sensor', observed=True):
+        idx = (grp['path'].values.astype('int64') * RASTER_SHAPE[1] +
+               grp['row'].values.astype('int64'))
+        expected = numpy.bincount(idx, minlength=size)
+        acquired = numpy.bincount(idx, weights=grp['acquired'].values,
+                                  minlength=size)
+
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            percent = numpy.where(expected > 0, acquired / expected * 100,
+                                  numpy.nan)
+
+        rasters[sensor] = percent.reshape(RASTER_SHAPE).astype('float32')
+
+    return rasters
+
+
+def write_gaps(out_fname, missing, summary, rasters):
+    """
+    Write the missing scenes, the summary, and the completeness raster
+    of each sensor (as a path by row table under completeness/{sensor}).
+    """
+    with pandas.HDFStore(out_fname, 'w', complib='blosc') as store:
+        store['summary'] = summary
+        put_table(store, 'missing', missing)
+        for sensor, raster in sorted(rasters.items()):
+            frame = pandas.DataFrame(raster)
+            frame.index.name = 'path'
+            frame.columns.name = 'row'
+            store['completeness/{}'.format(sensor)] = frame
@@ -0,0 +1,157 @@
+"""
+Incremental harvesting of the LPGS logs.
+
+A state table, keyed by `level1_name`, records the size and mtime of
+each LPGS log along with the record extracted from it. Comparing the
+state against the current manifest yields the logs that are new or
+have changed (and need parsing), and the level1 products that no
+longer exist, which are tombstoned rather than removed.
+"""
+
+from os.path import dirname, exists
+
+import pandas
+
+from cophub.records import append_table
+
+
+STATE_KEY = 'state'
+
+
+def manifest_frame(entries):
+    """
+    Convert the (fname, size, mtime) manifest entries into a
+    `pandas.DataFrame` indexed by `level1_name`.
+    The failed and packagetmp products are excluded.
+    """
+    df = pandas.DataFrame(entries, columns=['fname', 'size', 'mtime'])
+
+    if df['size'].isnull().any():
+        msg = "The manifest has no size/mtime; rebuild it with --crawl"
+        raise ValueError(msg)
+
+    wh = (df['fname'].str.contains('failure') |
+          df['fname'].str.contains('packagetmp'))
+    df = df[~wh].copy()
+
+    df['level1_name'] = [dirname(dirname(f)) for f in df['fname']]
+    df = df.drop_duplicates('level1_name', keep='last')
+
+    return df.set_index('level1_name')
+
+
+def empty_state():
+    """
+    An empty state table.
+    """
+    state = pandas.DataFrame({'fname': pandas.Series([], dtype=object),
+                              'size': pandas.Series([], dtype='int64'),
+                              'mtime': pandas.Series([], dtype='int64'),
+                              'deleted': pandas.Series([], dtype=bool),
+                              'deleted_at': pandas.Series(
+                                  [], dtype='datetime64[ns]')})
+    state.index.name = 'level1_name'
+
+    return state
+
+
+def load_state(fname):
+    """
+    Load the state table, or an empty one if `fname` doesn't exist.
+    """
+    if not exists(fname):
+        return empty_state()
+
+    with pandas.HDFStore(fname, 'r') as store:
+        state = store[STATE_KEY]
+
+    return state
+
+
+def save_state(fname, state):
+    """
+    Write the state table, replacing any existing file.
+    """
+    with pandas.HDFStore(fname, 'w', complib='blosc') as store:
+        append_table(store, STATE_KEY, state)
+
+
+def diff_manifest(state, manifest):
+    """
+    Compare the state against the current manifest.
+
+    :param state:
+        The state table returned by `load_state`.
+
+    :param manifest:
+        The manifest as returned by `manifest_frame`.
+
+    :return:
+        A tuple of (todo, deleted), where `todo` is the subset of the
+        manifest that is new or has changed, and `deleted` is an index
+        of the level1 products no longer in the manifest.
+    """
+    live = state[~state['deleted'].astype(bool)]
+
+    known = manifest.index.isin(live.index)
+    previous = live.reindex(manifest.index)
+    changed = ((previous['size'] != manifest['size']) |
+               (previous['mtime'] != manifest['mtime']))
+
+    todo = manifest[~known | changed.values]
+    deleted = live.index.difference(manifest.index)
+
+    return todo, deleted
+
+
+def update_state(state, records, todo, deleted, timestamp=None):
+    """
+    Fold the newly extracted records into the state table, and
+    tombstone the deleted level1 products.
+
+    :param records:
+        A `pandas.DataFrame` of the records extracted from the logs
+        listed in `todo`.
+
+    :param todo:
+        The new or changed manifest entries, as returned by
+        `diff_manifest`.
+
+    :param deleted:
+        An index of the level1 products to tombstone.
+
+    :param timestamp:
+        The time recorded against the tombstones.
+        Default is None, i.e. now.
+    """
+    if timestamp is None:
+        timestamp = pandas.Timestamp.now()
+
+    state = state.copy()
+    state.loc[deleted, 'deleted'] = True
+    state.loc[deleted, 'deleted_at'] = timestamp
+
+    records = records.set_index('level1_name')
+    records = records.join(todo[['fname', 'size', 'mtime']])
+    records['deleted'] = False
+    records['deleted_at'] = pandas.NaT
+
+    # avoid the empty frames, which would upcast the integer columns
+    state = state.drop(records.index, errors='ignore')
+    frames = [df for df in (state, records) if len(df)]
+    if frames:
+        state = pandas.concat(frames)
+    state.index.name = 'level1_name'
+
+    return state
+
+
+def live_records(state):
+    """
+    The records of the level1 products that haven't been tombstoned,
+    with `level1_name` restored as a column.
+    """
+    columns = ['fname', 'size', 'mtime', 'deleted', 'deleted_at']
+    live = state[~state['deleted'].astype(bool)]
+
+    return live.drop(columns, axis=1).reset_index()
@@ -0,0 +1,321 @@
+"""
+Instrumentation of the harvest and report runs.
+
+An `Instrument` accumulates, per stage and per worker:
+
+    * the wall time and number of calls
+    * the number of items (eg files) and bytes processed, from which
+      the items/sec and bytes/sec are derived
+    * a sample of the N slowest operations of each kind, eg the
+      slowest LPGS log parses or directory listings
+
+Workers (processes or MPI ranks) each keep their own instrument and
+return it as a dict (`to_dict`), which the root merges into its own
+before writing the run report as JSON and/or CSV:
+
+    inst = Instrument('harvest')
+    with inst.stage('parse', items=len(fnames)):
+        for fname in fnames:
+            with inst.timed('parse', fname):
+                ...
+    inst.write_report('harvest-report.json')
+"""
+
+from contextlib import contextmanager
+import csv
+import heapq
+import json
+import os
+from os.path import splitext
+import threading
+import time
+
+
+# the number of the slowest operations of each kind retained
+TOP_N = 20
+
+# environment variables holding the MPI rank
+RANK_VARIABLES = ['OMPI_COMM_WORLD_RANK', 'PMI_RANK', 'PMIX_RANK']
+
+STAGE_FIELDS = ['stage', 'worker', 'calls', 'seconds', 'items', 'bytes',
+                'items_per_second', 'bytes_per_second']
+
+
+def mpi_rank():
+    """
+    The MPI rank of this process, or None when not run under MPI.
+    """
+    for var in RANK_VARIABLES:
+        if var in os.environ:
+            return int(os.environ[var])
+
+    return None
+
+
+def worker_id():
+    """
+    Identify this worker, by MPI rank when run under MPI,
+    otherwise by pid and thread name.
+    """
+    rank = mpi_rank()
+    if rank is not None:
+        return 'rank{}'.format(rank)
+
+    return '{}:{}'.format(os.getpid(), threading.current_thread().name)
+
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else 0.0
+
+
+class Instrument(object):
+    """
+    Accumulate stage timings, counters and the slowest operations.
+
+    :param name:
+        The name of the run, eg 'harvest'.
+
+    :param top_n:
+        The number of the slowest operations of each kind retained.
+        Default is `TOP_N`.
+
+    :param worker:
+        The worker the records are attributed to, eg the worker
+        running a task. Default is None, i.e. the `worker_id` of
+        whichever process and thread records each operation.
+    """
+
+    def __init__(self, name='run', top_n=TOP_N, worker=None):
+        self.name = name
+        self.top_n = top_n
+        self.started = time.time()
+        self.worker = worker
+        self.extra = {}
+        self._stages = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, stage, worker=None):
+        key = (stage, worker or self.worker or worker_id())
+        if key not in self._stages:
+            self._stages[key] = {'stage': stage,
+                                 'worker': key[1],
+                                 'calls': 0,
+                                 'seconds': 0.0,
+                                 'items': 0,
+                                 'bytes': 0}
+
+        return self._stages[key]
+
+    def record(self, stage, seconds, items=0, nbytes=0, calls=1,
+               worker=None):
+        """
+        Record `seconds` spent on a stage, processing `items` and
+        `nbytes`.
+        """
+        with self._lock:
+            stats = self._stats(stage, worker)
+            stats['calls'] += calls
+            stats['seconds'] += seconds
+            stats['items'] += items
+            stats['bytes'] += nbytes
+
+    def count(self, stage, items=0, nbytes=0):
+        """
+        Add to the items and bytes of a stage without timing it.
+        """
+        self.record(stage, 0.0, items, nbytes, calls=0)
+
+    @contextmanager
+    def stage(self, stage, items=0, nbytes=0, worker=None):
+        """
+        Time a block of code as a stage.
+        """
+        st = time.time()
+        try:
+            yield self
+        finally:
+            self.record(stage, time.time() - st, items, nbytes,
+                        worker=worker)
+
+    def sample(self, kind, label, seconds):
+        """
+        Offer an operation to the sample of the slowest of its kind.
+        """
+        with self._lock:
+            heap = self._samples.setdefault(kind, [])
+            item = (seconds, label)
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    @contextmanager
+    def timed(self, kind, label, nbytes=0, worker=None):
+        """
+        Time a single operation, eg parsing a file, recording it as an
+        item of the stage `kind`, and as a sample of its kind.
+        """
+        st = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - st
+            self.record(kind, elapsed, 1, nbytes, worker=worker)
+            self.sample(kind, label, elapsed)
+
+    def slowest(self, kind):
+        """
+        The slowest operations of a kind, as a list of
+        (seconds, label), slowest first.
+        """
+        return sorted(self._samples.get(kind, []), reverse=True)
+
+    def to_dict(self):
+        """
+        The accumulated state, eg for returning from a worker.
+        """
+        return {'name': self.name,
+                'worker': self.worker or worker_id(),
+                'started': self.started,
+                'stages': [dict(stats) for stats in self._stages.values()],
+                'samples': {kind: list(heap)
+                            for kind, heap in self._samples.items()}}
+
+    def merge(self, other):
+        """
+        Merge an instrument, or the dict of one, from another worker.
+        """
+        if isinstance(other, Instrument):
+            other = other.to_dict()
+
+        for stats in other['stages']:
+            self.record(stats['stage'], stats['seconds'], stats['items'],
+                        stats['bytes'], stats['calls'], stats['worker'])
+
+        for kind, samples in other['samples'].items():
+            for seconds, label in samples:
+                self.sample(kind, label, seconds)
+
+    def stage_summary(self):
+        """
+        A list of dicts, one per stage and worker, in the order the
+        stages were first recorded.
+        """
+        rows = []
+        for stats in self._stages.values():
+            row = dict(stats)
+            row['items_per_second'] = _rate(row['items'], row['seconds'])
+            row['bytes_per_second'] = _rate(row['bytes'], row['seconds'])
+            rows.append(row)
+
+        return rows
+
+    def report(self):
+        """
+        The run report as a dict, including any further sections
+        added to `extra`, eg the backend's per-worker throughput.
+        """
+        result = {'name': self.name,
+                  'started': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                           time.localtime(self.started)),
+                  'elapsed': time.time() - self.started,
+                  'stages': self.stage_summary(),
+                  'slowest': {kind: [{'seconds': seconds, 'label': label}
+                                     for seconds, label in
+                                     self.slowest(kind)]
+                              for kind in sorted(self._samples)}}
+        result.update(self.extra)
+
+        return result
+
+    def format_stages(self):
+        """
+        Format the stage summary as a table.
+        """
+        fmt = "{:>20} {:>22} {:>8} {:>10} {:>10} {:>12} {:>12}"
+        lines = [fmt.format('stage', 'worker', 'calls', 'seconds', 'items',
+                            'items/sec', 'MB/sec')]
+        for row in self.stage_summary():
+            lines.append(fmt.format(row['stage'], row['worker'],
+                                    row['calls'],
+                                    '{:.2f}'.format(row['seconds']),
+                                    row['items'],
+                                    '{:.1f}'.format(row['items_per_second']),
+                                    '{:.2f}'.format(
+                                        row['bytes_per_second'] / 2**20)))
+
+        return '\n'.join(lines)
+
+    def write_report(self, fname):
+        """
+        Write the run report; as JSON if `fname` ends with .json,
+        otherwise the stage summary as CSV, with the slowest
+        operations written to {base}-slowest.csv.
+        """
+        if splitext(fname)[1] == '.json':
+            with open(fname, 'w') as outf:
+                json.dump(self.report(), outf, indent=2)
+            return
+
+        with open(fname, 'w', newline='') as outf:
+            writer = csv.DictWriter(outf, STAGE_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.stage_summary())
+
+        slowest_fname = '{}-slowest.csv'.format(splitext(fname)[0])
+        with open(slowest_fname, 'w', newline='') as outf:
+            writer = csv.writer(outf)
+            writer.writerow(['kind', 'seconds', 'label'])
+            for kind in sorted(self._samples):
+                for seconds, label in self.slowest(kind):
+                    writer.writerow([kind, seconds, label])
+
+
+@contextmanager
+def profiled(profiler=None, out_fname=None):
+    """
+    Profile a block of code.
+
+    :param profiler:
+        'cprofile', 'pyinstrument' or None (no profiling).
+
+    :param out_fname:
+        Where the profile is written; a pstats file for cProfile,
+        or an HTML page for pyinstrument. Default is None, i.e. the
+        profile is printed.
+    """
+    if profiler is None:
+        yield
+        return
+
+    if profiler == 'cprofile':
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            if out_fname is None:
+                pstats.Stats(profile).sort_stats('cumulative').print_stats(30)
+            else:
+                profile.dump_stats(out_fname)
+    elif profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            if out_fname is None:
+                print(profile.output_text())
+            else:
+                with open(out_fname, 'w') as outf:
+                    outf.write(profile.output_html())
+    else:
+        raise ValueError("Unknown profiler: {}".format(profiler))
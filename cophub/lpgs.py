@@ -0,0 +1,129 @@
+"""
+Extract the fields of interest from the LPGS logs (lpgs_out.xml).
+
+The fields are declared by a schema, where each entry is a tuple of
+(name, specifier, converter). The specifier is either an element tag
+(the element's text is retrieved), or `tag@attribute`. The log is read
+incrementally, and reading stops as soon as every field has been seen.
+"""
+
+import collections
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+
+LPGS_SCHEMA = [
+    ('L0_success', 'L0RpProcessing@success', int),
+    ('L0_fail', 'L0RpProcessing@fail', int),
+    ('L1_success', 'L1Processing@success', int),
+    ('L1_fail', 'L1Processing@fail', int),
+    ('L1_L1G', 'L1Processing@L1G', int),
+    ('L1_L1Gt', 'L1Processing@L1Gt', int),
+    ('L1_L1T', 'L1Processing@L1T', int),
+    ('pass_id', 'LandsatProcessingRequest@id', str),
+    ('working_folder', 'WorkingFolder', str),
+]
+
+Field = collections.namedtuple('Field', ['name', 'tag', 'attribute',
+                                         'converter'])
+
+
+def compile_schema(schema):
+    """
+    Compile a schema into a list of `Field`'s.
+    """
+    fields = []
+    for name, specifier, converter in schema:
+        tag, _, attribute = specifier.partition('@')
+        fields.append(Field(name, tag, attribute or None, converter))
+
+    return fields
+
+
+class LpgsExtractor(object):
+    """
+    Extract the fields declared by a schema from an LPGS log.
+
+    :param schema:
+        A list of (name, specifier, converter) tuples.
+        Default is `LPGS_SCHEMA`.
+
+    :param backend:
+        Either 'lxml' or 'etree'. Default is None, i.e. use lxml if
+        it is available, otherwise the standard library's ElementTree.
+    """
+
+    def __init__(self, schema=None, backend=None):
+        if schema is None:
+            schema = LPGS_SCHEMA
+
+        if backend is None:
+            backend = 'etree' if lxml_etree is None else 'lxml'
+
+        if backend == 'lxml':
+            if lxml_etree is None:
+                raise ImportError("The lxml backend requires lxml")
+            self._iterparse = lxml_etree.iterparse
+        elif backend == 'etree':
+            self._iterparse = ET.iterparse
+        else:
+            raise ValueError("Unknown backend: {}".format(backend))
+
+        self.backend = backend
+        self.fields = compile_schema(schema)
+
+        # attributes are available at the start of an element,
+        # but the text is only guaranteed at the end
+        self._attributes = collections.defaultdict(list)
+        self._text = collections.defaultdict(list)
+        for field in self.fields:
+            if field.attribute is None:
+                self._text[field.tag].append(field)
+            else:
+                self._attributes[field.tag].append(field)
+
+        self._events = ('start', 'end') if self._text else ('start',)
+        self._tags = set(self._attributes) | set(self._text)
+
+    def _iter(self, src):
+        if self.backend == 'lxml':
+            return self._iterparse(src, events=self._events,
+                                   tag=list(self._tags))
+        return self._iterparse(src, events=self._events)
+
+    def extract(self, fname):
+        """
+        Return a dict of {name: value} for every field in the schema.
+        """
+        data = {}
+        nfields = len(self.fields)
+
+        with open(fname, 'rb') as src:
+            for event, elem in self._iter(src):
+                tag = elem.tag
+                if tag not in self._tags:
+                    continue
+
+                if event == 'start':
+                    for field in self._attributes.get(tag, []):
+                        value = elem.get(field.attribute)
+                        if field.name not in data and value is not None:
+                            data[field.name] = field.converter(value)
+                else:
+                    for field in self._text.get(tag, []):
+                        if field.name not in data and elem.text is not None:
+                            data[field.name] = field.converter(elem.text)
+
+                if len(data) == nfields:
+                    break
+
+        if len(data) != nfields:
+            missing = [f.name for f in self.fields if f.name not in data]
+            msg = "{} is missing the fields: {}"
+            raise ValueError(msg.format(fname, ', '.join(missing)))
+
+        return data
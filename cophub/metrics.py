@@ -0,0 +1,167 @@
+"""
+Completeness metrics of the per-pass records, aggregated by sensor
+and period.
+
+The pass counters are summed for every (sensor, period) in a single
+groupby, and each metric is then evaluated as a vectorised ratio
+across all sensors and periods at once:
+
+    counts = period_counts(passes, freq='month')
+    metrics = completeness(counts)
+
+A ratio whose denominator is zero is undefined, and is reported as
+NaN rather than raising or producing inf.
+
+The collection and ROI summaries have always defined their metrics
+differently, eg pq_completeness is pq / nbar for the collection but
+pq / (L1T + L1Gt) for the ROI, so each keeps its own list; see
+`COLLECTION_METRICS` and `ROI_METRICS`. Each period is labelled by its
+last day, eg 1991-01-31, as it was by `resample('M')`.
+"""
+
+import numpy
+import pandas
+
+
+# name: (numerator columns, denominator columns); each a percentage
+# of the sum of the numerator over the sum of the denominator
+COLLECTION_METRICS = [
+    ('L0_completeness', ['L0_success'], ['L0_success', 'L0_fail']),
+    ('L1_completeness', ['L1_success'], ['L1_success', 'L1_fail']),
+    ('nbar_completeness', ['nbar'], ['L1_L1T', 'L1_L1Gt']),
+    ('nbart_completeness', ['nbart'], ['L1_L1T', 'L1_L1Gt']),
+    ('pq_completeness', ['pq'], ['nbar'])]
+
+ROI_METRICS = [
+    ('L0_completeness', ['L0_success'], ['L0_success', 'L0_fail']),
+    ('L1_completeness', ['L1_success'], ['L1_success', 'L1_fail']),
+    ('oth_percent', ['L1_L1T', 'L1_L1Gt'], ['L1_success']),
+    ('nbar_completeness', ['nbar'], ['L1_L1T', 'L1_L1Gt']),
+    ('nbart_completeness', ['nbart'], ['L1_L1T', 'L1_L1Gt']),
+    ('pq_completeness', ['pq'], ['L1_L1T', 'L1_L1Gt']),
+    ('pq_completeness_relative', ['pq'], ['nbar'])]
+
+# period name: pandas frequency, labelled by the end of the period
+FREQUENCIES = {'day': 'D',
+               'month': 'ME',
+               'year': 'YE'}
+
+
+def safe_divide(numerator, denominator):
+    """
+    Element-wise `numerator / denominator`, with NaN wherever the
+    denominator is zero.
+    """
+    numerator = numpy.asarray(numerator, dtype='float64')
+    denominator = numpy.asarray(denominator, dtype='float64')
+
+    result = numpy.full(numerator.shape, numpy.nan)
+    numpy.divide(numerator, denominator, out=result,
+                 where=denominator != 0)
+
+    return result
+
+
+def period_counts(df, freq='month', by='sensor', date='date',
+                  fill_gaps=True):
+    """
+    Sum the counters of the per-pass records by sensor and period.
+
+    :param df:
+        A `pandas.DataFrame` of the per-pass records, see
+        `cophub.aggregate.pass_summary`.
+
+    :param freq:
+        One of 'day', 'month' or 'year', or a pandas frequency alias.
+        Default is 'month'.
+
+    :param by:
+        The column to group by along with the period.
+        Default is 'sensor'.
+
+    :param date:
+        The date column. Default is 'date'.
+
+    :param fill_gaps:
+        If set, then the periods without any passes between the first
+        and last period of each sensor are included as zero counts.
+        Default is True.
+
+    :return:
+        A `pandas.DataFrame` indexed by (`by`, `date`) containing the
+        sum of each numeric column.
+    """
+    freq = FREQUENCIES.get(freq, freq)
+    columns = [col for col in df.columns if col not in (by, date) and
+               pandas.api.types.is_numeric_dtype(df[col])]
+
+    grouper = [by, pandas.Grouper(key=date, freq=freq)]
+    counts = df.groupby(grouper, observed=True)[columns].sum()
+
+    if fill_gaps and len(counts):
+        dates = counts.index.get_level_values(1)
+        keys = counts.index.get_level_values(0)
+        index = []
+        for key in keys.unique():
+            periods = dates[keys == key]
+            index.extend((key, period) for period in
+                         pandas.date_range(periods.min(), periods.max(),
+                                           freq=freq))
+        index = pandas.MultiIndex.from_tuples(index, names=counts.index.names)
+        counts = counts.reindex(index, fill_value=0)
+
+    return counts
+
+
+def completeness(counts, metrics=None):
+    """
+    Evaluate the completeness metrics of the counts.
+
+    :param counts:
+        A `pandas.DataFrame` of counts, eg from `period_counts`.
+
+    :param metrics:
+        A list of (name, numerator columns, denominator columns).
+        Default is `ROI_METRICS`. Metrics requiring a column that isn't
+        in `counts` are skipped.
+
+    :return:
+        A copy of `counts` with a column of percentages per metric.
+    """
+    if metrics is None:
+        metrics = ROI_METRICS
+
+    result = counts.copy()
+    for name, numerator, denominator in metrics:
+        if not set(numerator + denominator).issubset(counts.columns):
+            continue
+
+        result[name] = safe_divide(counts[numerator].sum(axis=1),
+                                   counts[denominator].sum(axis=1)) * 100
+
+    return result
+
+
+def sensor_metrics(df, freq='month', metrics=None, **kwargs):
+    """
+    The per-period counts and completeness metrics of every sensor.
+    See `period_counts` and `completeness`.
+    """
+    return completeness(period_counts(df, freq, **kwargs), metrics)
+
+
+def write_sensor_metrics(metrics, h5_fname, xlsx_fmt=None):
+    """
+    Write the metrics of each sensor to a table of `h5_fname`,
+    eg /LS8, and optionally to an Excel workbook per sensor.
+
+    :param xlsx_fmt:
+        The name of the workbooks, formatted with the sensor,
+        eg '{}-roi.xlsx'. Default is None, i.e. no workbooks.
+    """
+    with pandas.HDFStore(h5_fname, 'w', complib='blosc') as store:
+        for name, outdf in metrics.groupby(level=0, observed=True):
+            outdf = outdf.droplevel(0)
+            if xlsx_fmt is not None:
+                outdf.to_excel(xlsx_fmt.format(name))
+            store[name] = outdf
@@ -0,0 +1,112 @@
+"""
+Vectorised derivation of the children product names from the level1
+product names.
+
+The level1 names are parsed once with `Series.str.extract`, and the
+name of every product in the registry (see `cophub.config`) is then
+built from the parsed components using column-wise string operations.
+"""
+
+from string import Formatter
+
+import pandas
+
+from cophub.config import Config
+
+
+L1T_PATTERN = (r'(?P<spacecraft_id>LS\d)_(?P<sensor_id>\w+)_'
+               r'(?P<product_type>\w+)'
+               r'_(?P<product_id>P\d+.*)_GA(?P<product_code>.*)-'
+               r'(?P<station_id>\d+)_'
+               r'(?P<wrs_path>\d+)_(?P<wrs_row>\d+)_'
+               r'(?P<acquisition_date>\d{8})')
+
+# the default registry of children products, see `cophub.config`
+PRODUCTS = Config().products
+
+
+def parse_level1_names(level1_names):
+    """
+    Parse the level1 names into their components.
+
+    :param level1_names:
+        A `pandas.Series` of level1 names, with or without the
+        leading directories.
+
+    :return:
+        A `pandas.DataFrame` with a column for each group of
+        `L1T_PATTERN`, plus the derived columns `sensor` (eg 'ls5'),
+        `year`, `month` and `date`. Names that don't match the
+        pattern are NaN.
+    """
+    basenames = level1_names.astype(object).str.rsplit('/', n=1).str[-1]
+    components = basenames.str.extract('^' + L1T_PATTERN, expand=True)
+
+    acquisition_date = components['acquisition_date']
+    components['sensor'] = components['spacecraft_id'].str.lower()
+    components['year'] = acquisition_date.str[0:4]
+    components['month'] = acquisition_date.str[4:6]
+    components['date'] = pandas.to_datetime(acquisition_date,
+                                            format='%Y%m%d', errors='coerce')
+
+    return components
+
+
+def format_columns(template, frame, extra=None):
+    """
+    The column-wise equivalent of `template.format(**row)` for every
+    row of `frame`. Missing values propagate as NaN.
+
+    :param extra:
+        A dict of {field: `pandas.Series`} taking precedence over
+        the columns of `frame`.
+    """
+    if extra is None:
+        extra = {}
+
+    result = pandas.Series('', index=frame.index, dtype=object)
+    for literal, field, _, _ in Formatter().parse(template):
+        if literal:
+            result = result + literal
+        if field is not None:
+            column = extra[field] if field in extra else frame[field]
+            result = result + column.astype(object)
+
+    return result
+
+
+def product_names(components, products=None, registry=None):
+    """
+    Build the filenames of the children products.
+
+    :param components:
+        The `pandas.DataFrame` returned by `parse_level1_names`.
+
+    :param products:
+        A list of product names contained in the `registry`.
+        Default is None, i.e. every product in the registry.
+
+    :param registry:
+        A dict of {name: `cophub.config.Product`}, eg
+        `Config.products`. Default is `PRODUCTS`.
+
+    :return:
+        A `pandas.DataFrame` containing a `{product}_name` column
+        for each product. The names are NaN for the sensors a product
+        isn't declared for.
+    """
+    if registry is None:
+        registry = PRODUCTS
+
+    if products is None:
+        products = list(registry)
+
+    names = pandas.DataFrame(index=components.index)
+    for product in products:
+        spec = registry[product]
+        scenes = format_columns(spec.scene, components)
+        fnames = format_columns(spec.path, components, {'scene': scenes})
+        names[product + '_name'] = fnames.where(
+            components['sensor'].isin(spec.sensors))
+
+    return names
@@ -0,0 +1,158 @@
+"""
+Parsing of, and selection by, the pass id, eg 'LS8-20160401'.
+
+The pass id is parsed once per distinct value into a categorical
+sensor and integer year/month/day. Records are selected either with a
+boolean mask, or via a `PassIndex`, which sorts the records by
+(sensor, date) once so that each sensor/month/date-range query is a
+binary search plus the size of the result.
+"""
+
+import re
+
+import numpy
+import pandas
+
+
+# eg LS8, LS8-2016, LS8-201604, LS8-20160401
+SELECTION_PATTERN = re.compile(r'^(?P<sensor>LS\d)'
+                               r'(-(?P<date>\d{4}(\d{2}(\d{2})?)?))?$')
+
+
+def parse_pass_ids(pass_id):
+    """
+    Parse the pass ids into their components.
+
+    :param pass_id:
+        A `pandas.Series` of pass ids, eg 'LS8-20160401'.
+
+    :return:
+        A `pandas.DataFrame` with the same index as `pass_id`,
+        containing the columns `sensor` (categorical), `year`, `month`,
+        `day` (integers) and `date` (datetime64).
+    """
+    pass_id = pass_id.astype('category')
+    codes = pass_id.cat.codes.values
+    categories = pandas.Index(pass_id.cat.categories).astype(str)
+
+    # parse each distinct pass id once
+    parts = categories.str.split('-', n=1)
+    sensors = parts.str[0]
+    ymd = pandas.to_numeric(parts.str[1]).values.astype('int64')
+
+    date = pandas.to_datetime(parts.str[1], format='%Y%m%d')
+
+    result = pandas.DataFrame(index=pass_id.index)
+    result['sensor'] = pandas.Categorical(sensors[codes])
+    result['year'] = (ymd // 10000)[codes].astype('int16')
+    result['month'] = (ymd // 100 % 100)[codes].astype('int8')
+    result['day'] = (ymd % 100)[codes].astype('int8')
+    result['date'] = date[codes]
+
+    return result
+
+
+def assign_pass_columns(df, columns=('sensor', 'date'), column='pass_id'):
+    """
+    Add the parsed components of the pass id, eg the sensor and date,
+    as columns of `df`.
+
+    :return:
+        `df`, for chaining.
+    """
+    parsed = parse_pass_ids(df[column])
+    for col in columns:
+        df[col] = parsed[col]
+
+    return df
+
+
+def selection_bounds(selection):
+    """
+    Convert a selection, eg 'LS8-201604', into the sensor and the
+    inclusive range of yyyymmdd integers it covers.
+    """
+    match = SELECTION_PATTERN.match(selection)
+    if match is None:
+        msg = ("Invalid selection: {}; expected eg LS8, LS8-2016, "
+               "LS8-201604, LS8-20160401")
+        raise ValueError(msg.format(selection))
+
+    date = match.group('date') or ''
+    start = int(date.ljust(8, '0'))
+    end = int(date.ljust(8, '9'))
+
+    return match.group('sensor'), start, end
+
+
+def pass_mask(pass_id, selection):
+    """
+    A boolean mask of the pass ids matching a selection,
+    eg 'LS5-199101' for January 1991. The test is made once per
+    distinct pass id.
+    """
+    pass_id = pass_id.astype('category')
+    categories = pandas.Index(pass_id.cat.categories).astype(str)
+    matched = numpy.asarray(categories.str.startswith(selection), dtype=bool)
+
+    codes = pass_id.cat.codes.values
+    return numpy.where(codes >= 0, matched[codes], False)
+
+
+class PassIndex(object):
+    """
+    An index of the records of a `pandas.DataFrame` sorted by
+    (sensor, date) of the pass id.
+
+    :param df:
+        A `pandas.DataFrame` containing the `pass_id` column.
+
+    :param column:
+        The name of the pass id column. Default is 'pass_id'.
+    """
+
+    def __init__(self, df, column='pass_id'):
+        parsed = parse_pass_ids(df[column])
+        sensor = parsed['sensor'].cat
+
+        ymd = (parsed['year'].values.astype('int64') * 10000 +
+               parsed['month'].values.astype('int64') * 100 +
+               parsed['day'].values.astype('int64'))
+        keys = sensor.codes.values.astype('int64') * 100000000 + ymd
+
+        self.df = df
+        self.sensors = {name: code for code, name in
+                        enumerate(sensor.categories)}
+        self.order = numpy.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def positions(self, sensor, start, end):
+        """
+        The row positions of the records of `sensor` whose yyyymmdd
+        is within [start, end].
+        """
+        if sensor not in self.sensors:
+            return numpy.array([], dtype='int64')
+
+        offset = self.sensors[sensor] * 100000000
+        lower = numpy.searchsorted(self.keys, offset + start, side='left')
+        upper = numpy.searchsorted(self.keys, offset + end, side='right')
+
+        # retain the original order of the records
+        return numpy.sort(self.order[lower:upper])
+
+    def select(self, selection):
+        """
+        The records matching a selection, eg 'LS8-201604'.
+        """
+        return self.df.iloc[self.positions(*selection_bounds(selection))]
+
+    def date_range(self, sensor, start, end):
+        """
+        The records of `sensor` acquired between the `start` and `end`
+        dates inclusive.
+        """
+        start = int(pandas.Timestamp(start).strftime('%Y%m%d'))
+        end = int(pandas.Timestamp(end).strftime('%Y%m%d'))
+
+        return self.df.iloc[self.positions(sensor, start, end)]
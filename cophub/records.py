@@ -0,0 +1,183 @@
+"""
+Columnar accumulation of the records extracted from the LPGS logs.
+
+Growing a `pandas.DataFrame` one row at a time copies the entire
+frame on every append. Instead, the records are gathered into typed
+column buffers and a frame is created once per chunk.
+"""
+
+from array import array
+
+import numpy
+import pandas
+from pandas.api.types import union_categoricals
+
+from cophub.lpgs import LPGS_SCHEMA
+
+
+# the integer fields declared by the LPGS schema
+COUNTERS = [name for name, _, converter in LPGS_SCHEMA if converter is int]
+INTEGERS = ['path', 'row'] + COUNTERS
+STRINGS = ['level1_name', 'pass_name']
+CATEGORICALS = ['pass_id']
+
+# the path/row are small (at most 248); the counters are held as int32
+# as a count above 32767 would otherwise overflow and drop the record
+INTEGER_DTYPES = {'path': 'int16', 'row': 'int16'}
+INTEGER_DTYPES.update({col: 'int32' for col in COUNTERS})
+
+# the array typecode of each dtype; a value that doesn't fit raises
+# an OverflowError when appended
+TYPECODES = {'int16': 'h', 'int32': 'i', 'int64': 'q'}
+
+# the size reserved for string columns when appending to a table
+MIN_ITEMSIZE = 256
+
+
+class RecordBuilder(object):
+    """
+    Accumulate the dicts returned by `process_lpgs_log` into column
+    buffers.
+
+    :param chunksize:
+        The number of records to hold before a chunk is finished and
+        handed to `on_chunk`. Default is None, i.e. hold everything.
+
+    :param on_chunk:
+        A callable accepting a `pandas.DataFrame`. Called with each
+        finished chunk, after which the buffers are cleared.
+    """
+
+    def __init__(self, chunksize=None, on_chunk=None):
+        self.chunksize = chunksize
+        self.on_chunk = on_chunk
+        self.nchunks = 0
+        self._reset()
+
+    def _reset(self):
+        self._integers = {col: array(TYPECODES[INTEGER_DTYPES[col]])
+                          for col in INTEGERS}
+        self._strings = {col: [] for col in STRINGS}
+        self._codes = {col: array('q') for col in CATEGORICALS}
+        self._categories = {col: {} for col in CATEGORICALS}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, record):
+        """
+        Append a single record.
+        """
+        for col in INTEGERS:
+            self._integers[col].append(record[col])
+
+        for col in STRINGS:
+            self._strings[col].append(record[col])
+
+        for col in CATEGORICALS:
+            categories = self._categories[col]
+            code = categories.setdefault(record[col], len(categories))
+            self._codes[col].append(code)
+
+        self._size += 1
+
+        if self.chunksize is not None and self._size >= self.chunksize:
+            self.flush()
+
+    def extend(self, records):
+        """
+        Append an iterable of records.
+        """
+        for record in records:
+            self.append(record)
+
+    def columns(self):
+        """
+        Return the records currently held as a dict of column buffers;
+        `numpy.ndarray`'s, and `pandas.Categorical`'s for the
+        categorical columns. The buffers are compact to pickle, eg when
+        gathering them from other processes.
+        """
+        data = {}
+        for col in INTEGERS:
+            data[col] = numpy.frombuffer(self._integers[col],
+                                         dtype=INTEGER_DTYPES[col])
+
+        for col in STRINGS:
+            data[col] = numpy.array(self._strings[col], dtype=object)
+
+        for col in CATEGORICALS:
+            categories = list(self._categories[col])
+            codes = numpy.frombuffer(self._codes[col], dtype='int64')
+            data[col] = pandas.Categorical.from_codes(codes, categories)
+
+        return data
+
+    def to_frame(self):
+        """
+        Create a `pandas.DataFrame` from the records currently held.
+        """
+        return frame_from_columns([self.columns()])
+
+    def flush(self):
+        """
+        Finish the current chunk, passing it to `on_chunk` if defined.
+        The buffers are cleared, and the finished chunk is returned.
+        """
+        df = self.to_frame()
+        self._reset()
+
+        if len(df) == 0:
+            return df
+
+        self.nchunks += 1
+        if self.on_chunk is not None:
+            self.on_chunk(df)
+
+        return df
+
+
+def frame_from_columns(blocks):
+    """
+    Create a single `pandas.DataFrame` from a list of the column
+    buffers returned by `RecordBuilder.columns`.
+    The `sensor` column is derived from the `pass_id` categories,
+    rather than from every row.
+    """
+    if not blocks:
+        blocks = [RecordBuilder().columns()]
+
+    data = {}
+    for col in INTEGERS + STRINGS:
+        data[col] = numpy.concatenate([block[col] for block in blocks])
+
+    for col in CATEGORICALS:
+        data[col] = union_categoricals([block[col] for block in blocks])
+
+    df = pandas.DataFrame(data)
+
+    # eg 'LS5-19910101' -> 'LS5'
+    pass_id = df['pass_id'].cat
+    sensors = pandas.Index(pass_id.categories).str.split('-').str[0]
+    df['sensor'] = pandas.Categorical(sensors[pass_id.codes])
+
+    return df
+
+
+def append_table(store, key, df):
+    """
+    Append a chunk to a table within a `pandas.HDFStore`.
+    Categorical columns are written as plain strings, as the
+    categories of successive chunks are unlikely to be identical.
+    """
+    if len(df) == 0:
+        return
+
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pandas.CategoricalDtype):
+            df[col] = df[col].astype(object)
+
+    store.append(key, df, format='table', index=False,
+                 min_itemsize={'values': MIN_ITEMSIZE})
@@ -4,13 +4,16 @@
 Digest, analyse and report on the Apache and SARA logs provided by NCI.
 """
 
-from oauth2client.service_account import ServiceAccountCredentials
-import numpy
+from os.path import getsize
+
 import pandas
-import pygsheets
-import tabulate
 import click
 
+from cophub import rollup
+from cophub.config import load_config
+from cophub.instrument import Instrument, profiled
+from cophub.sinks import Report, LocalSink, SheetsSink
+
 
 template = ("""# SARA Useage Report
 
@@ -21,9 +24,83 @@ template = ("""# SARA Useage Report
 """)
 
 
-def apache_log(fname):
+# bytes per TB and GB
+TB = 1099511627776
+GB = 1073741824
+
+# the number of records read at a time
+CHUNKSIZE = 100000
+
+APACHE_DTYPES = {'country': 'category',
+                 'dataset': 'category',
+                 'service': 'category'}
+
+# the counters of the Apache log; an empty or '-' counter is read as
+# missing (nullable Int64) rather than failing the cast
+APACHE_COUNTERS = ['hits', 'traffic_browse', 'traffic_data']
+
+SARA_DTYPES = {'method': 'category',
+               'service': 'category',
+               'collection': 'category'}
+
+# datasets with hits, but no data transfer
+# (TODO check what they refer too)
+EXCLUDED_DATASETS = ['Sentinel-1', 'Sentinel-2', 'Sentinel-3']
+
+
+def read_log(fname, dtypes, chunksize=CHUNKSIZE, usecols=None,
+             counters=None):
     """
-    Read, analyse and report against the Apache log.
+    Read a log in chunks of `chunksize` records, using the explicit
+    `dtypes` for the columns that are aggregated. The `counters` are
+    coerced to the nullable Int64, any value that isn't a number
+    being missing.
+
+    :return:
+        An iterator of `pandas.DataFrame`'s.
+    """
+    if usecols is not None:
+        dtypes = {col: dtypes[col] for col in usecols if col in dtypes}
+
+    reader = pandas.read_csv(fname, dtype=dtypes, usecols=usecols,
+                             chunksize=chunksize)
+
+    for chunk in reader:
+        for col in counters or []:
+            if col in chunk.columns:
+                chunk[col] = pandas.to_numeric(chunk[col], errors='coerce')\
+                    .astype('Int64')
+        yield chunk
+
+
+def read_daily(fname, log, dtypes, usecols, chunksize=CHUNKSIZE,
+               counters=None):
+    """
+    Reduce a log to its daily aggregates, one chunk of records at a
+    time (see `cophub.rollup.daily_aggregates`). Only the `usecols`
+    are read.
+    """
+    daily = None
+    for chunk in read_log(fname, dtypes, chunksize, usecols, counters):
+        # a missing counter adds nothing to the sums
+        for col in counters or []:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].fillna(0).astype('int64')
+
+        if log == 'apache':
+            chunk = chunk.assign(access_count=1)
+        elif log == 'sara':
+            chunk = chunk.assign(count=1)
+
+        daily = rollup.combine([daily, rollup.daily_aggregates(chunk, log)],
+                               log)
+
+    return rollup.combine([daily], log)
+
+
+def apache_daily(fname, chunksize=CHUNKSIZE):
+    """
+    The daily aggregates of the Apache log.
 
     Current column names:
 
@@ -45,55 +122,16 @@ def apache_log(fname):
         * traffic_data_mb
         * traffic_data_gb
     """
-    df = pandas.read_csv(fname)
-    df['access_count'] = 1
-
-    # traffic summary (in TB) by service
-    summary = df.pivot_table(values='traffic_data', index='service',
-                             aggfunc=numpy.sum)
-    summary['traffic_data'] = summary['traffic_data'] / 1099511627776
-
-    # drop certain records
-    # (TODO check what they refer too, as they have hits, but no data transfer)
-    query = ((df.dataset == 'Sentinel-1') | (df.dataset == 'Sentinel-2') |
-            (df.dataset == 'Sentinel-3'))
-    subs = df[~query]
-
-    # traffic summary in GB by dataset
-    datasets_d = subs.pivot_table(values='traffic_data', index='dataset',
-                                  aggfunc=numpy.sum)
-    datasets_d['traffic_data'] = datasets_d['traffic_data'] / 1024 / 1024 / 1024
-
-    # access count summary per dataset
-    datasets_c = subs.pivot_table(values='access_count', index='dataset',
-                                  aggfunc=numpy.sum)
+    usecols = ['date', 'country', 'dataset', 'service', 'hits',
+               'traffic_data']
 
-    # append access count summary
-    datasets_d['access_count'] = datasets_c['access_count']
+    return read_daily(fname, 'apache', APACHE_DTYPES, usecols, chunksize,
+                      APACHE_COUNTERS)
 
-    # authorisation
-    scopes = ['https://www.googleapis.com/auth/drive']
-    credentials = ServiceAccountCredentials.from_json_keyfile_name('/home/sixy/Downloads/CopHub-fb57e386091f.json', scopes)
-    gc = pygsheets.authorize(credentials=credentials)
 
-    # Apache-Logs directory on drive                                                
-    sheets = gc.create('Apache-History-201806', parent_id='1PaI4V6YKFlAkNAuUNnDRwVDQMkD4LS8L')
-    sheets.sheet1.rows = df.shape[0]                                               
-    sheets.sheet1.set_dataframe(df, (1, 1))
-
-    worksheet = sheets.add_worksheet('Summaries')
-    worksheet.set_dataframe(summary, (3, 1), copy_index=True, copy_head=True)
-    worksheet.cell('A1').value = 'Traffic Downloads in TB by Service'
-    worksheet.cell('A3').value = 'Service'
-
-    worksheet.set_dataframe(datasets_d, 'A12', copy_index=True, copy_head=True)
-    worksheet.cell('A10').value = 'Traffic Downloads in GB and access counts by dataset'
-    worksheet.cell('A12').value = 'Dataset'
-
-
-def sara_log(fname):
+def sara_daily(fname, chunksize=CHUNKSIZE):
     """
-    Read, analyse and report against the SARA log.
+    The daily aggregates of the SARA log.
 
     Current column names:
 
@@ -109,45 +147,234 @@ def sara_log(fname):
         * ip
         * productidentifier
     """
-    df = pandas.read_csv(fname)
+    usecols = ['querytime', 'method', 'service', 'collection']
+
+    return read_daily(fname, 'sara', SARA_DTYPES, usecols, chunksize)
+
+
+def apache_summaries(daily):
+    """
+    Summarise the daily aggregates of the Apache log.
+
+    :return:
+        A tuple of (summary, datasets), where summary is the traffic
+        (in TB) by service, and datasets is the traffic (in GB) and
+        access count by dataset.
+    """
+    services = daily.groupby('service')['traffic_data'].sum()
+    summary = (services / TB).to_frame('traffic_data')
+
+    subs = daily[~daily['dataset'].isin(EXCLUDED_DATASETS)]
+    datasets = subs.groupby('dataset')[['traffic_data', 'access_count']].sum()
+    datasets['traffic_data'] = datasets['traffic_data'] / GB
+
+    return summary, datasets
+
+
+def sara_summary(daily):
+    """
+    Summarise the daily aggregates of the SARA log.
 
+    :return:
+        The number of downloads (GET requests) per collection.
+    """
     # handle only the GET requests
-    df_get = df[df['method'] == 'GET'].copy()
+    df_get = daily[daily['method'] == 'GET']
+
+    return df_get.groupby('collection')['count'].sum().to_frame('count')
+
+
+def fold_into_rollup(daily, log, fname, rollup_fname):
+    """
+    Fold the daily aggregates of a log into the rollup, and return
+    the year-to-date daily aggregates from the rollup.
+    """
+    if not rollup.fold_log(daily, log, fname, rollup_fname):
+        print("{} has already been folded into {}".format(fname,
+                                                          rollup_fname))
+
+    return rollup.year_to_date(log, daily['date'].max(), rollup_fname)
+
+
+def apache_report(daily, ytd=None, folder=None):
+    """
+    The report of the daily aggregates of an Apache log, along with
+    the monthly year-to-date traffic per dataset if `ytd` is given.
+
+    :param folder:
+        The Drive folder of the report, see `cophub.config`.
+    """
+    summary, datasets_d = apache_summaries(daily)
+
+    title = 'Apache-History-{}'.format(rollup.month_label(daily))
+    report = Report(title, folder=folder)
+    report.add('services', 'Summaries', 'Traffic Downloads in TB by Service',
+               summary, ['Service'])
+    report.add('datasets', 'Summaries',
+               'Traffic Downloads in GB and access counts by dataset',
+               datasets_d, ['Dataset'])
+
+    if ytd is not None:
+        traffic = rollup.trend(ytd, 'dataset', 'traffic_data') / GB
+        traffic.index = traffic.index.strftime('%Y-%m')
+        report.add('year_to_date', 'Year to Date',
+                   'Monthly Traffic Downloads in GB by dataset', traffic,
+                   ['Month'])
 
-    # collection summary
-    df_get['count'] = 1
-    c_summary = df_get.pivot_table(values='count', index='collection',
-                                   aggfunc=numpy.sum)
+    return report
 
-    # authorisation
-    scopes = ['https://www.googleapis.com/auth/drive']
-    credentials = ServiceAccountCredentials.from_json_keyfile_name('/home/sixy/Downloads/CopHub-fb57e386091f.json', scopes)
-    gc = pygsheets.authorize(credentials=credentials)
 
-    # google sheets creation
-    sheets = gc.create('SARA-History-201807', parent_id='1-YUyrfhKgmgIQct2-7V5DPJrW7vVmocK')
-    sheets.sheet1.rows = df.shape[0] # see https://github.com/nithinmurali/pygsheets/issues/124
-    sheets.sheet1.set_dataframe(df, (1, 1))
-    sheets.sheet1.title = 'SARA-Log'
+def sara_report(daily, ytd=None, folder=None):
+    """
+    The report of the daily aggregates of a SARA log, along with
+    the monthly year-to-date downloads per collection if `ytd` is
+    given.
+
+    :param folder:
+        The Drive folder of the report, see `cophub.config`.
+    """
+    c_summary = sara_summary(daily)
 
-    worksheet = sheets.add_worksheet('Collection Summary')
-    worksheet.set_dataframe(c_summary, (3, 1), copy_index=True, copy_head=True)
-    worksheet.cell('A1').value = 'No. of downloads per Sentinel collection'
-    worksheet.cell('A3').value = 'Collection'
-    worksheet.cell('B3').value = 'Downloads'
+    title = 'SARA-History-{}'.format(rollup.month_label(daily))
+    report = Report(title, template, folder)
+    report.add('c_downloads', 'Collection Summary',
+               'No. of downloads per Sentinel collection', c_summary,
+               ['Collection', 'Downloads'])
+
+    if ytd is not None:
+        downloads = rollup.trend(ytd[ytd['method'] == 'GET'], 'collection',
+                                 'count')
+        downloads.index = downloads.index.strftime('%Y-%m')
+        report.add('year_to_date', 'Year to Date',
+                   'Monthly downloads per Sentinel collection', downloads,
+                   ['Month'])
+
+    return report
+
+
+def apache_log(fname, sink, chunksize=CHUNKSIZE, rollup_fname=None,
+               push_raw=False, folder=None):
+    """
+    Read, analyse and report against the Apache log.
+    See `apache_daily` and `apache_report`.
+
+    :param sink:
+        Where the report is written, see `cophub.sinks`.
+
+    :param rollup_fname:
+        If given, then the log is folded into the rollup, and the
+        monthly year-to-date traffic per dataset is reported from it.
+
+    :param push_raw:
+        If set, then the raw log is written to the sink as well.
+        Default is False.
+
+    :param folder:
+        The Drive folder of the report, see `cophub.config`.
+    """
+    daily = apache_daily(fname, chunksize)
+    ytd = None
+    if rollup_fname is not None:
+        ytd = fold_into_rollup(daily, 'apache', fname, rollup_fname)
+
+    raw = None
+    if push_raw:
+        raw = read_log(fname, APACHE_DTYPES, chunksize,
+                       counters=APACHE_COUNTERS)
+
+    return sink.write(apache_report(daily, ytd, folder), raw, 'Apache-Log')
+
+
+def sara_log(fname, sink, chunksize=CHUNKSIZE, rollup_fname=None,
+             push_raw=False, folder=None):
+    """
+    Read, analyse and report against the SARA log.
+    See `sara_daily` and `sara_report`.
+
+    :param sink:
+        Where the report is written, see `cophub.sinks`.
+
+    :param rollup_fname:
+        If given, then the log is folded into the rollup, and the
+        monthly year-to-date downloads per collection are reported
+        from it.
+
+    :param push_raw:
+        If set, then the raw log is written to the sink as well.
+        Default is False.
+
+    :param folder:
+        The Drive folder of the report, see `cophub.config`.
+    """
+    daily = sara_daily(fname, chunksize)
+    ytd = None
+    if rollup_fname is not None:
+        ytd = fold_into_rollup(daily, 'sara', fname, rollup_fname)
+
+    raw = read_log(fname, SARA_DTYPES, chunksize) if push_raw else None
+
+    return sink.write(sara_report(daily, ytd, folder), raw, 'SARA-Log')
 
 
 @click.command()
 @click.option("--sara-fname", type=click.Path(exists=True, readable=True))
 @click.option("--apache-fname", type=click.Path(exists=True, readable=True))
-
-
-def main(sara_fname, apache_fname):
+@click.option("--chunksize", type=int, default=CHUNKSIZE, show_default=True,
+              help="The number of log records read at a time.")
+@click.option("--rollup-fname", type=click.Path(dir_okay=False),
+              help="Fold the logs into this rollup of daily aggregates.")
+@click.option("--sink", type=click.Choice(['sheets', 'local']),
+              default='sheets', show_default=True,
+              help="Write the reports to Google Sheets or local files.")
+@click.option("--keyfile", type=click.Path(exists=True, readable=True),
+              envvar='COPHUB_KEYFILE',
+              help="The Google service account keyfile (sheets sink).")
+@click.option("--out-dir", type=click.Path(file_okay=False), default='.',
+              help="The directory to write the reports to (local sink).")
+@click.option("--push-raw/--no-push-raw", default=False, show_default=True,
+              help="Write the raw logs alongside the reports.")
+@click.option("--run-report", type=click.Path(dir_okay=False),
+              help="Write the stage timings to this JSON or CSV file.")
+@click.option("--profile", type=click.Choice(['cprofile', 'pyinstrument']),
+              help="Profile the run, printing the profile.")
+@click.option("--config", "config_fname",
+              type=click.Path(exists=True, dir_okay=False),
+              envvar='COPHUB_CONFIG',
+              help="A YAML or TOML file declaring the keyfile and folders.")
+
+
+def main(sara_fname, apache_fname, chunksize, rollup_fname, sink, keyfile,
+         out_dir, push_raw, run_report, profile, config_fname):
     """
     Main routine.
     """
-    sara_log(sara_fname)
-    # apache_log(apache_fname)
+    config = load_config(config_fname).reporting
+    if keyfile is None:
+        keyfile = config['keyfile']
+
+    if sink == 'sheets':
+        if keyfile is None:
+            raise click.UsageError("--keyfile (or COPHUB_KEYFILE, or the "
+                                   "reporting keyfile of the config) is "
+                                   "required for the sheets sink")
+        report_sink = SheetsSink(keyfile)
+    else:
+        report_sink = LocalSink(out_dir)
+
+    inst = Instrument('report')
+    with profiled(profile):
+        if sara_fname is not None:
+            with inst.stage('sara', 1, getsize(sara_fname)):
+                sara_log(sara_fname, report_sink, chunksize, rollup_fname,
+                         push_raw, config['sara_folder'])
+
+        if apache_fname is not None:
+            with inst.stage('apache', 1, getsize(apache_fname)):
+                apache_log(apache_fname, report_sink, chunksize,
+                           rollup_fname, push_raw, config['apache_folder'])
+
+    if run_report is not None:
+        inst.write_report(run_report)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,160 @@
+"""
+Restrict the scene records to a region of interest (ROI).
+
+An ROI is any polygon layer, optionally subset by its attributes
+(eg NAME == 'Australia' from TM_WORLD_BORDERS). The WRS-2 footprints
+intersecting the ROI are found using an STRtree spatial index, and
+the resulting set of path/row's is cached per ROI file hash, so that
+subsequent runs only need a vectorised `isin` over the scene records.
+
+A layer that already carries PATH/ROW attributes (eg the nominal
+scenes of ADGC_v2_Area_of_Interest.shp) is used as is, without any
+spatial query.
+"""
+
+import hashlib
+import json
+import os
+from os.path import exists, join as pjoin, splitext
+import tempfile
+
+import numpy
+
+
+SIDECARS = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+CACHE_DIR = 'roi-cache'
+
+
+def pathrow_keys(path, row):
+    """
+    Combine path and row into a single integer key, eg 90, 84 -> 90084.
+    """
+    return (numpy.asarray(path, dtype='int64') * 1000 +
+            numpy.asarray(row, dtype='int64'))
+
+
+def roi_hash(roi_fname, where=None, min_overlap=0.0):
+    """
+    A hash of the ROI file (and its sidecar files) along with the
+    parameters of the selection.
+    """
+    digest = hashlib.sha1()
+    base = splitext(roi_fname)[0]
+    fnames = [base + ext for ext in SIDECARS if exists(base + ext)]
+    if not fnames:
+        fnames = [roi_fname]
+
+    for fname in fnames:
+        with open(fname, 'rb') as src:
+            for block in iter(lambda: src.read(1 << 20), b''):
+                digest.update(block)
+
+    params = {'where': where, 'min_overlap': min_overlap}
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def intersecting_pathrows(roi_geometries, wrs2, min_overlap=0.0):
+    """
+    Find the WRS-2 footprints intersecting the ROI.
+
+    :param roi_geometries:
+        A list of shapely geometries, in the same coordinate
+        reference system as `wrs2`.
+
+    :param wrs2:
+        A `cophub.wrs2.Wrs2Index`.
+
+    :param min_overlap:
+        The minimum fraction of a footprint's area that must be within
+        the ROI. Default is 0.0, i.e. any intersection.
+
+    :return:
+        A sorted array of path/row keys (see `pathrow_keys`).
+    """
+    import shapely
+    from shapely.ops import unary_union
+
+    roi = unary_union(list(roi_geometries))
+
+    tree = wrs2.strtree()
+    idx = numpy.asarray(tree.query(roi, predicate='intersects'))
+
+    if min_overlap > 0 and len(idx):
+        footprints = wrs2.geometries[idx]
+        overlap = shapely.area(shapely.intersection(footprints, roi))
+        idx = idx[overlap / shapely.area(footprints) >= min_overlap]
+
+    path, row = wrs2.path_row()
+
+    return numpy.unique(pathrow_keys(path[idx], row[idx]))
+
+
+def roi_pathrows(roi_fname, wrs2, where=None, min_overlap=0.0,
+                 cache_dir=CACHE_DIR):
+    """
+    The path/row keys of the ROI, cached by the ROI file hash.
+
+    :param roi_fname:
+        The ROI polygon layer.
+
+    :param wrs2:
+        A `cophub.wrs2.Wrs2Index`.
+
+    :param where:
+        A dict of {attribute: value} selecting the features of the
+        ROI layer, eg {'NAME': 'Australia'}.
+        Default is None, i.e. every feature.
+
+    :param min_overlap:
+        See `intersecting_pathrows`.
+
+    :param cache_dir:
+        The directory containing the cached path/row keys.
+        Default is `CACHE_DIR`. If None, then nothing is cached.
+
+    :return:
+        A sorted array of path/row keys (see `pathrow_keys`).
+    """
+    if cache_dir is not None:
+        key = roi_hash(roi_fname, where, min_overlap)
+        cache_fname = pjoin(cache_dir, '{}.npy'.format(key))
+        if exists(cache_fname):
+            return numpy.load(cache_fname)
+
+    import geopandas
+
+    gdf = geopandas.read_file(roi_fname)
+    for attribute, value in (where or {}).items():
+        gdf = gdf[gdf[attribute] == value]
+
+    if 'PATH' in gdf.columns and 'ROW' in gdf.columns:
+        keys = numpy.unique(pathrow_keys(gdf['PATH'], gdf['ROW']))
+    else:
+        if gdf.crs is not None and wrs2.crs is not None:
+            gdf = gdf.to_crs(wrs2.crs)
+        keys = intersecting_pathrows(gdf.geometry, wrs2, min_overlap)
+
+    if cache_dir is not None:
+        # other stages may be populating the cache at the same time
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_fname = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as outf:
+                numpy.save(outf, keys)
+            os.replace(tmp_fname, cache_fname)
+        except BaseException:
+            os.remove(tmp_fname)
+            raise
+
+    return keys
+
+
+def filter_pathrows(df, keys):
+    """
+    Return the records of `df` whose path/row is one of `keys`.
+    """
+    wh = numpy.isin(pathrow_keys(df['path'], df['row']), keys)
+
+    return df[wh]
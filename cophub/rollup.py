@@ -0,0 +1,217 @@
+"""
+A persisted rollup of the daily usage aggregates of the NCI logs.
+
+Each log is reduced to daily aggregates, eg the traffic and hits per
+date x dataset x service x country of the Apache log, which are
+appended to a table per log type within an HDF5 file:
+
+    usage-rollup.h5
+        /apache
+        /sara
+        /sources
+
+The sources table records the SHA1 of every log folded into the
+rollup, so that a log is only ever folded in once. Year-to-date and
+trend reports are then compiled from the rollup, without re-reading
+any raw logs.
+"""
+
+import hashlib
+from os.path import basename, exists
+
+import pandas
+
+from cophub.records import append_table
+
+
+ROLLUP_FNAME = 'usage-rollup.h5'
+SOURCES_KEY = 'sources'
+
+# log type: (the date column, aggregation keys, summed values)
+LOGS = {'apache': ('date',
+                   ['date', 'dataset', 'service', 'country'],
+                   ['hits', 'traffic_data', 'access_count']),
+        'sara': ('querytime',
+                 ['date', 'collection', 'service', 'method'],
+                 ['count'])}
+
+
+def file_digest(fname):
+    """
+    The SHA1 of a file's contents.
+    """
+    digest = hashlib.sha1()
+    with open(fname, 'rb') as src:
+        for block in iter(lambda: src.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def daily_aggregates(chunk, log):
+    """
+    Reduce a chunk of log records to their daily aggregates.
+
+    :param chunk:
+        A `pandas.DataFrame` of log records.
+
+    :param log:
+        The log type, i.e. a key of `LOGS`.
+
+    :return:
+        A `pandas.DataFrame` with the key and value columns of the
+        log type, with a row per distinct key.
+    """
+    date_column, keys, values = LOGS[log]
+
+    chunk = chunk.assign(date=pandas.to_datetime(chunk[date_column])
+                         .dt.normalize())
+    daily = chunk.groupby(keys, observed=True, dropna=False)[values].sum()
+
+    # the categories of each chunk differ, so use plain strings
+    daily = daily.reset_index()
+    for col in keys[1:]:
+        daily[col] = daily[col].astype(object)
+
+    return daily
+
+
+def combine(frames, log):
+    """
+    Combine daily aggregates, summing the values of identical keys.
+    """
+    _, keys, values = LOGS[log]
+    frames = [df for df in frames if df is not None and len(df)]
+    if not frames:
+        return pandas.DataFrame(columns=keys + values)
+
+    df = pandas.concat(frames, ignore_index=True)
+    daily = df.groupby(keys, dropna=False)[values].sum()
+
+    return daily.reset_index()
+
+
+def month_label(daily):
+    """
+    The month a log covers, eg '201806', taken as the month of the
+    majority of its records.
+    """
+    months = daily['date'].dt.strftime('%Y%m')
+
+    return months.value_counts().index[0]
+
+
+def load_sources(rollup_fname=ROLLUP_FNAME):
+    """
+    The logs folded into the rollup.
+    """
+    if not exists(rollup_fname):
+        return pandas.DataFrame(columns=['log', 'source', 'sha1',
+                                         'folded_at'])
+
+    with pandas.HDFStore(rollup_fname, 'r') as store:
+        if SOURCES_KEY not in store:
+            return pandas.DataFrame(columns=['log', 'source', 'sha1',
+                                             'folded_at'])
+        return store[SOURCES_KEY]
+
+
+def is_folded(source_fname, rollup_fname=ROLLUP_FNAME, digest=None):
+    """
+    Has the log already been folded into the rollup?
+    """
+    if digest is None:
+        digest = file_digest(source_fname)
+
+    return bool((load_sources(rollup_fname)['sha1'] == digest).any())
+
+
+def fold_log(daily, log, source_fname, rollup_fname=ROLLUP_FNAME):
+    """
+    Fold the daily aggregates of a log into the rollup.
+
+    :param daily:
+        The daily aggregates of the entire log, see `daily_aggregates`.
+
+    :param log:
+        The log type, i.e. a key of `LOGS`.
+
+    :param source_fname:
+        The log the aggregates were derived from.
+
+    :return:
+        True if the log was folded in, or False if it already had
+        been.
+    """
+    digest = file_digest(source_fname)
+    if is_folded(source_fname, rollup_fname, digest):
+        return False
+
+    source = pandas.DataFrame({'log': [log],
+                               'source': [basename(source_fname)],
+                               'sha1': [digest],
+                               'folded_at': [pandas.Timestamp.now()]})
+
+    with pandas.HDFStore(rollup_fname, 'a', complib='blosc') as store:
+        append_table(store, log, daily)
+        append_table(store, SOURCES_KEY, source)
+
+    return True
+
+
+def load_rollup(log, start=None, end=None, rollup_fname=ROLLUP_FNAME):
+    """
+    Load the daily aggregates of a log type.
+
+    :param start:
+        The first date to include. Default is None, i.e. from the
+        first date in the rollup.
+
+    :param end:
+        The last date to include. Default is None, i.e. up to the
+        last date in the rollup.
+
+    :return:
+        A `pandas.DataFrame` of the daily aggregates, combined across
+        the logs that were folded in.
+    """
+    with pandas.HDFStore(rollup_fname, 'r') as store:
+        daily = store[log] if log in store else None
+
+    if daily is not None:
+        wh = pandas.Series(True, index=daily.index)
+        if start is not None:
+            wh &= daily['date'] >= pandas.Timestamp(start)
+        if end is not None:
+            wh &= daily['date'] <= pandas.Timestamp(end)
+        daily = daily[wh]
+
+    # logs may overlap at their boundaries
+    return combine([daily], log)
+
+
+def year_to_date(log, end=None, rollup_fname=ROLLUP_FNAME):
+    """
+    Load the daily aggregates of a log type, from the start of the
+    year of `end` (default is today) up to `end`.
+    """
+    end = pandas.Timestamp.now() if end is None else pandas.Timestamp(end)
+    start = pandas.Timestamp(year=end.year, month=1, day=1)
+
+    return load_rollup(log, start, end, rollup_fname)
+
+
+def trend(daily, by, value, freq='MS'):
+    """
+    Tabulate a value of the daily aggregates by period and key,
+    eg the monthly traffic per dataset.
+
+    :return:
+        A `pandas.DataFrame` indexed by period, with a column per
+        distinct value of `by`.
+    """
+    grouper = [pandas.Grouper(key='date', freq=freq), by]
+    table = daily.groupby(grouper)[value].sum().unstack(by, fill_value=0)
+    table.index.name = 'date'
+
+    return table
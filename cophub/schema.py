@@ -0,0 +1,190 @@
+"""
+The compact schema of the harvested scene tables.
+
+The level1 names, and the children names predicted from them, are
+long and mostly unique strings, yet they are entirely determined by
+a handful of low cardinality components. Rather than the names, the
+tables hold:
+
+    * the directory and the name components as categoricals
+      (eg `level1_dir`, `spacecraft_id`, `station_id`)
+    * the path and row as int16, and the acquisition date as datetime64
+    * the pass id and pass name as categoricals
+    * the counters as int32 (see `cophub.records.INTEGER_DTYPES`)
+
+The names are rebuilt on demand:
+
+    compact = compact_scenes(oth_df)
+    level1_names(compact)
+    product_paths(compact, registry)
+"""
+
+import numpy
+import pandas
+
+from cophub.names import PRODUCTS, parse_level1_names, product_names
+
+
+# the components of the level1 names held as categoricals
+NAME_CATEGORICALS = ['spacecraft_id', 'sensor_id', 'product_type',
+                     'product_id', 'product_code', 'station_id']
+
+# the categoricals shared by every scene of a pass
+PASS_CATEGORICALS = ['pass_id', 'pass_name', 'sensor']
+
+
+def level1_basenames(df):
+    """
+    Rebuild the level1 names (without the directory) from their
+    components, eg LS7_ETM_OTH_P51_GALPGS01-002_090_070_20160401.
+    """
+    def text(col):
+        return df[col].astype(object)
+
+    dates = df['acquisition_date'].dt.strftime('%Y%m%d').astype(object)
+
+    return (text('spacecraft_id') + '_' + text('sensor_id') + '_' +
+            text('product_type') + '_' + text('product_id') + '_GA' +
+            text('product_code') + '-' + text('station_id') + '_' +
+            df['path'].map('{:03d}'.format).astype(object) + '_' +
+            df['row'].map('{:03d}'.format).astype(object) + '_' + dates)
+
+
+def level1_names(df):
+    """
+    The full level1 names of a compact table.
+    Any name that couldn't be parsed is held as is in `level1_name`.
+    """
+    dirs = df['level1_dir'].astype(object)
+    names = dirs.where(dirs == '', dirs + '/') + level1_basenames(df)
+
+    if 'level1_name' in df.columns:
+        text = df['level1_name'].astype(object)
+        names = text.where(text.notnull(), names)
+
+    return names
+
+
+def name_components(df):
+    """
+    The components of a compact table as returned by
+    `cophub.names.parse_level1_names`, without parsing any names.
+    """
+    components = pandas.DataFrame(index=df.index)
+    for col in NAME_CATEGORICALS:
+        components[col] = df[col].astype(object)
+
+    dates = df['acquisition_date']
+    components['wrs_path'] = df['path'].map('{:03d}'.format)
+    components['wrs_row'] = df['row'].map('{:03d}'.format)
+    components['acquisition_date'] = dates.dt.strftime('%Y%m%d')
+    components['sensor'] = components['spacecraft_id'].str.lower()
+    components['year'] = dates.dt.strftime('%Y')
+    components['month'] = dates.dt.strftime('%m')
+    components['date'] = dates
+
+    return components
+
+
+def product_paths(df, registry=None, products=None):
+    """
+    Rebuild the predicted children names of a compact table.
+    See `cophub.names.product_names`.
+    """
+    return product_names(name_components(df), products,
+                         PRODUCTS if registry is None else registry)
+
+
+def _categorical(values):
+    return pandas.Categorical(numpy.asarray(values, dtype=object))
+
+
+def compact_scenes(df):
+    """
+    Convert a harvested scene table into the compact schema. The
+    `level1_name` and any `{product}_name` columns are replaced by the
+    components they are built from.
+
+    :param df:
+        A `pandas.DataFrame` as created by
+        `cophub.records.frame_from_columns`, optionally with the
+        predicted children names and their existence.
+
+    :return:
+        A `pandas.DataFrame`.
+    """
+    names = df['level1_name'].astype(object)
+    # an empty series partitions into a frame without any columns
+    parts = names.str.rpartition('/').reindex(columns=[0, 1, 2])
+    basenames = parts[2]
+    components = parse_level1_names(basenames)
+
+    result = pandas.DataFrame(index=df.index)
+    result['level1_dir'] = _categorical(parts[0])
+    for col in NAME_CATEGORICALS:
+        result[col] = _categorical(components[col])
+    result['acquisition_date'] = components['date']
+
+    product_columns = [col for col in df.columns
+                       if col.endswith('_name') and
+                       col not in ('level1_name', 'pass_name')]
+    for col in df.columns:
+        if col == 'level1_name' or col in product_columns:
+            continue
+        if col in PASS_CATEGORICALS:
+            result[col] = df[col].astype('category')
+        else:
+            result[col] = df[col]
+
+    result['path'] = result['path'].astype('int16')
+    result['row'] = result['row'].astype('int16')
+
+    # keep the names that don't round trip
+    rebuilt = level1_basenames(result)
+    odd = (rebuilt != basenames).values | components['date'].isnull().values
+    if odd.any():
+        result['level1_name'] = _categorical(names.where(odd))
+
+    return result
+
+
+def put_table(store, key, df):
+    """
+    Write a compact table to a `pandas.HDFStore` in table format,
+    retaining the categoricals.
+
+    pandas doesn't write an empty table, so an empty frame is written
+    in the fixed format instead, its categoricals as strings, with the
+    dtypes recorded so that `get_table` restores them.
+    """
+    if len(df) > 0:
+        store.put(key, df, format='table')
+        return
+
+    dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    empty = df.copy()
+    for col in empty.columns:
+        if isinstance(empty[col].dtype, pandas.CategoricalDtype):
+            empty[col] = empty[col].astype(object)
+
+    store.put(key, empty, format='fixed')
+    store.get_storer(key).attrs.compact_dtypes = dtypes
+
+
+def get_table(store, key):
+    """
+    Read a table written by `put_table`.
+    """
+    df = store[key]
+    dtypes = getattr(store.get_storer(key).attrs, 'compact_dtypes', None)
+    if dtypes:
+        df = df.astype(dtypes)
+
+    return df
+
+
+def memory_usage(df):
+    """
+    The bytes held by a table, including the strings.
+    """
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,357 @@
+"""
+Report sinks; where the usage reports are written to.
+
+A `Report` is a title plus a list of sections, each a table placed on
+a named sheet under a heading. A sink writes the report, and
+optionally the raw log, to its destination:
+
+    * `LocalSink` writes an xlsx workbook, a Parquet file per section
+      and a Markdown document, for offline use
+    * `SheetsSink` writes a Google spreadsheet, with everything on a
+      sheet sent as a single range update
+
+    report = Report('SARA-History-201807', template)
+    report.add('c_downloads', 'Collection Summary',
+               'No. of downloads per Sentinel collection', c_summary,
+               ['Collection', 'Downloads'])
+    LocalSink('reports').write(report)
+"""
+
+from collections import namedtuple
+import os
+from os.path import exists, join as pjoin
+from string import Formatter
+
+import numpy
+import pandas
+
+
+Section = namedtuple('Section', ['key', 'sheet', 'title', 'frame', 'header'])
+
+# the number of blank rows separating the sections of a sheet
+SECTION_GAP = 5
+
+GOOGLE_SCOPES = ['https://www.googleapis.com/auth/drive']
+
+
+class Report(object):
+    """
+    A report of one or more tables.
+
+    :param title:
+        The title, eg 'SARA-History-201807', which also names the
+        spreadsheet or files written.
+
+    :param template:
+        An optional Markdown template, formatted with a table per
+        section key. Default is None, i.e. a heading per section.
+
+    :param folder:
+        The ID of the Drive folder the report belongs in, used by
+        `SheetsSink`. Default is None.
+    """
+
+    def __init__(self, title, template=None, folder=None):
+        self.title = title
+        self.template = template
+        self.folder = folder
+        self.sections = []
+
+    def add(self, key, sheet, title, frame, header=None):
+        """
+        Add a section.
+
+        :param key:
+            The name of the section within the Markdown template.
+
+        :param sheet:
+            The sheet to place the section on.
+
+        :param title:
+            The heading of the section.
+
+        :param frame:
+            The `pandas.DataFrame` to tabulate. Its index is written
+            as the first column.
+
+        :param header:
+            An optional list replacing the leading column names, eg
+            ['Collection', 'Downloads']. Default is None, i.e. the
+            index and column names of `frame`.
+        """
+        self.sections.append(Section(key, sheet, title, frame, header))
+
+    def sheets(self):
+        """
+        The sections grouped by sheet, in the order they were added.
+        """
+        result = {}
+        for section in self.sections:
+            result.setdefault(section.sheet, []).append(section)
+
+        return result
+
+
+def _cell(value):
+    """
+    Convert a value into one that can be serialised to a sheet.
+    """
+    if isinstance(value, numpy.generic):
+        value = value.item()
+    # NaN, NaT and the NA of the nullable dtypes
+    if pandas.api.types.is_scalar(value) and pandas.isna(value):
+        return ''
+    if isinstance(value, (pandas.Timestamp, pandas.Period)):
+        return str(value)
+
+    return value
+
+
+def table_rows(section):
+    """
+    The header and data rows of a section.
+    """
+    frame = section.frame.reset_index()
+    header = [str(col) for col in frame.columns]
+    if section.header:
+        header[:len(section.header)] = section.header
+
+    rows = [[_cell(value) for value in row]
+            for row in frame.itertuples(index=False)]
+
+    return [header] + rows
+
+
+def sheet_values(sections):
+    """
+    The values of a sheet; each section's heading, a blank row and its
+    table, separated by `SECTION_GAP` rows.
+    """
+    values = []
+    for section in sections:
+        if values:
+            values.extend([[]] * SECTION_GAP)
+        values.append([section.title])
+        values.append([])
+        values.extend(table_rows(section))
+
+    width = max(len(row) for row in values)
+
+    # pad to a rectangle
+    return [row + [''] * (width - len(row)) for row in values]
+
+
+def markdown(report):
+    """
+    Render a report as Markdown, using its template if it has one.
+    Any section the template doesn't mention is appended with its own
+    heading, rather than being left out.
+    """
+    import tabulate
+
+    tables = {}
+    for section in report.sections:
+        rows = table_rows(section)
+        tables[section.key] = tabulate.tabulate(rows[1:], rows[0],
+                                                tablefmt='pipe')
+
+    if report.template is None:
+        parts = ['# {}\n'.format(report.title)]
+        fields = set()
+    else:
+        parts = [report.template.format(**tables)]
+        fields = {field for _, field, _, _ in
+                  Formatter().parse(report.template)}
+
+    for section in report.sections:
+        if section.key not in fields:
+            parts.append('## {}\n\n{}\n'.format(section.title,
+                                                tables[section.key]))
+
+    return '\n'.join(parts)
+
+
+class LocalSink(object):
+    """
+    Write reports to local files:
+
+        {out_dir}/{title}.xlsx
+        {out_dir}/{title}.md
+        {out_dir}/{title}/{key}.parquet
+        {out_dir}/{title}/{raw_title}.parquet
+
+    :param out_dir:
+        The directory to write to.
+
+    :param formats:
+        Any of 'xlsx', 'parquet' and 'md'. Default is all of them.
+    """
+
+    def __init__(self, out_dir='.', formats=('xlsx', 'parquet', 'md')):
+        self.out_dir = out_dir
+        self.formats = formats
+
+    def write(self, report, raw=None, raw_title='Log'):
+        """
+        Write a report.
+
+        :param raw:
+            An optional iterator of `pandas.DataFrame` chunks of the
+            raw log, written as Parquet.
+
+        :param raw_title:
+            The name of the raw log file.
+
+        :return:
+            A list of the files written.
+        """
+        if not exists(self.out_dir):
+            os.makedirs(self.out_dir)
+
+        written = []
+        base = pjoin(self.out_dir, report.title)
+
+        if 'xlsx' in self.formats:
+            fname = base + '.xlsx'
+            with pandas.ExcelWriter(fname) as writer:
+                for sheet, sections in report.sheets().items():
+                    values = pandas.DataFrame(sheet_values(sections))
+                    values.to_excel(writer, sheet_name=sheet, index=False,
+                                    header=False)
+            written.append(fname)
+
+        if 'md' in self.formats:
+            fname = base + '.md'
+            with open(fname, 'w') as outf:
+                outf.write(markdown(report))
+            written.append(fname)
+
+        if 'parquet' in self.formats:
+            if not exists(base):
+                os.makedirs(base)
+            for section in report.sections:
+                fname = pjoin(base, '{}.parquet'.format(section.key))
+                frame = section.frame.reset_index()
+                frame.columns = [str(col) for col in frame.columns]
+                frame.to_parquet(fname, index=False)
+                written.append(fname)
+
+            if raw is not None:
+                fname = pjoin(base, '{}.parquet'.format(raw_title))
+                written.append(self._write_raw(raw, fname))
+
+        return written
+
+    @staticmethod
+    def _write_raw(raw, fname):
+        import pyarrow
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in raw:
+                # the categories of each chunk differ
+                for col in chunk.columns:
+                    if isinstance(chunk[col].dtype, pandas.CategoricalDtype):
+                        chunk[col] = chunk[col].astype(str)
+
+                if writer is None:
+                    table = pyarrow.Table.from_pandas(chunk,
+                                                      preserve_index=False)
+                    writer = pq.ParquetWriter(fname, table.schema)
+                else:
+                    table = pyarrow.Table.from_pandas(chunk, writer.schema,
+                                                      preserve_index=False)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return fname
+
+
+class SheetsSink(object):
+    """
+    Write reports to Google Sheets.
+
+    Each sheet of the report is created at its final size and written
+    with a single range update, so a report costs a handful of round
+    trips regardless of the number of cells.
+
+    :param keyfile:
+        The service account JSON keyfile.
+    """
+
+    def __init__(self, keyfile):
+        self.keyfile = keyfile
+        self._client = None
+
+    @property
+    def client(self):
+        """
+        The authorised pygsheets client, authorised on first use.
+        """
+        if self._client is None:
+            from oauth2client.service_account import ServiceAccountCredentials
+            import pygsheets
+
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(
+                self.keyfile, GOOGLE_SCOPES)
+            self._client = pygsheets.authorize(credentials=credentials)
+
+        return self._client
+
+    def write(self, report, raw=None, raw_title='Log'):
+        """
+        Write a report as a new spreadsheet, within the Drive folder
+        of the report.
+
+        :param raw:
+            An optional iterator of `pandas.DataFrame` chunks of the
+            raw log, written to the first sheet one chunk per update.
+
+        :param raw_title:
+            The title of the raw log sheet.
+
+        :return:
+            The `pygsheets.Spreadsheet`.
+        """
+        sheets = self.client.create(report.title, parent_id=report.folder)
+
+        first = sheets.sheet1
+        for sheet, sections in report.sheets().items():
+            values = sheet_values(sections)
+            nrows, ncols = len(values), len(values[0])
+
+            if first is not None and raw is None:
+                # reuse the default sheet
+                worksheet = first
+                worksheet.title = sheet
+                worksheet.resize(nrows, ncols)
+                first = None
+            else:
+                worksheet = sheets.add_worksheet(sheet, rows=nrows,
+                                                 cols=ncols)
+
+            worksheet.update_values('A1', values)
+
+        if raw is not None:
+            first.title = raw_title
+            self._write_raw(first, raw)
+
+        return sheets
+
+    @staticmethod
+    def _write_raw(worksheet, raw):
+        row = 1
+        for chunk in raw:
+            header = row == 1
+            nrows = len(chunk) + header
+
+            # the missing values of the nullable counters as empty cells
+            chunk = chunk.astype(object).where(chunk.notna(), '')
+
+            # see https://github.com/nithinmurali/pygsheets/issues/124
+            worksheet.rows = row + nrows - 1
+            worksheet.set_dataframe(chunk, (row, 1), copy_head=header)
+            row += nrows
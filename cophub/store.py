@@ -0,0 +1,222 @@
+"""
+A columnar on-disk store for the harvested collection, kept alongside
+the HDF5 files.
+
+Each table is written as a Parquet dataset partitioned by
+`sensor`/`year`/`month`, eg:
+
+    collection-completeness.parquet/
+        oth_and_children_products/sensor=LS8/year=2016/month=4/...
+        sys_products/sensor=LS8/year=2016/month=4/...
+
+so that a consumer needing a single sensor-month reads only those
+files, and only the columns it asks for.
+
+Each harvest is written to a temporary directory which then replaces
+the previous dataset, so partitions that no longer exist aren't left
+behind, and a failed write leaves the previous dataset intact. The
+harvest id is recorded in both the HDF5 file and the dataset, and the
+dataset is only read in place of the HDF5 file when the two agree.
+"""
+
+import os
+from os.path import exists, join as pjoin
+import re
+import shutil
+import uuid
+import warnings
+
+import pandas
+
+from cophub.passes import pass_mask
+from cophub.schema import get_table
+
+
+PARQUET_ROOT = 'collection-completeness.parquet'
+HDF5_FNAME = 'collection-completeness.h5'
+PARTITIONS = ['sensor', 'year', 'month']
+
+# the harvest id is held in the HDF5 file under this key, and in this
+# file within a dataset (files starting with _ aren't read as data)
+HARVEST_KEY = 'harvest'
+HARVEST_MARKER = '_harvest_id'
+
+# eg LS8, LS8-2016, LS8-201604
+SELECTION_PATTERN = re.compile(r'^(?P<sensor>LS\d)'
+                               r'(-(?P<year>\d{4})(?P<month>\d{2})?)?$')
+
+
+def parse_selection(selection):
+    """
+    Parse a selection such as 'LS8-201604' into a dict of
+    {partition: value}. The year and month are optional.
+    """
+    match = SELECTION_PATTERN.match(selection)
+    if match is None:
+        msg = "Invalid selection: {}; expected eg LS8, LS8-2016, LS8-201604"
+        raise ValueError(msg.format(selection))
+
+    result = {'sensor': match.group('sensor')}
+    if match.group('year'):
+        result['year'] = int(match.group('year'))
+    if match.group('month'):
+        result['month'] = int(match.group('month'))
+
+    return result
+
+
+def selection_filters(selection):
+    """
+    Convert a selection into the filters understood by
+    `pandas.read_parquet`.
+    """
+    return [(key, '=', value)
+            for key, value in parse_selection(selection).items()]
+
+
+def new_harvest_id():
+    """
+    A unique id for a harvest.
+    """
+    return uuid.uuid4().hex
+
+
+def write_harvest_id(store, harvest_id):
+    """
+    Record the harvest id within an open `pandas.HDFStore`.
+    """
+    store[HARVEST_KEY] = pandas.DataFrame({'harvest_id': [harvest_id]})
+
+
+def h5_harvest_id(h5_fname):
+    """
+    The harvest id recorded in an HDF5 file, or None.
+    """
+    if not exists(h5_fname):
+        return None
+
+    with pandas.HDFStore(h5_fname, 'r') as store:
+        if HARVEST_KEY not in store:
+            return None
+        return store[HARVEST_KEY]['harvest_id'].iloc[0]
+
+
+def dataset_harvest_id(path):
+    """
+    The harvest id recorded in a Parquet dataset, or None.
+    """
+    fname = pjoin(path, HARVEST_MARKER)
+    if not exists(fname):
+        return None
+
+    with open(fname) as src:
+        return src.read().strip()
+
+
+def replace_directory(src, dst):
+    """
+    Replace the directory `dst` with `src`, removing the previous
+    contents of `dst`.
+    """
+    old = '{}.old-{}'.format(dst, os.getpid())
+    if exists(dst):
+        os.rename(dst, old)
+    os.rename(src, dst)
+    if exists(old):
+        shutil.rmtree(old)
+
+
+def write_dataset(df, path, harvest_id=None):
+    """
+    Write a table as a Parquet dataset partitioned by
+    sensor/year/month, replacing any previous dataset in its entirety.
+    The year and month are derived from the `date` column.
+
+    :param harvest_id:
+        The id of the harvest (see `new_harvest_id`), recorded within
+        the dataset. Default is None.
+    """
+    import pyarrow
+    import pyarrow.parquet as pq
+
+    df = df.copy()
+    df['sensor'] = df['sensor'].astype(str)
+    df['year'] = df['date'].dt.year
+    df['month'] = df['date'].dt.month
+
+    path = path.rstrip('/')
+    tmp_path = '{}.tmp-{}'.format(path, os.getpid())
+    if exists(tmp_path):
+        shutil.rmtree(tmp_path)
+
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, tmp_path, partition_cols=PARTITIONS)
+
+    if harvest_id is not None:
+        with open(pjoin(tmp_path, HARVEST_MARKER), 'w') as outf:
+            outf.write(harvest_id)
+
+    replace_directory(tmp_path, path)
+
+
+def read_dataset(path, selection=None, columns=None):
+    """
+    Read a table from a Parquet dataset.
+
+    :param path:
+        The directory containing the dataset.
+
+    :param selection:
+        A selection such as 'LS8-201604' (see `parse_selection`),
+        used to only read the matching partitions.
+        Default is None, i.e. the entire table.
+
+    :param columns:
+        The columns to read. Default is None, i.e. every column.
+    """
+    filters = None if selection is None else selection_filters(selection)
+    df = pandas.read_parquet(path, engine='pyarrow', columns=columns,
+                             filters=filters)
+
+    # partition values are read as categoricals
+    for col in ['year', 'month']:
+        if col in df.columns:
+            df[col] = df[col].astype('int64')
+
+    return df
+
+
+def load_products(key, selection=None, columns=None,
+                  parquet_root=PARQUET_ROOT, h5_fname=HDF5_FNAME):
+    """
+    Load a harvested table, eg 'oth_and_children_products', from the
+    Parquet dataset if it exists and is of the same harvest as the
+    HDF5 file, otherwise from the HDF5 file, in which case the entire
+    table is read before the selection is made.
+    """
+    path = pjoin(parquet_root, key)
+    if exists(path):
+        if not exists(h5_fname):
+            return read_dataset(path, selection, columns)
+
+        harvest_id = h5_harvest_id(h5_fname)
+        if harvest_id is not None and \
+                harvest_id == dataset_harvest_id(path):
+            return read_dataset(path, selection, columns)
+
+        msg = ("The Parquet dataset {} isn't of the same harvest as {}; "
+               "reading {}")
+        warnings.warn(msg.format(path, h5_fname, h5_fname))
+
+    with pandas.HDFStore(h5_fname, 'r') as store:
+        df = get_table(store, key)
+
+    if selection is not None:
+        # validate the selection
+        parse_selection(selection)
+        df = df[pass_mask(df['pass_id'], selection)]
+
+    if columns is not None:
+        df = df[columns]
+
+    return df
@@ -0,0 +1,204 @@
+"""
+A compact path/row lookup of the WRS-2 footprints.
+
+Rather than merging the polygon of each footprint into every scene
+record, the shapefile is read once and cached as:
+
+    * a (path, row) keyed integer array of geometry indices
+    * a table of the geometries serialised as WKB
+
+The geometry is then only attached to the (usually small) subset of
+scenes being plotted or spatially selected.
+"""
+
+import os
+from os.path import abspath, dirname, exists, getmtime, splitext
+import tempfile
+import warnings
+
+import numpy
+
+
+# WRS-2 paths are numbered 1-233 and rows 1-248
+MAX_PATH = 233
+MAX_ROW = 248
+
+
+class Wrs2Index(object):
+    """
+    Path/row lookup of the WRS-2 footprint geometries.
+
+    :param lookup:
+        An integer array of shape (MAX_PATH + 1, MAX_ROW + 1),
+        containing the index into `geometries` of each path/row,
+        or -1 where there is no footprint.
+
+    :param geometries:
+        An object array of shapely geometries.
+
+    :param crs:
+        The coordinate reference system of the geometries.
+    """
+
+    def __init__(self, lookup, geometries, crs=None):
+        self.lookup = lookup
+        self.geometries = geometries
+        self.crs = crs
+        self._tree = None
+
+    def __len__(self):
+        return len(self.geometries)
+
+    @classmethod
+    def from_shapefile(cls, fname):
+        """
+        Build the index from the WRS-2 shapefile.
+        """
+        import geopandas
+
+        gdf = geopandas.read_file(fname)
+
+        lookup = numpy.full((MAX_PATH + 1, MAX_ROW + 1), -1, dtype='int32')
+        lookup[gdf['PATH'].values, gdf['ROW'].values] = numpy.arange(len(gdf))
+
+        geometries = numpy.empty(len(gdf), dtype=object)
+        geometries[:] = list(gdf.geometry)
+
+        crs = None if gdf.crs is None else gdf.crs.to_wkt()
+
+        return cls(lookup, geometries, crs)
+
+    @classmethod
+    def load(cls, fname):
+        """
+        Load an index saved by `save`.
+        """
+        from shapely import wkb
+
+        with numpy.load(fname) as data:
+            lookup = data['lookup']
+            buffer = data['wkb'].tobytes()
+            offsets = data['offsets']
+            crs = str(data['crs']) or None
+
+        geometries = numpy.empty(len(offsets) - 1, dtype=object)
+        geometries[:] = [wkb.loads(buffer[offsets[i]:offsets[i + 1]])
+                         for i in range(len(offsets) - 1)]
+
+        return cls(lookup, geometries, crs)
+
+    def save(self, fname):
+        """
+        Save the index; the geometries are serialised as a single
+        WKB buffer plus offsets. The file is written under a temporary
+        name and then renamed, so that concurrent readers and writers
+        never see a partial file.
+        """
+        from shapely import wkb
+
+        blobs = [wkb.dumps(geom) for geom in self.geometries]
+        offsets = numpy.zeros(len(blobs) + 1, dtype='int64')
+        offsets[1:] = numpy.cumsum([len(blob) for blob in blobs])
+        buffer = numpy.frombuffer(b''.join(blobs), dtype='uint8')
+
+        fd, tmp_fname = tempfile.mkstemp(suffix='.tmp',
+                                         dir=dirname(abspath(fname)))
+        try:
+            with os.fdopen(fd, 'wb') as outf:
+                numpy.savez(outf, lookup=self.lookup, wkb=buffer,
+                            offsets=offsets, crs=numpy.array(self.crs or ''))
+            os.replace(tmp_fname, fname)
+        except BaseException:
+            os.remove(tmp_fname)
+            raise
+
+    def path_row(self):
+        """
+        The path and row of each geometry, as a tuple of arrays.
+        """
+        path, row = numpy.nonzero(self.lookup >= 0)
+        order = numpy.argsort(self.lookup[path, row])
+
+        return path[order], row[order]
+
+    def strtree(self):
+        """
+        An STRtree spatial index of the geometries, built on first use.
+        """
+        if self._tree is None:
+            import shapely
+            self._tree = shapely.STRtree(self.geometries)
+
+        return self._tree
+
+    def indices(self, path, row):
+        """
+        The geometry index of each path/row, or -1 where the path/row
+        isn't a WRS-2 footprint.
+        """
+        path = numpy.asarray(path, dtype='int64')
+        row = numpy.asarray(row, dtype='int64')
+
+        valid = (path >= 0) & (path <= MAX_PATH) & (row >= 0) & \
+            (row <= MAX_ROW)
+        result = numpy.full(path.shape, -1, dtype='int32')
+        result[valid] = self.lookup[path[valid], row[valid]]
+
+        return result
+
+    def contains(self, path, row):
+        """
+        A boolean array indicating which path/row's are footprints.
+        """
+        return self.indices(path, row) >= 0
+
+    def geometry(self, path, row):
+        """
+        An object array of the footprint of each path/row;
+        None where the path/row isn't a footprint.
+        """
+        idx = self.indices(path, row)
+        result = numpy.empty(len(idx), dtype=object)
+        valid = idx >= 0
+        result[valid] = self.geometries[idx[valid]]
+
+        return result
+
+    def attach_geometry(self, df):
+        """
+        Return a `geopandas.GeoDataFrame` of `df` (which requires the
+        `path` and `row` columns) with the footprint of each record.
+        """
+        import geopandas
+
+        geometry = self.geometry(df['path'].values, df['row'].values)
+
+        return geopandas.GeoDataFrame(df, geometry=list(geometry),
+                                      crs=self.crs)
+
+
+def load_wrs2(shapefile, cache_fname=None):
+    """
+    Load the WRS-2 index, using the cache if it is newer than the
+    shapefile, otherwise building (and caching) it from the shapefile.
+
+    :param cache_fname:
+        Default is None, i.e. alongside the shapefile,
+        eg wrs2_descending-index.npz. If the cache can't be written,
+        eg the shapefile resides in a read-only directory, then the
+        index is used without caching it.
+    """
+    if cache_fname is None:
+        cache_fname = splitext(shapefile)[0] + '-index.npz'
+
+    if exists(cache_fname) and (not exists(shapefile) or
+                                getmtime(cache_fname) >= getmtime(shapefile)):
+        return Wrs2Index.load(cache_fname)
+
+    index = Wrs2Index.from_shapefile(shapefile)
+    try:
+        index.save(cache_fname)
+    except OSError as exc:
+        warnings.warn("Unable to cache the WRS-2 index: {}".format(exc))
+
+    return index
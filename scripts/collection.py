@@ -1,134 +1,109 @@
 #!/usr/bin/env python
 
-from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib.backends.backend_pdf import PdfPages
+import argparse
+
 import pandas
-import geopandas
-
-
-def match_pass_id(row, pid):
-    # eg contains 'LS5-199101' to get 1991 Jan
-    return row.str.contains(pid)
-
-def sensor(row):                                   
-    return row.split('-')[0]
-
-def dt(row):                                       
-    return datetime.strptime(row.split('-')[1], '%Y%m%d')
-
-wrs2_fname = 'wrs2-descending/wrs2_descending.shp'
-fname = 'collection-completeness.h5'
-tm_fname = 'tm-world-borders/TM_WORLD_BORDERS-0.3.shp'
-
-store = pandas.HDFStore(fname)
-oth_df = store['/oth_and_children_products']
-sys_df = store['/sys_products']
-wrs_df = geopandas.read_file(wrs2_fname)
-wrs_df.rename(columns={'PATH': 'path', 'ROW': 'row'}, inplace=True)
-
-oth_df = pandas.merge(oth_df, wrs_df, on=['path', 'row'])
-sys_df = pandas.merge(sys_df, wrs_df, on=['path', 'row'])
-
-store2 = pandas.HDFStore('collection-merge2.h5', 'w', complib='blosc')
-store2['oth_merge'] = oth_df
-store2['sys_merge'] = sys_df
-
-oth_groups = oth_df.groupby('pass_id')
-sys_groups = sys_df.groupby('pass_id')
-
-oth_wh = oth_groups.pass_id.apply(match_pass_id, 'LS5-199101')
-sys_wh = sys_groups.pass_id.apply(match_pass_id, 'LS5-199101')
-
-oth_subs_gdf = geopandas.GeoDataFrame(oth_df[oth_wh])
-sys_subs_gdf = geopandas.GeoDataFrame(sys_df[sys_wh])
-
-tm = geopandas.read_file(tm_fname)
-aus = tm[tm['NAME'] == 'Australia']
-
-oth_grps = oth_subs_gdf.groupby('pass_id')
-sys_grps = sys_subs_gdf.groupby('pass_id')
-
-# with PdfPages('ls5-1991-Jan-pass.pdf') as pdf:
-#     for name, grp in oth_grps:
-#         ax = aus.plot()
-#         ax.set_title(name)
-#         grp.plot('path', ax=ax)
-#         try:
-#             sys_grps.get_group(name).plot('path', edgecolor='red', ax=ax)
-#         except KeyError:
-#             pass
-#         pdf.savefig()
-
-# monthly reports, scene counts from which you can derive expected counts
-oth = store['/oth_and_children_products']
-sys = store['/sys_products']
-
-# we'll append sys data, so insert cols of correct value
-cols = ['nbar_exists', 'nbart_exists', 'pq_exists']
-for col in cols:
-    sys[col] = False
-
-cols = ['nbar_name', 'nbart_name', 'pq_name']
-for col in cols:
-    sys[col] = ''
-
-# append
-df = pandas.concat([oth, sys], keys=['oth', 'sys'])
-
-df.insert(8, 'sensor', df['pass_id'].apply(sensor))
-df.insert(9, 'date', df['pass_id'].apply(dt))
-
-# blank dataframe to contain children products
-cols = ['pass_name', 'nbar_exists', 'nbart_exists', 'pq_exists']
-children = pandas.DataFrame(columns=cols)
-cols.remove('pass_name')
-
-groups = df.groupby('pass_name')
-for name, group in groups:
-    res = group[cols].sum()
-    res['pass_name'] = name
-    children = children.append(res, ignore_index=True)
-
-children.rename(columns={'nbar_exists': 'nbar',
-                         'nbart_exists': 'nbart',
-                         'pq_exists': 'pq'}, inplace=True)
-
-merged = pandas.merge(df, children, on=['pass_name'])
-
-df2 = merged.drop_duplicates('pass_name')
-cols = ['sensor',
-        'date',
-        'L0_fail',
-        'L0_success',
-        'L1_fail',
-        'L1_success',
-        'L1_L1G',
-        'L1_L1Gt',
-        'L1_L1T',
-        'nbar',
-        'nbart',
-        'pq']
-df3 = df2[cols]
-
-df3.set_index('date', inplace=True)
-
-groups = df3.groupby('sensor')
-store3 = pandas.HDFStore('collection-monthly-counts.h5', 'w', complib='blosc')
-for name, group in groups:
-    outdf = group.resample('M', how=sum)
-
-    exp = "L0_completeness = L0_success / (L0_success + L0_fail) * 100"
-    outdf.eval(exp)
-    exp = "L1_completeness = L1_success / (L1_success + L1_fail) * 100"
-    outdf.eval(exp)
-    exp = "nbar_completeness = nbar / (L1_L1T + L1_L1Gt) * 100"
-    outdf.eval(exp)
-    exp = "nbart_completeness = nbart / (L1_L1T + L1_L1Gt) * 100"
-    outdf.eval(exp)
-    exp = "pq_completeness = pq / nbar * 100"
-    outdf.eval(exp)
-
-    outdf.to_excel(name + '.xls')
-    store3[name] = outdf
+
+from cophub.aggregate import pass_summary, stack_products
+from cophub.config import load_config
+from cophub.metrics import COLLECTION_METRICS, sensor_metrics
+from cophub.metrics import write_sensor_metrics
+from cophub.passes import PassIndex, assign_pass_columns
+from cophub.records import append_table
+from cophub.store import load_products
+from cophub.wrs2 import load_wrs2
+
+
+def write_footprint_products(out_fname, oth_df, sys_df, wrs2):
+    """
+    Write the records of the WRS-2 footprints; the geometry is only
+    attached to the records being plotted.
+    """
+    oth_df = oth_df[wrs2.contains(oth_df['path'], oth_df['row'])]
+    sys_df = sys_df[wrs2.contains(sys_df['path'], sys_df['row'])]
+
+    with pandas.HDFStore(out_fname, 'w', complib='blosc') as store:
+        append_table(store, 'oth_merge', oth_df)
+        append_table(store, 'sys_merge', sys_df)
+
+    return oth_df, sys_df
+
+
+def plot_month(oth_df, sys_df, wrs2, selection, tm_fname):
+    """
+    Plot the footprints of each pass of a sensor-month,
+    eg 'LS5-199101' for 1991 Jan.
+    """
+    from cophub.atlas import BaseMap, atlas_fname, pages, render_atlas
+
+    oth_gdf = wrs2.attach_geometry(PassIndex(oth_df).select(selection))
+    sys_gdf = wrs2.attach_geometry(PassIndex(sys_df).select(selection))
+
+    basemap = BaseMap.from_file(tm_fname, where={'NAME': 'Australia'})
+    render_atlas(pages(oth_gdf, sys_gdf), atlas_fname(selection), basemap)
+
+
+def collection_metrics(oth_df, sys_df, freq='month'):
+    """
+    Counts of the OTH and SYS passes per sensor and period, from which
+    the expected counts can be derived, along with the completeness
+    metrics.
+    """
+    df = assign_pass_columns(stack_products(oth_df, sys_df))
+
+    # sum the nbar(t) and pq records for each pass, retaining the
+    # pass counters
+    passes = pass_summary(df).drop('pass_name', axis=1)
+
+    return sensor_metrics(passes, freq, COLLECTION_METRICS)
+
+
+def main(wrs2_fname=None, tm_fname=None, selection=None, freq='month',
+         config_fname=None):
+    """
+    Main routine.
+    The shapefiles default to the reference shapefiles of the
+    configuration, see `cophub.config`.
+    """
+    config = load_config(config_fname)
+
+    oth_df = load_products('oth_and_children_products')
+    sys_df = load_products('sys_products')
+    wrs2 = load_wrs2(config.reference('wrs2', wrs2_fname))
+
+    oth_fp, sys_fp = write_footprint_products('collection-merge2.h5', oth_df,
+                                              sys_df, wrs2)
+
+    if selection is not None:
+        plot_month(oth_fp, sys_fp, wrs2, selection,
+                   config.reference('tm', tm_fname))
+
+    metrics = collection_metrics(oth_df, sys_df, freq)
+    write_sensor_metrics(metrics, 'collection-monthly-counts.h5', '{}.xlsx')
+
+
+if __name__ == '__main__':
+    description = "Summarise the completeness of the collection."
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument("--config",
+                        help=("A YAML or TOML file declaring the reference "
+                              "shapefiles. Default is $COPHUB_CONFIG, or "
+                              "the layout at NCI."))
+    parser.add_argument("--wrs2",
+                        help=("The WRS-2 descending shapefile. Default is "
+                              "reference.wrs2 of the configuration."))
+    parser.add_argument("--tm",
+                        help=("The TM world borders shapefile. Default is "
+                              "reference.tm of the configuration."))
+    parser.add_argument("--plot",
+                        help=("Plot the passes of a sensor-month, "
+                              "eg LS5-199101."))
+    parser.add_argument("--freq", default='month',
+                        choices=['day', 'month', 'year'],
+                        help="The period of the metrics.")
+
+    parsed_args = parser.parse_args()
+
+    main(parsed_args.wrs2, parsed_args.tm, parsed_args.plot,
+         parsed_args.freq, parsed_args.config)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+import argparse
+
+from cophub.aggregate import stack_products
+from cophub.config import load_config
+from cophub.gaps import (GAPS_FNAME, TOLERANCE, acquired_scenes,
+                         expected_vs_acquired, missing_scenes,
+                         tile_completeness, write_gaps)
+from cophub.roi import roi_pathrows
+from cophub.store import load_products
+from cophub.wrs2 import load_wrs2
+
+
+def main(wrs2_fname=None, roi_fname=None, roi_where=None, start=None,
+         end=None, tolerance=TOLERANCE, out_fname=GAPS_FNAME,
+         config_fname=None):
+    """
+    Main routine.
+    The WRS-2 shapefile defaults to reference.wrs2 of the
+    configuration, see `cophub.config`.
+    """
+    oth_df = load_products('oth_and_children_products')
+    sys_df = load_products('sys_products')
+
+    # a scene was acquired if either its OTH or SYS product exists
+    scenes = acquired_scenes(stack_products(oth_df, sys_df))
+
+    pathrows = None
+    if roi_fname is not None:
+        wrs2_fname = load_config(config_fname).reference('wrs2', wrs2_fname)
+        pathrows = roi_pathrows(roi_fname, load_wrs2(wrs2_fname), roi_where)
+
+    calendar, summary = expected_vs_acquired(scenes, pathrows, start, end,
+                                             tolerance)
+    missing = missing_scenes(calendar)
+    write_gaps(out_fname, missing, summary, tile_completeness(calendar))
+
+    print(summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    description = ("Find the scenes expected from the WRS-2 repeat cycle "
+                   "that are missing from the collection.")
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument("--config",
+                        help=("A YAML or TOML file declaring the reference "
+                              "shapefiles. Default is $COPHUB_CONFIG, or "
+                              "the layout at NCI."))
+    parser.add_argument("--wrs2",
+                        help=("The WRS-2 descending shapefile. Default is "
+                              "reference.wrs2 of the configuration."))
+    parser.add_argument("--roi",
+                        help=("Only expect the path/rows of this ROI "
+                              "polygon layer. Default is every path/row "
+                              "acquired by a sensor."))
+    parser.add_argument("--where", nargs=2, metavar=('ATTRIBUTE', 'VALUE'),
+                        help="Select the ROI features, eg NAME Australia.")
+    parser.add_argument("--start",
+                        help=("The start date of the calendar, eg "
+                              "1999-07-01. Default is each sensor's first "
+                              "acquisition."))
+    parser.add_argument("--end",
+                        help=("The end date of the calendar. Default is "
+                              "each sensor's last acquisition."))
+    parser.add_argument("--tolerance", type=int, default=TOLERANCE,
+                        help=("The number of days either side of the "
+                              "expected date an acquisition is matched."))
+    parser.add_argument("--out", default=GAPS_FNAME,
+                        help="The output HDF5 file.")
+
+    parsed_args = parser.parse_args()
+
+    where = None if parsed_args.where is None else dict([parsed_args.where])
+    main(parsed_args.wrs2, parsed_args.roi, where, parsed_args.start,
+         parsed_args.end, parsed_args.tolerance, parsed_args.out,
+         parsed_args.config)
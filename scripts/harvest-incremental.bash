@@ -0,0 +1,12 @@
+#PBS -P v10
+#PBS -q normal
+#PBS -l walltime=01:00:00,ncpus=16,mem=6GB,jobfs=4GB
+#PBS -l wd
+#PBS -me
+
+module use /g/data/v10/private/modules/modulefiles
+module load gcc/5.2.0 core
+
+python ls_collections.py --crawl --nthreads 32 --manifest ls578-lpgs_out.xml.txt --report crawl-report.json
+
+python ls_collections.py --incremental --manifest ls578-lpgs_out.xml.txt --state collection-state.h5 --report harvest-report.json
@@ -4,17 +4,10 @@
 #PBS -l wd
 #PBS -me
 
-module load parallel
 module use /g/data/v10/private/modules/modulefiles
 module load gcc/5.2.0 core
 module load openmpi/1.10.0
 
-parallel -j 3 :::: find-lpgs_out.xml.bash
+python ls_collections.py --crawl --nthreads 32 --manifest ls578-lpgs_out.xml.txt --report crawl-report.json
 
-cat ls5-lpgs_out.xml.txt > ls578-lpgs_out.xml.txt
-cat ls7-lpgs_out.xml.txt >> ls578-lpgs_out.xml.txt
-cat ls8-lpgs_out.xml.txt >> ls578-lpgs_out.xml.txt
-
-mpiexec -n 16 python ls_collections.py
-
-python ls_collections.py --combine
+mpiexec -n 16 python ls_collections.py --manifest ls578-lpgs_out.xml.txt --report harvest-report.json
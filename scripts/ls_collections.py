@@ -1,322 +1,414 @@
 #!/usr/bin/env python
 
-import datetime
-import os
-from os.path import join as pjoin, basename, dirname, exists
-import re
-import xml.etree.ElementTree as ET
+from os.path import join as pjoin, basename, dirname
 import argparse
-from mpi4py import MPI
+import functools
 import pandas
-from eotools.tiling import scatter
 
+from cophub.backends import MPIBackend, FuturesBackend
+from cophub.crawl import crawl, read_manifest, write_manifest
+from cophub.exists import batch_exists
+from cophub import incremental
+from cophub.config import load_config
+from cophub.instrument import (TOP_N, Instrument, mpi_rank, profiled,
+                               worker_id)
+from cophub.lpgs import LpgsExtractor
+from cophub.names import PRODUCTS, parse_level1_names, product_names
+from cophub.passes import assign_pass_columns
+from cophub.records import RecordBuilder, frame_from_columns
+from cophub.schema import compact_scenes, put_table
+from cophub.store import new_harvest_id, write_dataset, write_harvest_id
 
-BASE_DIR = "/g/data/v10/reprocess/{sensor}/level1"
-SENSORS = ['ls5', 'ls7', 'ls8']
 
-L1T_PATTERN = ('(?P<spacecraft_id>LS\d)_(?P<sensor_id>\w+)_'
-               '(?P<product_type>\w+)'
-               '_(?P<product_id>P\d+.*)_GA(?P<product_code>.*)-'
-               '(?P<station_id>\d+)_'
-               '(?P<wrs_path>\d+)_(?P<wrs_row>\d+)_'
-               '(?P<acquisition_date>\d{8})')
-PAT = re.compile(L1T_PATTERN)
+EXTRACTOR = LpgsExtractor()
 
-NBAR_BASE = '/g/data/rs0/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/output/nbar/{scene}/ga-metadata.yaml'
-NBART_BASE = '/g/data/rs0/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/output/nbart/{scene}/ga-metadata.yaml'
-PQ_BASE = '/g/data/rs0/scenes/pq-scenes-tmp/{sensor}/{year}/{month}/output/pqa/{scene}/ga-metadata.yaml'
 
-WRS2SHAPEFILE = '/g/data2/v10/public/agdcv2_completeness/reference/wrs2_descending.shp'
+def process_lpgs_log(xml_fname):
+    """
+    Retrieve the processing counters, pass id and pass name from
+    an LPGS log, along with the path/row of the level1 product.
+    """
+    data = {}
+    level1_name = dirname(dirname(xml_fname))
+    path, row = [int(i) for i in basename(level1_name).split('_')[5:7]]
+    data['level1_name'] = level1_name
+    data['path'] = path
+    data['row'] = row
 
+    result = EXTRACTOR.extract(xml_fname)
+    working_folder = result.pop('working_folder')
+    data.update(result)
 
-def match_pass_id(row, pid):
-    # eg contains 'LS5-199101' to get 1991 Jan
-    return row.str.contains(pid)
+    data['pass_name'] = basename(dirname(dirname(working_folder)))
 
+    return data
 
-def sensor(row):                                   
-    return row.split('-')[0]
 
+def predict_children(df, registry=None):
+    """
+    Seperate the sys and oth products, and predict the scene names of
+    every children product in the registry (eg nbar, nbart and pq) for
+    the oth products.
 
-def dt(row):                                       
-    return datetime.datetime.strptime(row.split('-')[1], '%Y%m%d')
+    :param registry:
+        A dict of {name: `cophub.config.Product`}.
+        Default is `cophub.names.PRODUCTS`.
+    """
+    wh = df['level1_name'].str.contains("SYS")
+    sys_df = df[wh].copy()
+    oth_df = df[~wh].copy()
 
+    # predict the children scene names
+    components = parse_level1_names(oth_df['level1_name'])
+    names = product_names(components, registry=registry)
+    for col in names.columns:
+        oth_df[col] = names[col]
 
-def nbar_name_from_l1t(l1t_fname):
-    """
-    Return an NBAR file name given a L1T file name or None if
-    invalid L1T name.
-    """
-    m = PAT.match(basename(l1t_fname))
-    fmt = "{}_{}_NBAR_P54_GANBAR01-{}_{}_{}_{}"
-    if m:
-        scene = fmt.format(m.group('spacecraft_id'), m.group('sensor_id'),
-                           m.group('station_id'), m.group('wrs_path'),
-                           m.group('wrs_row'), m.group('acquisition_date'))
-        dt = datetime.datetime.strptime(m.group('acquisition_date'), "%Y%m%d")
-        year = dt.year
-        month = '{0:02d}'.format(dt.month)
+    assign_pass_columns(oth_df, ['date'])
+    assign_pass_columns(sys_df, ['date'])
 
-        return NBAR_BASE.format(sensor=m.group('spacecraft_id').lower(),
-                                year=year, month=month, scene=scene)
+    return sys_df, oth_df
 
 
-def nbart_name_from_l1t(l1t_fname):
+def crawl_level1(out_fname, level1_dirs, nthreads=16, instrument=None):
     """
-    Return an NBAR file name given a L1T file name or None if
-    invalid L1T name.
+    Find the LPGS logs within the level1 directory of every sensor
+    (see `cophub.config.Config.level1_dirs`) and write the manifest.
     """
-    m = PAT.match(basename(l1t_fname))
-    fmt = "{}_{}_NBART_P54_GANBART01-{}_{}_{}_{}"
-    if m:
-        scene = fmt.format(m.group('spacecraft_id'), m.group('sensor_id'),
-                           m.group('station_id'), m.group('wrs_path'),
-                           m.group('wrs_row'), m.group('acquisition_date'))
-        dt = datetime.datetime.strptime(m.group('acquisition_date'), "%Y%m%d")
-        year = dt.year
-        month = '{0:02d}'.format(dt.month)
+    inst = instrument or Instrument('crawl')
 
-        return NBART_BASE.format(sensor=m.group('spacecraft_id').lower(),
-                                 year=year, month=month, scene=scene)
+    roots = list(level1_dirs)
+    with inst.stage('crawl'):
+        entries = crawl(roots, nthreads, inst)
+    inst.count('crawl', len(entries))
 
+    with inst.stage('write_manifest', len(entries)):
+        write_manifest(out_fname, entries)
 
-def pqa_name_from_l1t(l1t_fname):
-    """
-    Return a PQA file name given a L1T file name or None if
-    invalid L1T name.
-    """
-    m = PAT.match(basename(l1t_fname))
-    fmt = "{}_{}_PQ_P55_GAPQ01-{}_{}_{}_{}"
-    if m:
-        scene = fmt.format(m.group('spacecraft_id'), m.group('sensor_id'),
-                           m.group('station_id'), m.group('wrs_path'),
-                           m.group('wrs_row'), m.group('acquisition_date'))
-        dt = datetime.datetime.strptime(m.group('acquisition_date'), "%Y%m%d")
-        year = dt.year
-        month = '{0:02d}'.format(dt.month)
+    print(inst.format_stages())
 
-        return PQ_BASE.format(sensor=m.group('spacecraft_id').lower(),
-                              year=year, month=month, scene=scene)
 
-
-def pqa_name_from_nbar(nbar_fname):
+def children_exist(df, nthreads=16, instrument=None, registry=None,
+                   verify=False):
     """
-    Return a PQ file name given a NBAR file name or None if
-    invalid NBAR name.
-
-    A helper function, simply wraps `pqa_name_from_l1t`.
+    Determine whether or not the children products (eg nbar, nbart
+    and pq) exist. The products are checked in a single batch so that
+    the directory listings are spread across the one pool of threads.
+    See `cophub.exists.batch_exists` for `verify`.
     """
-    return pqa_name_from_l1t(nbar_fname)
+    products = list(PRODUCTS if registry is None else registry)
+    fnames = pandas.concat([df[p + '_name'] for p in products])
+    found = batch_exists(fnames, nthreads, verify, instrument)
+    found = found.reshape(len(products), len(df))
 
+    for i, product in enumerate(products):
+        df[product + '_exists'] = found[i]
 
 
-def process_lpgs_log(xml_fname):
+def write_collection(out_fname, sys_df, oth_df, failures, packagetmp,
+                     parquet_root=None, parse_errors=None):
     """
-    This is ugly. There must be a better way than this to retrieve
-    data from an xml.
+    Write the harvested collection, and optionally the Parquet
+    datasets partitioned by sensor/year/month. The tables are written
+    in the compact schema (see `cophub.schema`); the level1 and
+    children names are rebuilt from it on demand.
+    The LPGS logs that couldn't be parsed are written to `parse_errors`.
     """
-    data = {}
-    level1_name = dirname(dirname(xml_fname))
-    path, row = [int(i) for i in level1_name.split('_')[5:7]]
-    data['level1_name'] = level1_name
-    data['path'] = path
-    data['row'] = row
+    sys_df = compact_scenes(sys_df)
+    oth_df = compact_scenes(oth_df)
 
-    tree = ET.parse(xml_fname)
-    root = tree.getroot()
+    # the Parquet datasets are only read when of the same harvest
+    harvest_id = new_harvest_id()
 
-    # retrieve the first level of the tree
-    result = {}
-    for child in root:
-        result[child.tag] = child.attrib
+    store = pandas.HDFStore(out_fname, 'w', complib='blosc')
+    write_harvest_id(store, harvest_id)
+    store['lpgs_fails'] = pandas.DataFrame({'level0_fname': failures})
+    store['packagetmp'] = pandas.DataFrame({'packagetmp': packagetmp})
+    store['parse_errors'] = pandas.DataFrame(parse_errors or [],
+                                             columns=['lpgs_fname', 'error'])
+    put_table(store, 'sys_products', sys_df)
+    put_table(store, 'oth_and_children_products', oth_df)
+    store.close()
+
+    if parquet_root is not None:
+        write_dataset(sys_df, pjoin(parquet_root, 'sys_products'),
+                      harvest_id)
+        write_dataset(oth_df, pjoin(parquet_root,
+                                    'oth_and_children_products'),
+                      harvest_id)
 
-    l0_keys = ['success', 'fail']
-    l1_keys = ['success', 'fail', 'L1G', 'L1Gt', 'L1T']
 
-    pass_id = result['LandsatProcessingRequest']['id']
-    data['pass_id'] = pass_id
+def harvest(entries, top_n=TOP_N):
+    """
+    Harvest a block of LPGS logs.
+
+    :param entries:
+        A list of (fname, size, mtime) manifest entries.
 
-    l0_data = result['L0RpProcessing']
-    l1_data = result['L1Processing']
+    :param top_n:
+        The number of the slowest parses retained, see
+        `cophub.instrument.Instrument`. Default is `TOP_N`.
 
-    for key in l0_keys:
-        data['L0_' + key] = int(l0_data[key])
+    :return:
+        A tuple of (columns, failures, packagetmp, instrument, errors),
+        where columns are the column buffers returned by
+        `RecordBuilder.columns`, instrument is the `Instrument.to_dict`
+        of the parse timings, and errors is a list of (fname, error)
+        of the LPGS logs that couldn't be parsed.
+    """
+    # attribute the timings to whichever worker was handed the block
+    inst = Instrument('harvest', top_n, worker_id())
+    builder = RecordBuilder()
+    failures = []
+    packagetmp = []
+    errors = []
+    for fname, size, _ in entries:
+        if "failure" in fname:
+            failures.append(fname)
+            continue
+        if "packagetmp" in fname:
+            packagetmp.append(fname)
+            continue
+        # a corrupt log is recorded rather than raised, as raising
+        # would fail (and retry) the whole block
+        try:
+            with inst.timed('parse', fname, size or 0):
+                record = process_lpgs_log(fname)
+        except Exception as exc:
+            errors.append((fname, '{}: {}'.format(type(exc).__name__, exc)))
+            continue
+        builder.append(record)
 
-    for key in l1_keys:
-        data['L1_' + key] = int(l1_data[key])
+    return builder.columns(), failures, packagetmp, inst.to_dict(), errors
 
-    # explore the leaves of the 'LandsatProcessingRequest' branch
-    find = root.find('LandsatProcessingRequest')
-    result = {}
-    for child in find.iter():
-        result[child.tag] = child.text
 
-    data['pass_name'] = basename(dirname(dirname(result['WorkingFolder'])))
+def main_parallel(input_fname, backend, nthreads=16,
+                  out_fname='collection-completeness.h5', parquet_root=None,
+                  instrument=None, registry=None, verify=False):
+    """
+    Harvest the LPGS logs listed in the manifest using the given
+    backend. The partial results are gathered and reduced in-job,
+    with the root writing the combined collection.
+    """
+    inst = instrument or Instrument('harvest')
 
-    return data
+    with inst.stage('read_manifest'):
+        entries = read_manifest(input_fname)
 
+    with inst.stage('map_gather', len(entries)):
+        # the workers retain as many of the slowest parses as the root
+        func = functools.partial(harvest, top_n=inst.top_n)
+        results = backend.map_gather(func, entries)
 
-def main_mpi(input_fname):
-    with open(input_fname) as src:
-        files = src.readlines()
+    if not backend.is_root:
+        return
 
-    files = [f.strip() for f in files]
+    print(backend.throughput.report())
+    for chunk_id, error in sorted(backend.failures.items()):
+        print("Failed to harvest chunk {}:\n{}".format(chunk_id, error))
 
-    # processor info
-    rank = MPI.COMM_WORLD.rank
-    n_proc = MPI.COMM_WORLD.size
+    for result in results:
+        inst.merge(result[3])
+    inst.extra['throughput'] = backend.throughput.summary()
 
-    columns = ['L1_L1Gt',
-               'L1_success',
-               'L0_fail',
-               'L1_L1T',
-               'L0_success',
-               'level1_name',
-               'pass_name',
-               'L1_fail',
-               'L1_L1G']
-    df = pandas.DataFrame(columns=columns)
+    columns = [result[0] for result in results]
+    failures = [f for result in results for f in result[1]]
+    packagetmp = [f for result in results for f in result[2]]
+    parse_errors = [e for result in results for e in result[4]]
+    for fname, error in parse_errors:
+        print("Failed to parse {}: {}".format(fname, error))
 
-    # assign each processor a block to work on
-    rank_list = scatter(files, n_proc)[rank]
-    # rank_list = scatter(files[0:64], n_proc)[rank]
+    with inst.stage('combine'):
+        df = frame_from_columns(columns)
 
-    failures = []
-    packagetmp = []
-    for fname in rank_list:
-        if "failure" in fname:
-            failures.append(fname)
-            continue
-        if "packagetmp" in fname:
-            packagetmp.append(fname)
-            continue
-        result = process_lpgs_log(fname)
-        df = df.append(result, ignore_index=True)
+    with inst.stage('predict_children', len(df)):
+        sys_df, oth_df = predict_children(df, registry)
 
-    # seperate the sys and oth products and failed
-    # wh = df['level1_name'].str.contains("failure")
-    # fails = df[wh].copy()
-    # df = df[~wh]
-    wh = df['level1_name'].str.contains("SYS")
-    sys_df = df[wh].copy()
-    oth_df = df[~wh].copy()
+    nproducts = len(PRODUCTS if registry is None else registry)
+    with inst.stage('children_exist', nproducts * len(oth_df)):
+        children_exist(oth_df, nthreads, inst, registry, verify)
 
-    # predict nbar, nbart, pq scene names
-    oth_df['nbar_name'] = oth_df['level1_name'].apply(nbar_name_from_l1t)
-    oth_df['nbart_name'] = oth_df['level1_name'].apply(nbart_name_from_l1t)
-    oth_df['pq_name'] = oth_df['level1_name'].apply(pqa_name_from_nbar)
+    with inst.stage('write', len(df)):
+        write_collection(out_fname, sys_df, oth_df, failures, packagetmp,
+                         parquet_root, parse_errors)
 
-    oth_df['sensor'] = oth_df['pass_id'].apply(sensor)
-    oth_df['date'] = oth_df['pass_id'].apply(dt)
-    sys_df['sensor'] = sys_df['pass_id'].apply(sensor)
-    sys_df['date'] = sys_df['pass_id'].apply(dt)
+    print(inst.format_stages())
 
 
-    # TODO: under MPI the results appear to be all False
-    # once the results have been combined, then do the exists function
+def main_incremental(manifest_fname, state_fname, nthreads=16,
+                     parquet_root=None, instrument=None, registry=None,
+                     verify=False, out_fname='collection-completeness.h5'):
+    """
+    Only parse the LPGS logs that are new or have changed since the
+    state was last updated, then rebuild the collection from the state.
+    The logs that couldn't be parsed are left out of the state, so
+    they are attempted again by the next run.
+    """
+    inst = instrument or Instrument('harvest')
 
-    # determine whether or not a child product exists
-    # oth_df['nbar_exists'] = oth_df['nbar_name'].apply(exists)
-    # oth_df['nbart_exists'] = oth_df['nbart_name'].apply(exists)
-    # oth_df['pq_exists'] = oth_df['pq_name'].apply(exists)
+    with inst.stage('read_manifest'):
+        manifest_entries = read_manifest(manifest_fname)
+        manifest = incremental.manifest_frame(manifest_entries)
 
-    # output
-    out_fname = 'collection-completeness-{rank}.h5'.format(rank=rank)
-    store = pandas.HDFStore(out_fname, 'w', complib='blosc')
-    store['lpgs_fails'] = pandas.DataFrame({'level0_fname': failures})
-    store['packagetmp'] = pandas.DataFrame({'packagetmp': packagetmp})
-    store['sys_products'] = sys_df
-    store['oth_and_children_products'] = oth_df
-    store.close()
+    with inst.stage('load_state'):
+        state = incremental.load_state(state_fname)
 
+    with inst.stage('diff_manifest', len(manifest)):
+        todo, deleted = incremental.diff_manifest(state, manifest)
 
-def combine(ncpus):
+    entries = list(zip(todo['fname'], todo['size'], todo['mtime']))
+    columns, _, _, parsed, parse_errors = harvest(entries, inst.top_n)
+    inst.merge(parsed)
+    for fname, error in parse_errors:
+        print("Failed to parse {}: {}".format(fname, error))
 
-    out_fname = 'collection-completeness.h5'
-    collection_fmt = 'collection-completeness-{}.h5'
-    keys = ['sys_products', 'oth_and_children_products']
+    with inst.stage('save_state'):
+        state = incremental.update_state(state, frame_from_columns([columns]),
+                                         todo, deleted)
+        incremental.save_state(state_fname, state)
 
-    results = {}
-    for key in keys:
-        results[key] = pandas.DataFrame()
+    with inst.stage('predict_children'):
+        sys_df, oth_df = predict_children(incremental.live_records(state),
+                                          registry)
 
-    store = pandas.HDFStore(out_fname, 'w', complib='blosc')
+    # children products can appear at any time, so are always checked
+    nproducts = len(PRODUCTS if registry is None else registry)
+    with inst.stage('children_exist', nproducts * len(oth_df)):
+        children_exist(oth_df, nthreads, inst, registry, verify)
 
-    for i in range(ncpus):
-        tmp_store = pandas.HDFStore(collection_fmt.format(i), 'r')
-        for key in keys:
-            results[key] = results[key].append(tmp_store[key],
-                                               ignore_index=True)
-        tmp_store.close()
+    failures = [f for f, _, _ in manifest_entries if "failure" in f]
+    packagetmp = [f for f, _, _ in manifest_entries if "packagetmp" in f]
 
-    # apply here as for some reason it isn't working under mpi
-    # determine whether or not a child product exists
-    df = results['oth_and_children_products']
-    df['nbar_exists'] = df['nbar_name'].apply(exists)
-    df['nbart_exists'] = df['nbart_name'].apply(exists)
-    df['pq_exists'] = df['pq_name'].apply(exists)
+    with inst.stage('write', len(sys_df) + len(oth_df)):
+        write_collection(out_fname, sys_df, oth_df, failures, packagetmp,
+                         parquet_root, parse_errors)
 
-    results['oth_and_children_products'] = df
+    print(inst.format_stages())
 
-    for key in keys:
-        store[key] = results[key]
-    store.close()
 
+def main(nthreads=16, config=None):
+    if config is None:
+        config = load_config()
 
-def main():
-    columns = ['L1_L1Gt',
-               'L1_success',
-               'L0_fail',
-               'L1_L1T',
-               'L0_success',
-               'level1_name',
-               'pass_name',
-               'L1_fail',
-               'L1_L1G']
-    df = pandas.DataFrame(columns=columns)
+    builder = RecordBuilder()
 
     # this could take a while...
-    for sensor in SENSORS:
-        for root, dirs, files in os.walk(BASE_DIR.format(sensor=sensor)):
-            for fname in files:
-                if fname == 'lpgs_out.xml':
-                    result = process_lpgs_log(pjoin(root, fname))
-                    df = df.append(result, ignore_index=True)
-
-    # seperate the sys and oth products
-    wh = df['level1_name'].str.contains("SYS")
-    sys_df = df[wh].copy()
-    oth_df = df[~wh].copy()
+    for fname, _, _ in crawl(config.level1_dirs, nthreads):
+        builder.append(process_lpgs_log(fname))
 
-    # predict nbar, nbart, pq scene names
-    oth_df['nbar_name'] = oth_df['level1_name'].apply(nbar_name_from_l1t)
-    oth_df['nbart_name'] = oth_df['level1_name'].apply(nbart_name_from_l1t)
-    oth_df['pq_name'] = oth_df['level1_name'].apply(pqa_name_from_nbar)
+    # seperate the sys and oth products, and predict the children
+    sys_df, oth_df = predict_children(builder.to_frame(), config.products)
 
     # determine whether or not a child product exists
-    oth_df['nbar_exists'] = oth_df['nbar_name'].apply(exists)
-    oth_df['nbart_exists'] = oth_df['nbart_name'].apply(exists)
-    oth_df['pq_exists'] = oth_df['pq_name'].apply(exists)
+    children_exist(oth_df, nthreads, registry=config.products)
 
-    # output
-    store = pandas.HDFStore('collection-completeness.h5', 'w', complib='blosc')
-    store['sys_products'] = sys_df
-    store['oth_and_children_products'] = oth_df
+    write_collection('collection-completeness.h5', sys_df, oth_df, [], [])
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="GA Landsat Harvest")
-    parser.add_argument('--combine', action="store_true",
-                        help=("If set, then the tables stored in seperate "
-                              "fileswill be combined into single file."))
-    parser.add_argument('--ncpus', type=int, default=16,
-                        help=("The number of CPU's used to harvest the "
-                              "Landsat colletion. Default is 16"))
+    parser.add_argument('--config', default=None,
+                        help=("A YAML or TOML file declaring the level1 "
+                              "directories, storage roots and children "
+                              "products. Default is $COPHUB_CONFIG, or "
+                              "the layout at NCI"))
+    parser.add_argument('--crawl', action="store_true",
+                        help=("If set, then the level1 directories will be "
+                              "searched for LPGS logs, and the manifest "
+                              "written."))
+    parser.add_argument('--incremental', action="store_true",
+                        help=("If set, then only the LPGS logs that are "
+                              "new or have changed since the last run "
+                              "will be parsed."))
+    parser.add_argument('--out', default='collection-completeness.h5',
+                        help=("The collection written by the harvest. "
+                              "Default is collection-completeness.h5"))
+    parser.add_argument('--state', default='collection-state.h5',
+                        help=("The state file used by --incremental. "
+                              "Default is collection-state.h5"))
+    parser.add_argument('--manifest', default='ls578-lpgs_out.xml.txt',
+                        help=("The manifest listing the LPGS logs. "
+                              "Default is ls578-lpgs_out.xml.txt"))
+    parser.add_argument('--nthreads', type=int, default=16,
+                        help=("The number of directories listed "
+                              "concurrently when crawling or checking for "
+                              "children products. Default is 16"))
+    parser.add_argument('--verify', action="store_true",
+                        help=("If set, then also check the ga-metadata.yaml "
+                              "of each child product whose scene directory "
+                              "exists; a stat per product. Default is the "
+                              "scene directory alone."))
+    parser.add_argument('--parquet', default=None,
+                        help=("If set, then also write the collection as "
+                              "Parquet datasets partitioned by "
+                              "sensor/year/month into this directory, "
+                              "eg collection-completeness.parquet"))
+    parser.add_argument('--backend', choices=['mpi', 'futures'],
+                        default='mpi',
+                        help=("Harvest using MPI, or a pool of processes "
+                              "on a single machine. Default is mpi"))
+    parser.add_argument('--schedule', choices=['static', 'dynamic'],
+                        default='dynamic',
+                        help=("Assign each MPI rank a fixed block of the "
+                              "LPGS logs, or hand out chunks on demand. "
+                              "Default is dynamic"))
+    parser.add_argument('--ncpus', type=int, default=None,
+                        help=("The number of processes used by the futures "
+                              "backend. Default is the number of CPU's"))
+    parser.add_argument('--chunksize', type=int, default=1000,
+                        help=("The number of LPGS logs per task when the "
+                              "work is handed out on demand. "
+                              "Default is 1000"))
+
+    parser.add_argument('--report', default=None,
+                        help=("If set, then write the run report of stage "
+                              "timings, throughput and the slowest files "
+                              "to this file, as JSON if it ends in .json, "
+                              "otherwise CSV"))
+    parser.add_argument('--top', type=int, default=20,
+                        help=("The number of the slowest LPGS log parses "
+                              "and directory listings reported. "
+                              "Default is 20"))
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'],
+                        default=None,
+                        help="Profile the run (on the root process).")
+    parser.add_argument('--profile-out', default=None,
+                        help=("Write the profile to this file, rather "
+                              "than printing it"))
 
     parsed_args = parser.parse_args()
 
-    if parsed_args.combine:
-        combine(parsed_args.ncpus)
-    else:
-        files_fname = 'ls578-lpgs_out.xml.txt'
-        main_mpi(files_fname)
+    config = load_config(parsed_args.config)
+    inst = Instrument('harvest', parsed_args.top)
+    is_root = True
+
+    # every rank would otherwise write the same profile
+    profiler = parsed_args.profile if not mpi_rank() else None
+
+    with profiled(profiler, parsed_args.profile_out):
+        if parsed_args.crawl:
+            inst.name = 'crawl'
+            crawl_level1(parsed_args.manifest, config.level1_dirs,
+                         parsed_args.nthreads, inst)
+        elif parsed_args.incremental:
+            main_incremental(parsed_args.manifest, parsed_args.state,
+                             parsed_args.nthreads, parsed_args.parquet, inst,
+                             config.products, parsed_args.verify,
+                             parsed_args.out)
+        else:
+            if parsed_args.backend == 'mpi':
+                dynamic = parsed_args.schedule == 'dynamic'
+                backend = MPIBackend(dynamic=dynamic,
+                                     chunksize=parsed_args.chunksize)
+            else:
+                backend = FuturesBackend(parsed_args.ncpus,
+                                         parsed_args.chunksize)
+            is_root = backend.is_root
+            main_parallel(parsed_args.manifest, backend,
+                          parsed_args.nthreads, parsed_args.out,
+                          parquet_root=parsed_args.parquet, instrument=inst,
+                          registry=config.products,
+                          verify=parsed_args.verify)
+
+    if parsed_args.report and is_root:
+        inst.write_report(parsed_args.report)
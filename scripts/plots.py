@@ -1,46 +1,82 @@
 #!/usr/bin/env python
 
-from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib.backends.backend_pdf import PdfPages
-import pandas
-import geopandas
-
-def match_pass_id(row, pid):
-    # eg contains 'LS5-199101' to get 1991 Jan
-    return row.str.contains(pid)
-
-tm_fname = 'tm-world-borders/TM_WORLD_BORDERS-0.3.shp'
-
-store = pandas.HDFStore('collection-merge2.h5', 'r')
-oth_df = store['oth_merge']
-sys_df = store['sys_merge']
-
-oth_groups = oth_df.groupby('pass_id')
-sys_groups = sys_df.groupby('pass_id')
-
-oth_wh = oth_groups.pass_id.apply(match_pass_id, 'LS8-201604')
-sys_wh = sys_groups.pass_id.apply(match_pass_id, 'LS8-201604')
-
-oth_subs_gdf = geopandas.GeoDataFrame(oth_df[oth_wh])
-sys_subs_gdf = geopandas.GeoDataFrame(sys_df[sys_wh])
-
-tm = geopandas.read_file(tm_fname)
-aus = tm[tm['NAME'] == 'Australia']
-
-oth_grps = oth_subs_gdf.groupby('pass_id')
-sys_grps = sys_subs_gdf.groupby('pass_id')
-
-with PdfPages('ls8-2016-Apr-pass.pdf') as pdf:
-    for name, grp in oth_grps:
-        ax = aus.plot()
-        ax.set_title(name)
-        #grp.plot('path', ax=ax)
-        grp.plot('path')
-        #try:
-        #    sys_grps.get_group(name).plot('path', edgecolor='red', ax=ax)
-        #except KeyError:
-        #    pass
-        pdf.savefig()
+import argparse
 
+from cophub.atlas import BaseMap, pages, render_atlas, render_months
+from cophub.atlas import atlas_fname
+from cophub.config import load_config
+from cophub.store import load_products
+from cophub.wrs2 import load_wrs2
+
+
+def load_pages(selection, wrs2):
+    """
+    Load the footprints of a sensor-month, eg 'LS8-201604',
+    as a page per pass.
+    """
+    # only read the sensor-month of interest
+    columns = ['pass_id', 'path', 'row']
+    oth_df = load_products('oth_and_children_products', selection, columns)
+    sys_df = load_products('sys_products', selection, columns)
+
+    return pages(wrs2.attach_geometry(oth_df), wrs2.attach_geometry(sys_df))
+
+
+def main(selection='LS8-201604', sensor=None, start=None, end=None,
+         out_dir='.', workers=None, wrs2_fname=None, tm_fname=None,
+         config_fname=None):
+    """
+    Main routine.
+    Render the atlas of a sensor-month, or if `sensor` is given, an
+    atlas per month of the sensor between `start` and `end`.
+    The shapefiles default to the reference shapefiles of the
+    configuration, see `cophub.config`.
+    """
+    config = load_config(config_fname)
+
+    wrs2 = load_wrs2(config.reference('wrs2', wrs2_fname))
+    basemap = BaseMap.from_file(config.reference('tm', tm_fname),
+                                where={'NAME': 'Australia'})
+
+    if sensor:
+        written = render_months(lambda sel: load_pages(sel, wrs2), sensor,
+                                start, end, basemap, out_dir, workers)
+        for fname, npages in sorted(written.items()):
+            print("{}: {} pages".format(fname, npages))
+    else:
+        render_atlas(load_pages(selection, wrs2),
+                     atlas_fname(selection, out_dir), basemap, workers)
+
+
+if __name__ == '__main__':
+    description = "Plot the scene footprints of each pass."
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument("--selection", default='LS8-201604',
+                        help="The sensor-month to plot, eg LS8-201604.")
+    parser.add_argument("--sensor",
+                        help=("Plot an atlas per month of this sensor, "
+                              "between --start and --end."))
+    parser.add_argument("--start", help="The first date, eg 2013-04-01.")
+    parser.add_argument("--end", help="The last date, eg 2016-12-31.")
+    parser.add_argument("--out-dir", default='.',
+                        help="The directory to write the atlases to.")
+    parser.add_argument("--workers", type=int,
+                        help="The number of rendering processes.")
+    parser.add_argument("--config",
+                        help=("A YAML or TOML file declaring the reference "
+                              "shapefiles. Default is $COPHUB_CONFIG, or "
+                              "the layout at NCI."))
+    parser.add_argument("--wrs2",
+                        help=("The WRS-2 descending shapefile. Default is "
+                              "reference.wrs2 of the configuration."))
+    parser.add_argument("--tm",
+                        help=("The world borders shapefile of the basemap. "
+                              "Default is reference.tm of the "
+                              "configuration."))
+
+    parsed_args = parser.parse_args()
+
+    main(parsed_args.selection, parsed_args.sensor, parsed_args.start,
+         parsed_args.end, parsed_args.out_dir, parsed_args.workers,
+         parsed_args.wrs2, parsed_args.tm, parsed_args.config)
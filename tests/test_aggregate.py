@@ -0,0 +1,82 @@
+"""
+The per-pass summary of the scene records.
+"""
+
+import pandas
+import pandas.testing
+
+from cophub.aggregate import PASS_COLUMNS, pass_summary, stack_products
+
+
+COUNTERS = {'L0_fail': 0, 'L0_success': 1, 'L1_fail': 2, 'L1_success': 24,
+            'L1_L1G': 4, 'L1_L1Gt': 3, 'L1_L1T': 24}
+
+
+def scenes():
+    """
+    The OTH scene records of three passes of 2, 3 and 1 scenes.
+    """
+    rows = []
+    for i, (pass_name, nscenes) in enumerate([('LS7_A', 2), ('LS8_B', 3),
+                                              ('LS7_C', 1)]):
+        for j in range(nscenes):
+            row = dict(COUNTERS, L1_success=20 + i,
+                       pass_name=pass_name, sensor=pass_name[:3],
+                       date=pandas.Timestamp('2016-04-01') +
+                       pandas.Timedelta(days=i),
+                       nbar_exists=j != 0, nbart_exists=j == 0,
+                       pq_exists=True)
+            rows.append(row)
+
+    return pandas.DataFrame(rows)
+
+
+def baseline(df):
+    """
+    The original summary; the children summed per pass, merged back
+    onto the scenes, and the first scene of each pass kept.
+    """
+    cols = ['nbar_exists', 'nbart_exists', 'pq_exists']
+    children = df.groupby('pass_name')[cols].sum().reset_index()
+    children = children.rename(columns={'nbar_exists': 'nbar',
+                                        'nbart_exists': 'nbart',
+                                        'pq_exists': 'pq'})
+    merged = pandas.merge(df, children, on=['pass_name'])
+
+    return merged.drop_duplicates('pass_name')[
+        ['pass_name'] + PASS_COLUMNS + ['nbar', 'nbart', 'pq']]
+
+
+def test_matches_baseline():
+    df = scenes()
+    result = pass_summary(df)
+
+    pandas.testing.assert_frame_equal(result,
+                                      baseline(df).reset_index(drop=True))
+    assert list(result['nbar']) == [1, 2, 0]
+    assert list(result['pq']) == [2, 3, 1]
+
+
+def test_categorical_pass_names():
+    df = scenes()
+    df['pass_name'] = df['pass_name'].astype('category')
+    df['sensor'] = df['sensor'].astype('category')
+
+    # the unobserved categories don't yield empty passes
+    df = df[df['pass_name'] != 'LS8_B']
+    result = pass_summary(df)
+
+    assert list(result['pass_name']) == ['LS7_A', 'LS7_C']
+
+
+def test_stack_products():
+    oth_df = scenes()
+    oth_df['nbar_name'] = 'nbar'
+    sys_df = scenes().drop(['nbar_exists', 'nbart_exists', 'pq_exists'],
+                           axis=1)
+    df = stack_products(oth_df, sys_df)
+
+    assert len(df) == 12
+    assert not df.loc['sys', 'nbar_exists'].any()
+    assert (df.loc['sys', 'nbar_name'] == '').all()
+    assert list(pass_summary(df.loc['sys'])['pq']) == [0, 0, 0]
@@ -0,0 +1,99 @@
+"""
+The dynamic scheduling of chunks; retrying failed chunks on another
+worker, and giving up on them.
+"""
+
+import threading
+
+from cophub.backends import FuturesBackend, _Scheduler, chunks, partition
+
+
+def test_partition():
+    blocks = partition(list(range(10)), 3)
+
+    assert [len(b) for b in blocks] == [4, 3, 3]
+    assert sum(blocks, []) == list(range(10))
+    assert chunks(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+
+
+def test_failed_chunk_moves_to_another_worker():
+    scheduler = _Scheduler([['a'], ['b']], max_attempts=3)
+
+    assert scheduler.next_for(1) == 0
+    scheduler.failed(0, 1, 'boom', nworkers=2)
+
+    # worker 1 isn't handed the chunk it failed again
+    assert scheduler.next_for(1) == 1
+    assert scheduler.next_for(1) is None
+    assert scheduler.next_for(2) == 0
+
+    scheduler.done(0, 'A')
+    scheduler.done(1, 'B')
+
+    assert scheduler.finished
+    assert scheduler.ordered_results() == ['A', 'B']
+    assert scheduler.unfinished() == {}
+
+
+def test_chunk_given_up_on():
+    scheduler = _Scheduler([['a'], ['b']], max_attempts=2)
+
+    for worker in (1, 2):
+        chunk_id = scheduler.next_for(worker)
+        if chunk_id == 1:
+            scheduler.done(1, 'B')
+            chunk_id = scheduler.next_for(worker)
+        scheduler.failed(chunk_id, worker, 'boom {}'.format(worker), 3)
+
+    assert scheduler.next_for(3) is None
+    assert scheduler.finished
+    assert scheduler.ordered_results() == ['B']
+    assert scheduler.unfinished() == {0: 'boom 2'}
+
+
+def test_attempts_limited_by_the_workers():
+    scheduler = _Scheduler([['a']], max_attempts=3)
+    scheduler.failed(scheduler.next_for(1), 1, 'boom', nworkers=1)
+
+    assert scheduler.finished
+    assert list(scheduler.unfinished()) == [0]
+
+
+def test_futures_retries_a_failed_chunk():
+    lock = threading.Lock()
+    calls = []
+
+    def flaky(block):
+        # the chunk holding 3 fails on its first attempt only
+        with lock:
+            calls.append(tuple(block))
+            first = calls.count(tuple(block)) == 1
+        if 3 in block and first:
+            raise RuntimeError('transient')
+        return sum(block)
+
+    backend = FuturesBackend(max_workers=2, chunksize=2, threads=True)
+    results = backend.map_gather(flaky, list(range(6)))
+
+    assert results == [1, 5, 9]
+    assert backend.failures == {}
+    assert calls.count((2, 3)) == 2
+
+
+def test_futures_records_a_failing_chunk():
+    def failing(block):
+        if 3 in block:
+            raise RuntimeError('corrupt')
+        return sum(block)
+
+    backend = FuturesBackend(max_workers=2, chunksize=2, threads=True,
+                             max_attempts=2)
+    results = backend.map_gather(failing, list(range(6)))
+
+    assert results == [1, 9]
+    assert list(backend.failures) == [1]
+    assert 'RuntimeError: corrupt' in backend.failures[1]
+
+    summary = backend.throughput.summary()
+    assert sum(s['failed_chunks'] for s in summary) == 2
+    assert sum(s['items'] for s in summary) == 4
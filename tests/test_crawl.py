@@ -0,0 +1,82 @@
+"""
+The discovery of the LPGS logs, and the manifest.
+"""
+
+import os
+
+import pytest
+
+from cophub.crawl import crawl, read_manifest, scan_directory, write_manifest
+
+
+LEVEL1_NAME = 'LS7_ETM_OTH_P51_GALPGS01-002_090_{row:03d}_20160401'
+
+
+def touch(path, content='<LPGS/>'):
+    os.makedirs(str(path.parent), exist_ok=True)
+    path.write_text(content)
+
+
+@pytest.fixture
+def level1(tmp_path):
+    """
+    A level1 tree of 3 products, along with the logs that shouldn't
+    be found.
+    """
+    root = tmp_path / 'ls7' / 'level1'
+    expected = []
+    for i in range(3):
+        product = root / '2016' / '04' / LEVEL1_NAME.format(row=60 + i)
+        touch(product / 'lpgs' / 'lpgs_out.xml')
+        expected.append(str(product / 'lpgs' / 'lpgs_out.xml'))
+
+        # too deep below the product, and not a log
+        touch(product / 'lpgs' / 'nested' / 'lpgs_out.xml')
+        touch(product / 'lpgs' / 'lpgs_out.txt')
+
+    # not within a level1 product, and hidden
+    touch(root / '2016' / 'lpgs' / 'lpgs_out.xml')
+    touch(root / '2016' / '.LS7_hidden' / 'lpgs' / 'lpgs_out.xml')
+
+    return str(root), sorted(expected)
+
+
+def test_crawl_finds_only_the_logs(level1):
+    root, expected = level1
+    entries = crawl([root], nthreads=4)
+
+    assert [fname for fname, _, _ in entries] == expected
+    assert all(size == len('<LPGS/>') for _, size, _ in entries)
+
+
+def test_scan_prunes_below_the_product(level1):
+    root, expected = level1
+    product_dir = os.path.dirname(os.path.dirname(expected[0]))
+
+    logs, subdirs = scan_directory(product_dir, 0)
+    assert logs == []
+    assert subdirs == [(os.path.join(product_dir, 'lpgs'), 1)]
+
+    logs, subdirs = scan_directory(os.path.join(product_dir, 'lpgs'), 1)
+    assert [fname for fname, _, _ in logs] == [expected[0]]
+    assert subdirs == []
+
+
+def test_missing_root(tmp_path):
+    assert crawl([str(tmp_path / 'missing')]) == []
+
+
+def test_manifest_round_trip(level1, tmp_path):
+    entries = crawl([level1[0]])
+    fname = str(tmp_path / 'manifest.txt')
+    write_manifest(fname, entries)
+
+    assert read_manifest(fname) == entries
+
+
+def test_plain_manifest(tmp_path):
+    fname = tmp_path / 'manifest.txt'
+    fname.write_text('/a/lpgs_out.xml\n\n/b/lpgs_out.xml\n')
+
+    assert read_manifest(str(fname)) == [('/a/lpgs_out.xml', None, None),
+                                         ('/b/lpgs_out.xml', None, None)]
@@ -0,0 +1,112 @@
+"""
+The pipeline runner; stages are only rerun when their command or
+inputs have changed, or their outputs are missing.
+"""
+
+import os
+
+import pytest
+
+from cophub.dag import Pipeline, Stage
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    (tmp_path / 'manifest.txt').write_text('a\nb\n')
+    return tmp_path
+
+
+def pipeline(workdir, check='mtime', fail=False):
+    """
+    A two stage pipeline; harvest counts the lines of the manifest,
+    and report copies the count.
+    """
+    calls = []
+
+    def harvest():
+        calls.append('harvest')
+        if fail:
+            raise RuntimeError('harvest failed')
+        nlines = len((workdir / 'manifest.txt').read_text().splitlines())
+        (workdir / 'collection.txt').write_text(str(nlines))
+
+    def report():
+        calls.append('report')
+        (workdir / 'report.txt').write_text(
+            (workdir / 'collection.txt').read_text())
+
+    stages = [Stage('report', report, ['collection.txt'], ['report.txt']),
+              Stage('harvest', harvest, ['manifest.txt'],
+                    ['collection.txt'])]
+
+    return Pipeline(stages, str(workdir), check), calls
+
+
+def run(pipe):
+    return pipe.run(log=lambda msg: None)
+
+
+def test_order():
+    pipe, _ = pipeline('.')
+
+    assert pipe.order() == ['harvest', 'report']
+    assert pipe.order(['harvest']) == ['harvest']
+
+
+def test_fresh_stages_are_skipped(workdir):
+    pipe, calls = pipeline(workdir)
+    assert run(pipe) == {'harvest': 'ran', 'report': 'ran'}
+    assert [fresh for _, fresh in pipe.status()] == [True, True]
+
+    pipe, calls = pipeline(workdir)
+    assert run(pipe) == {'harvest': 'skipped', 'report': 'skipped'}
+    assert calls == []
+
+
+def test_changed_input_reruns_downstream(workdir):
+    pipe, _ = pipeline(workdir)
+    run(pipe)
+
+    (workdir / 'manifest.txt').write_text('a\nb\nc\n')
+    assert pipe.status() == [('harvest', False), ('report', False)]
+
+    pipe, calls = pipeline(workdir)
+    run(pipe)
+    assert calls == ['harvest', 'report']
+    assert (workdir / 'report.txt').read_text() == '3'
+
+
+def test_unchanged_contents_with_hash(workdir):
+    pipe, _ = pipeline(workdir, 'hash')
+    run(pipe)
+
+    # rewritten with the same contents, so nothing has changed
+    (workdir / 'manifest.txt').write_text('a\nb\n')
+    os.utime(str(workdir / 'manifest.txt'), (0, 0))
+    pipe, calls = pipeline(workdir, 'hash')
+    run(pipe)
+    assert calls == []
+
+
+def test_missing_output(workdir):
+    pipe, _ = pipeline(workdir)
+    run(pipe)
+    os.remove(str(workdir / 'report.txt'))
+
+    pipe, _ = pipeline(workdir)
+    assert run(pipe) == {'harvest': 'skipped', 'report': 'ran'}
+
+
+def test_failure_blocks_downstream(workdir):
+    pipe, _ = pipeline(workdir, fail=True)
+
+    assert run(pipe) == {'harvest': 'failed', 'report': 'blocked'}
+    assert not pipe.load_state()
+
+
+def test_cycle():
+    stages = [Stage('a', None, ['b.txt'], ['a.txt']),
+              Stage('b', None, ['a.txt'], ['b.txt'])]
+
+    with pytest.raises(ValueError, match='Cycle'):
+        Pipeline(stages)
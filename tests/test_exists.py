@@ -0,0 +1,65 @@
+"""
+The batched existence checks of the children products.
+"""
+
+import os
+
+import numpy
+import pytest
+
+from cophub.exists import batch_exists
+
+
+SCENE = 'LS7_ETM_NBAR_P54_GANBAR01-002_090_{:03d}_20160401'
+
+
+@pytest.fixture
+def products(tmp_path):
+    """
+    The predicted names of 12 products across two months, of which
+    some are complete, one is partial (no ga-metadata.yaml) and the
+    rest are missing, along with a missing name.
+    """
+    fnames = []
+    for month in ['04', '05']:
+        output = tmp_path / '2016' / month / 'output' / 'nbar'
+        for i in range(6):
+            scene = output / SCENE.format(60 + i)
+            if i < 3:
+                os.makedirs(str(scene))
+                (scene / 'ga-metadata.yaml').write_text('id: 1')
+            elif i == 3:
+                os.makedirs(str(scene))
+            fnames.append(str(scene / 'ga-metadata.yaml'))
+
+    # a month without an output directory
+    fnames.append(str(tmp_path / '2016' / '06' / 'output' / 'nbar' /
+                      SCENE.format(60) / 'ga-metadata.yaml'))
+    fnames.append(None)
+
+    return fnames
+
+
+def test_verify_matches_exists(products):
+    expected = [f is not None and os.path.exists(f) for f in products]
+    result = batch_exists(products, nthreads=4, verify=True)
+
+    assert result.dtype == bool
+    numpy.testing.assert_array_equal(result, expected)
+
+
+def test_listing_counts_the_scene_directory(products):
+    expected = [f is not None and os.path.isdir(os.path.dirname(f))
+                for f in products]
+    result = batch_exists(products, nthreads=4)
+
+    numpy.testing.assert_array_equal(result, expected)
+
+    # only the partial products differ from the verified check
+    partial = result & ~batch_exists(products, verify=True)
+    assert partial.sum() == 2
+
+
+def test_no_names():
+    assert len(batch_exists([])) == 0
+    assert not batch_exists([None, float('nan')]).any()
@@ -0,0 +1,107 @@
+"""
+The expected calendar of the WRS-2 repeat cycle, and the anti-join
+of the expected against the acquired scenes.
+"""
+
+import numpy
+import pandas
+import pytest
+
+from cophub.gaps import (PATH_STEP, REPEAT_CYCLE, day_numbers,
+                         expected_calendar, expected_vs_acquired, matched,
+                         missing_scenes, sorted_unique, tile_completeness)
+from cophub.roi import pathrow_keys
+
+
+PATHROWS = pathrow_keys(numpy.array([90, 90, 91, 112]),
+                        numpy.array([84, 85, 84, 66]))
+
+
+@pytest.mark.parametrize('phase', [0, 5, 15])
+def test_calendar_matches_every_day(phase):
+    start_day, end_day = 16800, 16900
+    pathrows, days = expected_calendar(PATHROWS, phase, start_day, end_day)
+
+    expected = [(pr, day) for pr in PATHROWS
+                for day in range(start_day, end_day + 1)
+                if (day - PATH_STEP * (pr // 1000)) % REPEAT_CYCLE == phase]
+
+    assert list(zip(pathrows, days)) == expected
+
+
+def test_empty_calendar():
+    pathrows, days = expected_calendar(PATHROWS, 0, 100, 99)
+
+    assert len(pathrows) == 0 and len(days) == 0
+
+
+def test_sorted_unique_and_matched():
+    rng = numpy.random.RandomState(0)
+    keys = rng.randint(0, 1000, 5000)
+    other = rng.randint(0, 2000, 500)
+    unique = sorted_unique(keys)
+
+    numpy.testing.assert_array_equal(unique, numpy.unique(keys))
+    numpy.testing.assert_array_equal(matched(other, unique),
+                                     numpy.isin(other, keys))
+    assert not matched(other, sorted_unique([])).any()
+
+
+def scenes(phase=3):
+    """
+    The LS8 acquisitions of 2016 in phase with the repeat cycle.
+    """
+    start_day, end_day = day_numbers(['2016-01-01', '2016-12-31'])
+    pathrows, days = expected_calendar(PATHROWS, phase, start_day, end_day)
+
+    return pandas.DataFrame({'sensor': 'LS8',
+                             'path': (pathrows // 1000).astype('int16'),
+                             'row': (pathrows % 1000).astype('int16'),
+                             'date': days.astype('datetime64[D]')
+                             .astype('datetime64[ns]')})
+
+
+def test_anti_join():
+    acquired = scenes()
+    dropped = acquired.iloc[[5, 40]]
+
+    # a scene dated the day after is still matched
+    acquired.loc[10, 'date'] += pandas.Timedelta(days=1)
+    acquired = acquired.drop(dropped.index)
+
+    calendar, summary = expected_vs_acquired(acquired, start='2016-01-01',
+                                             end='2016-12-31')
+    missing = missing_scenes(calendar)
+
+    pandas.testing.assert_frame_equal(
+        missing[['path', 'row', 'date']],
+        dropped[['path', 'row', 'date']].sort_values(
+            ['date', 'path', 'row']).reset_index(drop=True))
+
+    row = summary.iloc[0]
+    assert row['phase'] == 3
+    assert row['path_rows'] == len(PATHROWS)
+    assert row['expected'] == len(scenes())
+    assert row['missing'] == 2
+
+
+def test_roi_pathrows():
+    roi = pathrow_keys(numpy.array([90, 100]), numpy.array([84, 80]))
+    calendar, summary = expected_vs_acquired(scenes(), roi)
+
+    # the ROI path/row that was never acquired is entirely missing
+    never = calendar[calendar['path'] == 100]
+    assert len(never) and not never['acquired'].any()
+    assert calendar[calendar['path'] == 90]['acquired'].all()
+
+    rasters = tile_completeness(calendar)
+    assert rasters['LS8'][90, 84] == 100
+    assert rasters['LS8'][100, 80] == 0
+    assert numpy.isnan(rasters['LS8'][91, 84])
+
+
+def test_no_scenes():
+    calendar, summary = expected_vs_acquired(scenes().iloc[:0])
+
+    assert len(calendar) == 0 and len(summary) == 0
+    assert len(missing_scenes(calendar)) == 0
@@ -0,0 +1,71 @@
+"""
+The harvest of a block of LPGS logs.
+"""
+
+import os
+from os.path import abspath, dirname, join as pjoin
+import sys
+
+import pytest
+
+sys.path.insert(0, pjoin(dirname(dirname(abspath(__file__))), 'scripts'))
+
+import ls_collections  # noqa: E402
+from cophub.backends import FuturesBackend  # noqa: E402
+from cophub.records import frame_from_columns  # noqa: E402
+
+
+LPGS_LOG = """<?xml version="1.0" encoding="UTF-8"?>
+<LPGS>
+  <L0RpProcessing success="1" fail="0"/>
+  <L1Processing success="24" fail="2" L1G="4" L1Gt="3" L1T="24"/>
+  <LandsatProcessingRequest id="LS7-20160401">
+    <WorkingFolder>/g/data/v10/work/LS7_ETM_20160401_000000/L0/{name}</WorkingFolder>
+  </LandsatProcessingRequest>
+</LPGS>
+"""
+
+LEVEL1_NAME = 'LS7_ETM_OTH_P51_GALPGS01-002_090_{row:03d}_20160401'
+
+
+@pytest.fixture
+def entries(tmp_path):
+    """
+    A manifest of 10 LPGS logs, the fourth of which is truncated.
+    """
+    entries = []
+    for i in range(10):
+        name = LEVEL1_NAME.format(row=60 + i)
+        out_dir = tmp_path / name / 'lpgs'
+        os.makedirs(str(out_dir))
+        fname = str(out_dir / 'lpgs_out.xml')
+        content = LPGS_LOG.format(name=name)
+        if i == 3:
+            content = content[:len(content) // 2]
+        with open(fname, 'w') as outf:
+            outf.write(content)
+        entries.append((fname, len(content), 0.0))
+
+    return entries
+
+
+def test_corrupt_log_keeps_the_rest_of_the_block(entries):
+    columns, failures, packagetmp, _, errors = ls_collections.harvest(
+        entries)
+    df = frame_from_columns([columns])
+
+    assert len(df) == 9
+    assert sorted(df['row']) == [60, 61, 62, 64, 65, 66, 67, 68, 69]
+    assert [fname for fname, _ in errors] == [entries[3][0]]
+    assert failures == [] and packagetmp == []
+
+
+def test_corrupt_log_doesnt_fail_the_chunk(entries):
+    backend = FuturesBackend(max_workers=2, chunksize=len(entries),
+                             threads=True)
+    results = backend.map_gather(ls_collections.harvest, entries)
+
+    assert backend.failures == {}
+    assert len(results) == 1
+    assert len(frame_from_columns([results[0][0]])) == 9
+    assert len(results[0][4]) == 1
@@ -0,0 +1,101 @@
+"""
+The incremental harvest; the diff of the manifest against the state,
+and the tombstoning of the deleted level1 products.
+"""
+
+import pandas
+
+from cophub import incremental
+
+
+LEVEL1_NAME = '/level1/LS7_ETM_OTH_P51_GALPGS01-002_090_{:03d}_20160401'
+
+
+def entries(rows, mtime=100):
+    """
+    The manifest entries of the level1 products of the given rows.
+    """
+    return [(LEVEL1_NAME.format(row) + '/lpgs/lpgs_out.xml', 512, mtime)
+            for row in rows]
+
+
+def records(todo):
+    """
+    The records harvested from the manifest entries.
+    """
+    return pandas.DataFrame({'level1_name': todo.index,
+                             'row': [int(n.split('_')[-2])
+                                     for n in todo.index],
+                             'pass_id': 'LS7-20160401'})
+
+
+def harvest(state, manifest_entries, timestamp=None):
+    manifest = incremental.manifest_frame(manifest_entries)
+    todo, deleted = incremental.diff_manifest(state, manifest)
+    state = incremental.update_state(state, records(todo), todo, deleted,
+                                     timestamp)
+
+    return state, todo, deleted
+
+
+def test_first_harvest_parses_everything():
+    state, todo, deleted = harvest(incremental.empty_state(),
+                                   entries([60, 61, 62]))
+
+    assert len(todo) == 3 and len(deleted) == 0
+    assert sorted(incremental.live_records(state)['row']) == [60, 61, 62]
+
+
+def test_unchanged_manifest_parses_nothing():
+    state, _, _ = harvest(incremental.empty_state(), entries([60, 61]))
+    _, todo, deleted = harvest(state, entries([60, 61]))
+
+    assert len(todo) == 0 and len(deleted) == 0
+
+
+def test_changed_new_and_deleted(tmp_path):
+    state, _, _ = harvest(incremental.empty_state(), entries([60, 61, 62]))
+
+    # the state survives being written and read back
+    fname = str(tmp_path / 'state.h5')
+    incremental.save_state(fname, state)
+    state = incremental.load_state(fname)
+
+    # 60 is rewritten, 62 removed and 63 added
+    manifest = entries([60], mtime=200) + entries([61, 63])
+    timestamp = pandas.Timestamp('2016-05-01')
+    state, todo, deleted = harvest(state, manifest, timestamp)
+
+    assert sorted(todo.index) == [LEVEL1_NAME.format(60),
+                                  LEVEL1_NAME.format(63)]
+    assert list(deleted) == [LEVEL1_NAME.format(62)]
+
+    tombstone = state.loc[LEVEL1_NAME.format(62)]
+    assert tombstone['deleted']
+    assert tombstone['deleted_at'] == timestamp
+    assert state.loc[LEVEL1_NAME.format(60), 'mtime'] == 200
+    assert sorted(incremental.live_records(state)['row']) == [60, 61, 63]
+
+
+def test_tombstoned_product_returns():
+    state, _, _ = harvest(incremental.empty_state(), entries([60, 61]))
+    state, _, _ = harvest(state, entries([60]))
+    state, todo, deleted = harvest(state, entries([60, 61]))
+
+    assert list(todo.index) == [LEVEL1_NAME.format(61)]
+    assert len(deleted) == 0
+    assert not state['deleted'].any()
+
+
+def test_failures_are_excluded():
+    manifest = entries([60]) + [('/level1/failure/lpgs/lpgs_out.xml', 1, 1),
+                                ('/level1/packagetmp/lpgs/lpgs_out.xml', 1,
+                                 1)]
+
+    assert len(incremental.manifest_frame(manifest)) == 1
+
+
+def test_missing_state(tmp_path):
+    state = incremental.load_state(str(tmp_path / 'missing.h5'))
+
+    assert len(state) == 0
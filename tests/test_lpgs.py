@@ -0,0 +1,100 @@
+"""
+The incremental extraction of the LPGS log fields.
+"""
+
+from os.path import basename, dirname
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from cophub.lpgs import LpgsExtractor
+
+
+LPGS_LOG = """<?xml version="1.0" encoding="UTF-8"?>
+<LPGS>
+  <Version>2.6.2</Version>
+  <L0RpProcessing success="{l0_success}" fail="{l0_fail}">
+    <Message>L0R processing complete</Message>
+  </L0RpProcessing>
+  <L1Processing success="{l1_success}" fail="{l1_fail}" L1G="{l1g}"
+                L1Gt="{l1gt}" L1T="{l1t}"/>
+  <LandsatProcessingRequest id="{pass_id}">
+    <Priority>1</Priority>
+    <WorkingFolder>/g/data/v10/work/{pass_name}/L0/{name}</WorkingFolder>
+    <Outputs>
+      <Output>{name}.tar.gz</Output>
+    </Outputs>
+  </LandsatProcessingRequest>
+</LPGS>
+"""
+
+LEVEL1_NAME = 'LS7_ETM_OTH_P51_GALPGS01-002_090_{row:03d}_20160401'
+
+
+def baseline(xml_fname):
+    """
+    The fields as retrieved by the original `process_lpgs_log`, which
+    parsed the whole tree.
+    """
+    data = {}
+    root = ET.parse(xml_fname).getroot()
+
+    result = {}
+    for child in root:
+        result[child.tag] = child.attrib
+
+    data['pass_id'] = result['LandsatProcessingRequest']['id']
+    for key in ['success', 'fail']:
+        data['L0_' + key] = int(result['L0RpProcessing'][key])
+    for key in ['success', 'fail', 'L1G', 'L1Gt', 'L1T']:
+        data['L1_' + key] = int(result['L1Processing'][key])
+
+    result = {}
+    for child in root.find('LandsatProcessingRequest').iter():
+        result[child.tag] = child.text
+    data['working_folder'] = result['WorkingFolder']
+
+    return data
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """
+    Five LPGS logs with differing counters.
+    """
+    fnames = []
+    for i in range(5):
+        name = LEVEL1_NAME.format(row=60 + i)
+        fname = tmp_path / '{}.xml'.format(name)
+        fname.write_text(LPGS_LOG.format(
+            l0_success=1, l0_fail=i % 2, l1_success=20 + i, l1_fail=i,
+            l1g=i, l1gt=2 * i, l1t=20 - i, pass_id='LS7-2016040{}'.format(i),
+            pass_name='LS7_ETM_2016040{}_000000'.format(i), name=name))
+        fnames.append(str(fname))
+
+    return fnames
+
+
+@pytest.mark.parametrize('backend', ['etree', 'lxml'])
+def test_matches_baseline(logs, backend):
+    if backend == 'lxml':
+        pytest.importorskip('lxml')
+    extractor = LpgsExtractor(backend=backend)
+
+    for fname in logs:
+        assert extractor.extract(fname) == baseline(fname)
+
+
+def test_pass_name(logs):
+    data = LpgsExtractor().extract(logs[2])
+
+    pass_name = basename(dirname(dirname(data['working_folder'])))
+    assert pass_name == 'LS7_ETM_20160402_000000'
+
+
+def test_missing_field(tmp_path):
+    fname = tmp_path / 'lpgs_out.xml'
+    fname.write_text('<LPGS><L0RpProcessing success="1" fail="0"/></LPGS>')
+
+    with pytest.raises(ValueError, match='L1_success'):
+        LpgsExtractor().extract(str(fname))
@@ -0,0 +1,76 @@
+"""
+The completeness metrics of the per-pass records.
+"""
+
+import numpy
+import pandas
+import pytest
+
+from cophub.metrics import (COLLECTION_METRICS, ROI_METRICS, completeness,
+                            period_counts, safe_divide, sensor_metrics)
+
+
+def passes():
+    """
+    Three LS8 passes over January and March 2016, and an LS7 pass in
+    February without any L1T or L1Gt scenes.
+    """
+    return pandas.DataFrame({
+        'sensor': ['LS8', 'LS8', 'LS8', 'LS7'],
+        'date': pandas.to_datetime(['2016-01-03', '2016-03-05',
+                                    '2016-03-09', '2016-02-01']),
+        'L0_success': [1, 1, 1, 1],
+        'L0_fail': [0, 0, 1, 0],
+        'L1_success': [10, 10, 10, 2],
+        'L1_fail': [0, 0, 0, 2],
+        'L1_L1T': [8, 6, 0, 0],
+        'L1_L1Gt': [2, 2, 0, 0],
+        'nbar': [10, 4, 0, 0],
+        'nbart': [10, 4, 0, 0],
+        'pq': [5, 4, 0, 0]})
+
+
+def test_safe_divide():
+    result = safe_divide([1, 0, 3], [2, 0, 0])
+
+    numpy.testing.assert_array_equal(result, [0.5, numpy.nan, numpy.nan])
+
+
+def test_zero_denominator_is_nan():
+    with numpy.errstate(all='raise'):
+        metrics = sensor_metrics(passes(), 'month')
+
+    ls7 = metrics.loc['LS7'].iloc[0]
+    assert numpy.isnan(ls7['nbar_completeness'])
+    assert numpy.isnan(ls7['pq_completeness_relative'])
+    assert ls7['L1_completeness'] == 50
+    assert not numpy.isinf(metrics.select_dtypes('number').values).any()
+
+
+def test_month_end_labels_and_gaps():
+    counts = period_counts(passes(), 'month')
+
+    assert list(counts.loc['LS8'].index) == list(pandas.to_datetime(
+        ['2016-01-31', '2016-02-29', '2016-03-31']))
+    assert counts.loc[('LS8', '2016-02-29'), 'L1_success'] == 0
+    assert counts.loc[('LS8', '2016-03-31'), 'L0_fail'] == 1
+
+
+def test_collection_and_roi_pq_completeness():
+    counts = period_counts(passes(), 'year')
+    collection = completeness(counts, COLLECTION_METRICS).loc['LS8']
+    roi = completeness(counts, ROI_METRICS).loc['LS8']
+
+    # pq / nbar for the collection, pq / (L1T + L1Gt) for the ROI
+    assert collection['pq_completeness'].iloc[0] == pytest.approx(9 / 14 *
+                                                                  100)
+    assert roi['pq_completeness'].iloc[0] == pytest.approx(9 / 18 * 100)
+    assert 'oth_percent' not in collection.columns
+
+
+def test_missing_columns_are_skipped():
+    counts = period_counts(passes().drop(['nbart'], axis=1), 'year')
+    metrics = completeness(counts)
+
+    assert 'nbar_completeness' in metrics.columns
+    assert 'nbart_completeness' not in metrics.columns
@@ -0,0 +1,94 @@
+"""
+The vectorised children product names, against the original
+per-name helpers.
+"""
+
+import datetime
+from os.path import basename
+import re
+
+import pandas
+import pytest
+
+from cophub.config import Config
+from cophub.names import parse_level1_names, product_names
+
+
+L1T_PATTERN = (r'(?P<spacecraft_id>LS\d)_(?P<sensor_id>\w+)_'
+               r'(?P<product_type>\w+)'
+               r'_(?P<product_id>P\d+.*)_GA(?P<product_code>.*)-'
+               r'(?P<station_id>\d+)_'
+               r'(?P<wrs_path>\d+)_(?P<wrs_row>\d+)_'
+               r'(?P<acquisition_date>\d{8})')
+PAT = re.compile(L1T_PATTERN)
+
+NBAR_BASE = '/g/data/rs0/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/output/nbar/{scene}/ga-metadata.yaml'
+NBART_BASE = '/g/data/rs0/scenes/nbar-scenes-tmp/{sensor}/{year}/{month}/output/nbart/{scene}/ga-metadata.yaml'
+PQ_BASE = '/g/data/rs0/scenes/pq-scenes-tmp/{sensor}/{year}/{month}/output/pqa/{scene}/ga-metadata.yaml'
+
+LEVEL1_NAMES = [
+    '/g/data/v10/reprocess/ls5/level1/1991/01/'
+    'LS5_TM_OTH_P51_GALPGS01-002_090_084_19910101',
+    '/g/data/v10/reprocess/ls7/level1/2016/04/'
+    'LS7_ETM_OTH_P51_GALPGS01-002_112_066_20160401',
+    '/g/data/v10/reprocess/ls8/level1/2016/12/'
+    'LS8_OLITIRS_OTH_P51_GALPGS01-032_101_078_20161231',
+    'LS8_OLI_TIRS_OTH_P51_GALPGS01-032_101_078_20161231',
+    '/g/data/v10/reprocess/ls7/level1/2016/04/not-a-level1-name',
+]
+
+
+def name_from_l1t(base, fmt, l1t_fname):
+    """
+    The original `nbar_name_from_l1t`, `nbart_name_from_l1t` and
+    `pqa_name_from_l1t`, which differed only by `base` and `fmt`.
+    """
+    m = PAT.match(basename(l1t_fname))
+    if m:
+        scene = fmt.format(m.group('spacecraft_id'), m.group('sensor_id'),
+                           m.group('station_id'), m.group('wrs_path'),
+                           m.group('wrs_row'), m.group('acquisition_date'))
+        dt = datetime.datetime.strptime(m.group('acquisition_date'), "%Y%m%d")
+        year = dt.year
+        month = '{0:02d}'.format(dt.month)
+
+        return base.format(sensor=m.group('spacecraft_id').lower(),
+                           year=year, month=month, scene=scene)
+
+
+BASELINE = {
+    'nbar': (NBAR_BASE, "{}_{}_NBAR_P54_GANBAR01-{}_{}_{}_{}"),
+    'nbart': (NBART_BASE, "{}_{}_NBART_P54_GANBART01-{}_{}_{}_{}"),
+    'pq': (PQ_BASE, "{}_{}_PQ_P55_GAPQ01-{}_{}_{}_{}"),
+}
+
+
+@pytest.mark.parametrize('product', sorted(BASELINE))
+def test_matches_baseline(product):
+    components = parse_level1_names(pandas.Series(LEVEL1_NAMES))
+    names = product_names(components, [product])
+    base, fmt = BASELINE[product]
+
+    expected = [name_from_l1t(base, fmt, name) for name in LEVEL1_NAMES]
+    result = [None if pandas.isnull(name) else name
+              for name in names[product + '_name']]
+
+    assert result == expected
+
+
+def test_components():
+    components = parse_level1_names(pandas.Series(LEVEL1_NAMES[1:2]))
+    row = components.iloc[0]
+
+    assert row['sensor'] == 'ls7'
+    assert (row['year'], row['month']) == ('2016', '04')
+    assert (row['wrs_path'], row['wrs_row']) == ('112', '066')
+    assert row['date'] == pandas.Timestamp('2016-04-01')
+
+
+def test_undeclared_sensor():
+    registry = Config({'products': {'nbar': {'sensors': ['ls8']}}}).products
+    components = parse_level1_names(pandas.Series(LEVEL1_NAMES[:3]))
+    names = product_names(components, registry=registry)
+
+    assert list(names['nbar_name'].isnull()) == [True, True, False]
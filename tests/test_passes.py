@@ -0,0 +1,62 @@
+"""
+The selection of records by pass id.
+"""
+
+import numpy
+import pandas
+import pytest
+
+from cophub.passes import (PassIndex, assign_pass_columns, pass_mask,
+                           selection_bounds)
+
+
+PASS_IDS = ['LS8-20160401', 'LS7-20160401', 'LS8-20160430',
+            'LS8-20160501', 'LS8-20151231', 'LS5-19910101',
+            'LS8-20160401', 'LS7-20160415']
+
+SELECTIONS = ['LS8', 'LS8-2016', 'LS8-201604', 'LS8-20160401', 'LS7-2016',
+              'LS5-199101', 'LS5-2016', 'LS9']
+
+
+@pytest.fixture
+def df():
+    return pandas.DataFrame({'pass_id': PASS_IDS,
+                             'row': range(len(PASS_IDS))})
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_index_matches_the_mask(df, selection):
+    expected = [p.startswith(selection) for p in PASS_IDS]
+    selected = PassIndex(df).select(selection)
+
+    numpy.testing.assert_array_equal(pass_mask(df['pass_id'], selection),
+                                     expected)
+    assert list(selected['row']) == list(df['row'][expected])
+
+
+def test_selection_bounds():
+    assert selection_bounds('LS8') == ('LS8', 0, 99999999)
+    assert selection_bounds('LS8-2016') == ('LS8', 20160000, 20169999)
+    assert selection_bounds('LS8-201604') == ('LS8', 20160400, 20160499)
+    assert selection_bounds('LS8-20160401') == ('LS8', 20160401, 20160401)
+
+
+@pytest.mark.parametrize('selection', ['LS8-16', 'LS8-2016041', 'ls8',
+                                       'LS8-201604-01'])
+def test_invalid_selection(df, selection):
+    with pytest.raises(ValueError):
+        PassIndex(df).select(selection)
+
+
+def test_date_range(df):
+    selected = PassIndex(df).date_range('LS8', '2016-04-01', '2016-04-30')
+
+    assert list(selected['row']) == [0, 2, 6]
+
+
+def test_assign_pass_columns(df):
+    df = assign_pass_columns(df, ['sensor', 'date', 'year'])
+
+    assert list(df['sensor'][:2]) == ['LS8', 'LS7']
+    assert df['date'].iloc[5] == pandas.Timestamp('1991-01-01')
+    assert df['year'].iloc[4] == 2015
@@ -0,0 +1,70 @@
+"""
+The usage rollup; each log is only folded in once.
+"""
+
+import pandas
+import pytest
+
+from cophub import rollup
+
+
+def daily(dates, hits):
+    return pandas.DataFrame({'date': pandas.to_datetime(dates),
+                             'dataset': 'ls8_nbar',
+                             'service': 'wms',
+                             'country': 'AU',
+                             'hits': hits,
+                             'traffic_data': [h * 100 for h in hits],
+                             'access_count': hits})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    log = tmp_path / 'access-201804.log'
+    log.write_text('2018-04-01 ls8_nbar wms AU\n')
+
+    return str(log), str(tmp_path / 'usage-rollup.h5')
+
+
+def test_log_folded_once(paths):
+    log, rollup_fname = paths
+    df = daily(['2018-04-01', '2018-04-02'], [1, 2])
+
+    assert not rollup.is_folded(log, rollup_fname)
+    assert rollup.fold_log(df, 'apache', log, rollup_fname)
+    assert rollup.is_folded(log, rollup_fname)
+    assert not rollup.fold_log(df, 'apache', log, rollup_fname)
+
+    result = rollup.load_rollup('apache', rollup_fname=rollup_fname)
+    assert list(result['hits']) == [1, 2]
+    assert len(rollup.load_sources(rollup_fname)) == 1
+
+
+def test_renamed_log_is_recognised(paths, tmp_path):
+    log, rollup_fname = paths
+    rollup.fold_log(daily(['2018-04-01'], [1]), 'apache', log, rollup_fname)
+
+    # the same contents under another name
+    copy = tmp_path / 'access-201804.log.1'
+    copy.write_text(open(log).read())
+
+    assert not rollup.fold_log(daily(['2018-04-01'], [1]), 'apache',
+                               str(copy), rollup_fname)
+
+
+def test_overlapping_logs_are_combined(paths, tmp_path):
+    log, rollup_fname = paths
+    other = tmp_path / 'access-201805.log'
+    other.write_text('2018-04-30 ls8_nbar wms AU\n')
+
+    rollup.fold_log(daily(['2018-04-29', '2018-04-30'], [1, 2]), 'apache',
+                    log, rollup_fname)
+    rollup.fold_log(daily(['2018-04-30', '2018-05-01'], [3, 4]), 'apache',
+                    str(other), rollup_fname)
+
+    result = rollup.load_rollup('apache', '2018-04-30', '2018-04-30',
+                                rollup_fname)
+    assert list(result['hits']) == [5]
+
+    ytd = rollup.year_to_date('apache', '2018-04-30', rollup_fname)
+    assert list(ytd['hits']) == [1, 5]
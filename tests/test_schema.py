@@ -0,0 +1,60 @@
+"""
+The compact schema of the harvested scene tables.
+"""
+
+import pandas
+import pandas.testing
+
+from cophub.records import RecordBuilder
+from cophub.schema import compact_scenes, get_table, put_table
+
+
+def scenes(n):
+    """
+    A compact table of `n` scenes.
+    """
+    builder = RecordBuilder()
+    for i in range(n):
+        name = 'LS7_ETM_OTH_P51_GALPGS01-002_090_{:03d}_20160401'.format(60 + i)
+        builder.append({'level1_name': '/g/data/v10/reprocess/ls7/' + name,
+                        'path': 90, 'row': 60 + i,
+                        'L0_success': 1, 'L0_fail': 0,
+                        'L1_success': 24, 'L1_fail': 2, 'L1_L1G': 4,
+                        'L1_L1Gt': 3, 'L1_L1T': 24,
+                        'pass_id': 'LS7-20160401',
+                        'pass_name': 'LS7_ETM_20160401_000000'})
+
+    return compact_scenes(builder.to_frame())
+
+
+def round_trip(tmp_path, df):
+    fname = str(tmp_path / 'collection.h5')
+    with pandas.HDFStore(fname, 'w') as store:
+        put_table(store, 'oth_and_children_products', df)
+
+    with pandas.HDFStore(fname, 'r') as store:
+        return get_table(store, 'oth_and_children_products')
+
+
+def test_round_trip(tmp_path):
+    df = scenes(5)
+    result = round_trip(tmp_path, df)
+
+    pandas.testing.assert_frame_equal(result, df)
+
+
+def test_empty_round_trip(tmp_path):
+    df = scenes(5).iloc[:0]
+    result = round_trip(tmp_path, df)
+
+    assert len(result) == 0
+    assert list(result.columns) == list(df.columns)
+    assert [str(d) for d in result.dtypes] == [str(d) for d in df.dtypes]
+
+
+def test_compact_empty():
+    df = scenes(0)
+
+    assert len(df) == 0
+    assert list(df.columns) == list(scenes(1).columns)
+    assert [d.kind for d in df.dtypes] == [d.kind for d in scenes(1).dtypes]
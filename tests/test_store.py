@@ -0,0 +1,94 @@
+"""
+The Parquet datasets, and the fallback to the HDF5 file when they're
+of a different harvest.
+"""
+
+import os
+import warnings
+
+import pandas
+import pytest
+
+from cophub.schema import put_table
+from cophub.store import (load_products, new_harvest_id, write_dataset,
+                          write_harvest_id)
+
+
+KEY = 'oth_and_children_products'
+
+
+def products(months):
+    """
+    A scene per day of the first 3 days of each of the LS8 `months`.
+    """
+    dates = pandas.to_datetime(['2016-{:02d}-{:02d}'.format(m, d)
+                                for m in months for d in (1, 2, 3)])
+    return pandas.DataFrame({'sensor': 'LS8',
+                             'date': dates,
+                             'pass_id': dates.strftime('LS8-%Y%m%d'),
+                             'row': range(len(dates))})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'collection.h5'), str(tmp_path / 'parquet')
+
+
+def write(paths, h5_df, parquet_df, h5_id, parquet_id):
+    h5_fname, parquet_root = paths
+    with pandas.HDFStore(h5_fname, 'w') as store:
+        if h5_id is not None:
+            write_harvest_id(store, h5_id)
+        put_table(store, KEY, h5_df)
+
+    if parquet_df is not None:
+        write_dataset(parquet_df, os.path.join(parquet_root, KEY),
+                      parquet_id)
+
+
+def load(paths, selection=None, columns=None):
+    h5_fname, parquet_root = paths
+    return load_products(KEY, selection, columns, parquet_root, h5_fname)
+
+
+def test_same_harvest_reads_the_dataset(paths):
+    harvest_id = new_harvest_id()
+    write(paths, products([4, 5]), products([4, 5]), harvest_id, harvest_id)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        df = load(paths, 'LS8-201605', ['pass_id', 'row'])
+
+    # only the partition of the selection is read
+    assert list(df['pass_id']) == ['LS8-20160501', 'LS8-20160502',
+                                   'LS8-20160503']
+    assert 'month' not in df.columns
+
+
+@pytest.mark.parametrize('h5_id', [None, 'another-harvest'])
+def test_stale_dataset_falls_back_to_the_h5(paths, h5_id):
+    # the dataset of an earlier harvest, lacking month 5
+    write(paths, products([4, 5]), products([4]), h5_id, new_harvest_id())
+
+    with pytest.warns(UserWarning, match="isn't of the same harvest"):
+        df = load(paths, 'LS8-201605')
+
+    assert len(df) == 3
+    assert (df['date'].dt.month == 5).all()
+
+
+def test_dataset_without_h5(paths):
+    write(paths, products([4]), products([4, 5]), None, new_harvest_id())
+    os.remove(paths[0])
+
+    assert len(load(paths)) == 6
+
+
+def test_rewrite_removes_old_partitions(paths):
+    path = os.path.join(paths[1], KEY)
+    write_dataset(products([4, 5]), path, new_harvest_id())
+    write_dataset(products([6]), path, new_harvest_id())
+
+    df = pandas.read_parquet(path)
+    assert sorted(df['month'].astype(int).unique()) == [6]
+    assert not [name for name in os.listdir(paths[1]) if name != KEY]